@@ -3,7 +3,37 @@
 Compatibility setup.py for Ubuntu 22.04 packaging tools.
 Uses setuptools_scm for dynamic versioning from git tags.
 """
+import os
+import importlib.util
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class build_py_fw_defines(build_py):
+    """
+    Also compile the fw message definitions into a python module, so no YAML is parsed at runtime
+    """
+
+    def run(self):
+        super().run()
+        if self.dry_run:
+            return
+        # Load the generator on its own, importing the tt_topology package needs the runtime dependencies
+        spec = importlib.util.spec_from_file_location(
+            "fw_defines", os.path.join(HERE, "tt_topology", "fw_defines.py")
+        )
+        fw_defines = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(fw_defines)
+        try:
+            fw_defines.compile_fw_defines(
+                os.path.join(HERE, "tt_topology", "data"),
+                os.path.join(self.build_lib, "tt_topology", fw_defines.COMPILED_MODULE),
+            )
+        except ImportError:
+            print("PyYAML is not available, fw defines will be parsed at runtime")
+
 
 if __name__ == "__main__":
     setup(
@@ -13,4 +43,5 @@ if __name__ == "__main__":
         packages=find_packages(),
         python_requires=">=3.10",
         setup_requires=['setuptools_scm'],
+        cmdclass={"build_py": build_py_fw_defines},
     )
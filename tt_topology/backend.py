@@ -2,71 +2,152 @@
 # SPDX-License-Identifier: Apache-2.0
 import os
 import sys
+import time
 import datetime
+import threading
 from pathlib import Path
-import networkx as nx
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
 from pyluwen import PciChip
 from collections import deque
 from dataclasses import dataclass
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
 import tt_topology.constants as constants
+from tt_topology.param_table import PARAM_FIELDS, ParamTable, param_addr
+from tt_topology.fw_defines import get_fw_defines
+from tt_topology.device import (
+    DeviceRecord,
+    DeviceRegistry,
+    build_device_records,
+    get_board_type,
+)
+from tt_topology.topology import Topology
+from tt_topology.plan_cache import PLAN_CACHE_FOLDERNAME, PlanCache, canonical_labeling
+from tt_topology.readiness import (
+    DEFAULT_SETTLE_DELAY,
+    DEFAULT_LINK_TIMEOUT,
+    wait_until_stable,
+)
+from tt_topology.eth_scan import (
+    eth_xy_decode,
+    read_local_eth_board_info,
+    scan_eth_ports,
+)
 from tt_tools_common.ui_common.themes import CMD_LINE_COLOR
 from tt_tools_common.utils_common.tools_utils import (
-    init_fw_defines,
     init_logging,
     detect_chips_with_callback,
 )
 from tt_tools_common.utils_common.system_utils import get_host_info
-from tt_tools_common.reset_common.galaxy_reset import GalaxyReset
-from tt_topology import log
+from tt_tools_common.reset_common.wh_reset import WHChipReset
+
+# networkx, matplotlib, numpy (through tt_topology.port_table), pydantic (through tt_topology.log)
+# and the galaxy reset are slow to import and only needed when flashing,
+# so they are imported in the functions that use them.
+# This keeps the startup of tt-topology -ls and -v fast.
 
 LOG_FOLDER = os.path.expanduser("~/tt_topology_logs/")
 ORANGE = "\033[38;5;208m"
 
 
-def get_board_type(board_id: str) -> str:
+# Upper bound on the number of chips talked to at the same time
+MAX_PARALLEL_CHIPS = 8
+# Max seconds a board gets to finish the L to R copy of its param table
+L_TO_R_COPY_TIMEOUT = 5.0
+# Number of identical ETH port scans in a row after which the links are considered trained
+LINK_STABLE_POLLS = 3
+
+
+@dataclass
+class ChipResult:
+    """
+    Outcome of running a function on a single chip through run_per_chip
+    """
+    item: Any
+    value: Any = None
+    error: Optional[Exception] = None
+
+
+def run_per_chip(
+    func: Callable,
+    items: List,
+    lock_key: Optional[Callable] = None,
+    max_workers: int = MAX_PARALLEL_CHIPS,
+) -> List[ChipResult]:
+    """
+    Run func(item) for every item on a bounded thread pool.
+    Every board sits on its own PCIe function so the hardware I/O of different boards can overlap.
+    Items that return the same lock_key(item), ex: the L and R chip of an n300 that are both
+    reached through the PCIe function of the L chip, are never run at the same time.
+    Workers should not print, results are returned in the same order as items so the caller
+    can report them in a deterministic order.
+
+    Returns:
+        List of ChipResult, one per item, with either the return value or the exception raised
+    """
+    locks = {}
+    if lock_key is not None:
+        for item in items:
+            locks.setdefault(lock_key(item), threading.Lock())
+
+    def run(item):
+        lock = locks.get(lock_key(item)) if lock_key is not None else None
+        try:
+            if lock is None:
+                return ChipResult(item, value=func(item))
+            with lock:
+                return ChipResult(item, value=func(item))
+        except Exception as e:
+            return ChipResult(item, error=e)
+
+    if len(items) <= 1 or max_workers <= 1:
+        return [run(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(run, items))
+
+
+def pci_interface_key(device: DeviceRecord):
+    """
+    PCIe interface a chip is reached through, also the lock key for run_per_chip.
+    Remote chips have no PCIe interface of their own, they are reached through the local chip of
+    their board and get its interface.
+    """
+    return device.board_interface
+
+
+def param_table_key(device: DeviceRecord, remote: Optional[bool] = None):
+    """
+    Key of a chip's param table image, stable across resets.
+    The L and R chip of an n300 share a board id, so the side is part of the key.
+    """
+    if remote is None:
+        remote = device.is_remote
+    return (device.board_id, remote)
+
+
+@dataclass
+class EthParams:
     """
-    Get board type from board ID string.
-    Ex:
-        Board ID: AA-BBBBB-C-D-EE-FF-XXX
-                   ^     ^ ^ ^  ^  ^   ^
-                   |     | | |  |  |   +- XXX
-                   |     | | |  |  +----- FF
-                   |     | | |  +-------- EE
-                   |     | | +----------- D
-                   |     | +------------- C = Revision
-                   |     +--------------- BBBBB = Unique Part Identifier (UPI)
-                   +--------------------- AA
+    Multi-host eth params flashed on an n300 board
     """
-    UPI_TO_BOARD_TYPE = {
-        # Wormhole cards
-        0x8: "nb_cb",
-        0xB: "wh_4u",
-        0x14: "n300",
-        0x18: "n150",
-        0x35: "tt-galaxy-wh",
-        # Blackhole cards
-        0x36: "bh-scrappy",
-        0x43: "p100a",
-        0x40: "p150a",
-        0x41: "p150b",
-        0x42: "p150c",
-        0x44: "p300b",
-        0x45: "p300a",
-        0x46: "p300c",
-        0x47: "tt-galaxy-bh",
-    }
-    try:
-        serial_num = int(f"0x{board_id}", base=16)
-    except ValueError:
-        return "N/A"
-    upi = (serial_num >> 36) & 0xFFFFF
-
-    return UPI_TO_BOARD_TYPE.get(upi, "N/A")
-
-
-def detect_current_topology(devices: List[PciChip]):
+    coord_check_disable: int
+    routing_disable_left: int
+    routing_disable_right: int
+
+    def writes(self):
+        """
+        Params to flash as [(field, right, value), ...]
+        """
+        return [
+            # eth coordinate check disable
+            ("COORD_CHECK_DISABLE", False, self.coord_check_disable),
+            # eth routing disable left
+            ("ROUTING_DISABLE", False, self.routing_disable_left),
+            # eth routing disable right
+            ("ROUTING_DISABLE", True, self.routing_disable_right),
+        ]
+
+
+def detect_current_topology(devices: List[DeviceRecord]):
     """
     Print all chips on host with their coordinates.
     Decipher if the chips have been flashed in any layout based on coordinates alone.
@@ -79,13 +160,10 @@ def detect_current_topology(devices: List[PciChip]):
         CMD_LINE_COLOR.ENDC,
     )
     for i, dev in enumerate(devices):
-        board_id = str(hex(dev.board_id())).replace("0x", "")
-        board_type = get_board_type(board_id)
-        board_type = board_type + (" R" if dev.is_remote() else " L")
-        coords = (
-            dev.as_wh().get_local_coord().shelf_x,
-            dev.as_wh().get_local_coord().shelf_y,
-        )
+        board_id = dev.board_id
+        board_type = f"{dev.board_type} {dev.side}"
+        coord = dev.wh.get_local_coord()
+        coords = (coord.shelf_x, coord.shelf_y)
         coord_list.append(coords)
         print(
             CMD_LINE_COLOR.BLUE,
@@ -135,10 +213,47 @@ class TopoBackend:
         devices: List[PciChip],
         layout: str = "linear",
         plot_filename: str = "chip_layout.png",
+        force_flash: bool = False,
+        settle_delay: float = DEFAULT_SETTLE_DELAY,
+        link_timeout: float = DEFAULT_LINK_TIMEOUT,
+        full_scan: bool = False,
+        plan_cache: bool = True,
     ):
         self.devices = devices
+        # Detects the chips again after a reset
+        self.registry = DeviceRegistry(
+            self.devices,
+            local_only=not any(device.is_remote for device in self.devices),
+            detect=lambda **kwargs: detect_chips_with_callback(**kwargs),
+        )
+        # PCI interfaces of the boards whose params were written since the last reset
+        self.changed_interfaces = set()
         self.layout = layout
         self.plot_filename = plot_filename
+        # Rewrite every param and L to R copy even if the SPI already holds the value
+        self.force_flash = force_flash
+        # Param table images of every chip, the SPI is persistent so these stay valid across resets
+        self.param_tables = {}
+        # Boards flashed since the last wait_for_flash
+        self.flashed_boards = []
+        # Boards committed since the last copy_l_to_r that still need their L to R copy
+        self.pending_copies = []
+        # Fixed delay in seconds between flashing boards and resetting them
+        self.settle_delay = settle_delay
+        # Max seconds to wait for the ETH links to train after a reset
+        self.link_timeout = link_timeout
+        # Number of trained ports the next link training barrier can stop at, None if unknown
+        self.expected_links = None
+        # Scan every ETH port, including the ones the param tables disable
+        self.full_scan = full_scan
+        # Coordinate plans of the link graphs seen before, None to always work the coordinates out
+        self.plan_cache = (
+            PlanCache(os.path.join(LOG_FOLDER, PLAN_CACHE_FOLDERNAME)) if plan_cache else None
+        )
+        # (chip data, canonical labeling) of the last link graph looked up in the plan cache
+        self.plan_labeling = None
+        from tt_topology import log
+
         self.log = log.TTToplogyLog(
             time=datetime.datetime.now(),
             host_info=get_host_info(),
@@ -151,17 +266,168 @@ class TopoBackend:
             errors="",
         )
 
-    @staticmethod
-    def eth_xy_decode(eth_id):
-        if (eth_id % 2) == 1:
-            eth_x = 1 + ((eth_id % 8) // 2)
-        else:
-            eth_x = 9 - ((eth_id % 8) // 2)
-        if eth_id > 7:
-            eth_y = 6
+    eth_xy_decode = staticmethod(eth_xy_decode)
+
+    @property
+    def devices(self):
+        return self._devices
+
+    @devices.setter
+    def devices(self, devices: List[PciChip]):
+        # New device handles mean the chips were reset or re-detected, so any cached scan is stale.
+        # Their metadata is read once here and used from the records from now on
+        self._devices = build_device_records(devices)
+        self.invalidate_port_scan_cache()
+
+    def invalidate_port_scan_cache(self):
+        """
+        Drop all cached ETH port scans, they have to be re-read from the chips
+        """
+        # Last scan of the link training barrier in device order, None for chips that couldn't be read
+        self.link_scans = []
+
+    def full_lds_reset(self, pci_interfaces: List[int]):
+        """
+        Reset the chips at the given pci interfaces and get all devices back, including remote
+
+        Returns:
+            List of chips that were reset
+        """
+        reset_devices = WHChipReset().full_lds_reset(pci_interfaces)
+        # Remote chips can only be reached again by detecting all the chips
+        self.devices = self.registry.enumerate()
+        self.changed_interfaces = set()
+        return reset_devices
+
+    def boards_to_reset(self, pci_interfaces: List[int], chip_data=None) -> List[int]:
+        """
+        Pick the boards a reset has to cover to apply the params written since the last reset:
+        the boards that were written and the boards with an ETH link to them.
+        A reset takes the links of a board down and the chips on the other end of those links have to be
+        reset with it for them to train again. Boards further away keep their links and are not reset.
+        Without a connection map, nothing is known about the chips, so every board is reset.
+
+        Returns:
+            The pci interfaces to reset, in the order of pci_interfaces, empty if nothing was written
+        """
+        if chip_data is None:
+            return list(pci_interfaces)
+        if not self.changed_interfaces:
+            return []
+        changed_chips = [
+            data["id"]
+            for data in chip_data.values()
+            if pci_interface_key(data["chip_obj"]) in self.changed_interfaces
+        ]
+        affected = set(self.changed_interfaces)
+        for chip_id in chip_data.linked_chips(changed_chips):
+            affected.add(pci_interface_key(chip_data.chip(chip_id)["chip_obj"]))
+        return [pci_interface for pci_interface in pci_interfaces if pci_interface in affected]
+
+    def port_disable_masks(self) -> List[int]:
+        """
+        PORT_DISABLE mask every chip was booted with, in device order, 0 for every chip with full_scan.
+        The R chip of an n300 runs with the R params of its L chip's table.
+        Tables come from the param table cache, so this normally doesn't touch the SPI.
+        """
+        if self.full_scan:
+            return [0] * len(self.devices)
+        local_chips = {device.board_id: device for device in self.devices if not device.is_remote}
+        masks = []
+        for device in self.devices:
+            if device.is_remote and device.board_type == "n300":
+                local_chip = local_chips.get(device.board_id)
+                if local_chip is None:
+                    # Can't tell which ports the R chip runs with without its L chip, scan them all
+                    masks.append(0)
+                    continue
+                masks.append(self.get_param_table(local_chip).get("PORT_DISABLE", right=True))
+            else:
+                masks.append(self.get_param_table(device).get("PORT_DISABLE"))
+        return masks
+
+    def scan_all_eth_ports(self, port_disables: Optional[List[int]] = None):
+        """
+        Scan the ETH ports of every chip in parallel, skipping the ports disabled in the param tables,
+        or in port_disables if the PORT_DISABLE mask every chip was booted with is given in device order
+
+        Returns:
+            List of ChipResult with the list of EthPortInfo of every device, in device order
+        """
+        if port_disables is None:
+            port_disables = self.port_disable_masks()
+        return run_per_chip(
+            lambda job: scan_eth_ports(job[0].wh, job[1]),
+            list(zip(self.devices, port_disables)),
+            lock_key=lambda job: pci_interface_key(job[0]),
+        )
+
+    def scan_link_state(self):
+        """
+        Scan the ETH ports of every chip once for the link training barrier.
+        Chips that can't be read yet count as having no trained links.
+
+        Returns:
+            Tuple with the frozenset of trained ports of every device, in device order
+        """
+        results = self.scan_all_eth_ports()
+        self.link_scans = [result.value if result.error is None else None for result in results]
+        return tuple(
+            frozenset(port_info.port for port_info in ports if port_info.is_connected)
+            if ports is not None
+            else frozenset()
+            for ports in self.link_scans
+        )
+
+    def wait_for_link_training(self):
+        """
+        Barrier after a reset: poll the ETH ports of all chips until the trained ports stop changing
+        for LINK_STABLE_POLLS scans in a row, or the expected number of ports has trained.
+        Prints the trained ports of a chip every time they change.
+
+        Returns:
+            True if the links settled before the link timeout, False otherwise
+        """
+        reported = {}
+
+        def report(link_state):
+            for idx, ports in enumerate(link_state):
+                if reported.get(idx) != ports:
+                    reported[idx] = ports
+                    print(
+                        CMD_LINE_COLOR.BLUE,
+                        f"Chip {idx}: {len(ports)} ETH ports trained {sorted(ports)}",
+                        CMD_LINE_COLOR.ENDC,
+                    )
+
+        def num_trained(link_state):
+            return sum(len(ports) for ports in link_state)
+
+        is_complete = None
+        if self.expected_links is not None:
+            is_complete = lambda link_state: num_trained(link_state) >= self.expected_links
+        link_state, settled = wait_until_stable(
+            self.scan_link_state,
+            stable_polls=LINK_STABLE_POLLS,
+            timeout=self.link_timeout,
+            is_complete=is_complete,
+            on_change=report,
+            # Remote chips are only reachable over ETH, so a multi chip system with no trained ports isn't done yet
+            can_settle=lambda link_state: len(link_state) <= 1 or num_trained(link_state) > 0,
+        )
+        if settled:
+            print(
+                CMD_LINE_COLOR.GREEN,
+                f"ETH links settled with {num_trained(link_state)} trained ports",
+                CMD_LINE_COLOR.ENDC,
+            )
         else:
-            eth_y = 0
-        return eth_x, eth_y
+            print(
+                ORANGE,
+                f"ETH links did not settle within {self.link_timeout:g}s, continuing with {num_trained(link_state)} trained ports",
+                CMD_LINE_COLOR.ENDC,
+            )
+        return settled
 
     def save_logs(self, result_filename: str = None):
         time_now = datetime.datetime.now()
@@ -181,63 +447,54 @@ class TopoBackend:
         )
         return log_filename
 
+    def read_eth_config(self, device: DeviceRecord):
+        """
+        Read the fw version and the eth params of a single chip from its SPI
+
+        Returns:
+            dict with the fw version and the L (and for local chips R) eth params
+        """
+        wh_chip = device.wh
+        fw_version = bytearray(4)
+        wh_chip.spi_read(int(constants.ETH_FW_VERSION_ADDR), fw_version)
+        param_table = ParamTable.read(wh_chip, force=self.force_flash)
+        # Keep the image around, flashing only needs to write what differs from it
+        self.param_tables[param_table_key(device)] = param_table
+        data = {
+            "wh_chip": wh_chip,
+            "param_table": param_table,
+            "fw_version": hex(int.from_bytes(fw_version, "little")),
+            "chip_coord_l": hex(param_table.get("CHIP_COORD")),
+            "port_disable_l": hex(param_table.get("PORT_DISABLE")),
+            "rack_shelf_l": hex(param_table.get("RACK_SHELF")),
+        }
+
+        if not device.is_remote:
+            data["chip_coord_r"] = hex(param_table.get("CHIP_COORD", right=True))
+            data["port_disable_r"] = hex(param_table.get("PORT_DISABLE", right=True))
+            data["rack_shelf_r"] = hex(param_table.get("RACK_SHELF", right=True))
+        return data
+
     def get_eth_config_state(self):
+        from tt_topology import log
+
         config_state = []
         config_state_log = []
-        for device in self.devices:
+        # Read all the chips in parallel, results come back in device order
+        for result in run_per_chip(
+            self.read_eth_config, self.devices, lock_key=pci_interface_key
+        ):
+            if result.error is not None:
+                raise result.error
+            device = result.item
+            data = result.value
             dev_config_log = log.ChipConfig()
-            wh_chip = device.as_wh()
-            fw_version = bytearray(4)
-            chip_coord_l = bytearray(4)
-            port_disable_l = bytearray(4)
-            rack_self_l = bytearray(4)
-            wh_chip.spi_read(int(constants.ETH_FW_VERSION_ADDR), fw_version)
-            wh_chip.spi_read(int(constants.ETH_PARAM_CHIP_COORD), chip_coord_l)
-            wh_chip.spi_read(int(constants.ETH_PARAM_PORT_DISABLE), port_disable_l)
-            wh_chip.spi_read(int(constants.ETH_PARAM_RACK_SHELF), rack_self_l)
-            data = {
-                "wh_chip": wh_chip,
-                "fw_version": hex(int.from_bytes(fw_version, "little")),
-                "chip_coord_l": hex(int.from_bytes(chip_coord_l, "little")),
-                "port_disable_l": hex(int.from_bytes(port_disable_l, "little")),
-                "rack_shelf_l": hex(int.from_bytes(rack_self_l, "little")),
-            }
-            dev_config_log.board_id = str(hex(device.board_id())).replace("0x", "") + (
-                " R" if device.is_remote() else " L"
-            )
+            dev_config_log.board_id = f"{device.board_id} {device.side}"
             dev_config_log.fw_version = data["fw_version"]
             dev_config_log.chip_coord_l = data["chip_coord_l"]
             dev_config_log.port_disable_l = data["port_disable_l"]
             dev_config_log.rack_shelf_l = data["rack_shelf_l"]
-
-            if not device.is_remote():
-                chip_coord_r = bytearray(4)
-                port_disable_r = bytearray(4)
-                rack_self_r = bytearray(4)
-                wh_chip.spi_read(
-                    int(
-                        constants.ETH_PARAM_CHIP_COORD
-                        + constants.ETH_PARAM_RIGHT_OFFSET
-                    ),
-                    chip_coord_r,
-                )
-                wh_chip.spi_read(
-                    int(
-                        constants.ETH_PARAM_PORT_DISABLE
-                        + constants.ETH_PARAM_RIGHT_OFFSET
-                    ),
-                    port_disable_r,
-                )
-                wh_chip.spi_read(
-                    int(
-                        constants.ETH_PARAM_RACK_SHELF
-                        + constants.ETH_PARAM_RIGHT_OFFSET
-                    ),
-                    rack_self_r,
-                )
-                data["chip_coord_r"] = hex(int.from_bytes(chip_coord_r, "little"))
-                data["port_disable_r"] = hex(int.from_bytes(port_disable_r, "little"))
-                data["rack_shelf_r"] = hex(int.from_bytes(rack_self_r, "little"))
+            if not device.is_remote:
                 dev_config_log.chip_coord_r = data["chip_coord_r"]
                 dev_config_log.port_disable_r = data["port_disable_r"]
                 dev_config_log.rack_shelf_r = data["rack_shelf_r"]
@@ -257,156 +514,235 @@ class TopoBackend:
             self.log.final_coords_flash_config = config_state_log
         return config_state
 
-    def flash_to_default_state(self):
+    def get_param_table(self, device: DeviceRecord) -> ParamTable:
         """
-        Flash param table to default state
-        Check if device is going to be trained
+        Get the param table image of a chip, only reading the SPI if it hasn't been read yet
+        """
+        key = param_table_key(device)
+        if key not in self.param_tables:
+            self.param_tables[key] = ParamTable.read(
+                device.wh, force=self.force_flash
+            )
+        return self.param_tables[key]
+
+    def commit_param_table(
+        self, device: DeviceRecord, param_table: ParamTable, l_to_r_copy: bool = True
+    ) -> bool:
+        """
+        Write the changed params of a board to its SPI and queue its L to R copy for copy_l_to_r.
+        Unless force flashing, a board whose SPI already holds every value is left untouched, as long
+        as the SPI of its R chip holds them too.
+
+        Returns:
+            True if the board was flashed, False if nothing changed
+        """
+        wh_chip = device.wh
+        num_written = param_table.commit(wh_chip)
+        if num_written == 0 and not self.force_flash:
+            if not l_to_r_copy or device.board_type != "n300" or self.is_copied(device, param_table):
+                return False
+        self.changed_interfaces.add(pci_interface_key(device))
+        if l_to_r_copy:
+            self.pending_copies.append(device)
+            # The copy will overwrite the params of the R chip
+            self.param_tables.pop(param_table_key(device, remote=True), None)
+        self.flashed_boards.append(device)
+        return True
+
+    def is_copied(self, device: DeviceRecord, param_table: ParamTable) -> bool:
+        """
+        Check the SPI of the R chip of a board holds the R params of the param table of its L chip.
+        False if the R chip isn't detected or can't be read, then only a copy makes sure it does.
         """
-        for i, device in enumerate(self.devices):
-            wh_chip = device.as_wh()
-            # Always flash left/local chip
-            wh_chip.spi_write(
-                int(constants.ETH_PARAM_CHIP_COORD),
-                int(0x0).to_bytes(4, byteorder="little"),
+        remote = next(
+            (
+                other
+                for other in self.devices
+                if other.is_remote and other.board_id == device.board_id
+            ),
+            None,
+        )
+        if remote is None:
+            return False
+        try:
+            remote_table = self.get_param_table(remote)
+        except Exception:
+            return False
+        return all(
+            remote_table.get(field, right=True) == param_table.get(field, right=True)
+            for field in PARAM_FIELDS
+        )
+
+    def copy_l_to_r(self):
+        """
+        Trigger the L to R copy of every board queued since the last call.
+        Every board waits for its own copy, the boards copy in parallel so the wait is bounded by
+        the slowest board.
+
+        Returns:
+            {pci interface: exception if the copy failed or None}
+        """
+        devices, self.pending_copies = self.pending_copies, []
+        copy_msg = get_fw_defines("wormhole")["MSG_TRIGGER_SPI_COPY_LtoR"]
+
+        def copy_board(device: DeviceRecord):
+            device.wh.arc_msg(
+                copy_msg,
+                wait_for_done=True,
+                arg0=0,
+                arg1=0,
+                timeout=L_TO_R_COPY_TIMEOUT,
             )
+
+        results = run_per_chip(copy_board, devices, lock_key=pci_interface_key)
+        return {pci_interface_key(result.item): result.error for result in results}
+
+    def wait_for_flash(self):
+        """
+        Give the boards flashed since the last call time to settle before they are reset.
+        Nothing on the chips reports a flash as settled, so this is a fixed delay of settle_delay,
+        skipped when no board was flashed.
+        """
+        flashed_boards, self.flashed_boards = self.flashed_boards, []
+        if flashed_boards:
+            time.sleep(self.settle_delay)
+
+    def flash_device_to_default_state(self, device: DeviceRecord):
+        """
+        Flash the param table of a single board to the default state and queue the L to R copy
+
+        Returns:
+            True if the board was flashed, False if it was already in the default state
+        """
+        param_table = self.get_param_table(device)
+        # Always flash left/local chip
+        param_table.set("CHIP_COORD", 0x0)
+        # If in isolated mode, set ethernet port to disabled
+        if self.layout == "isolated":
+            param_table.set("PORT_DISABLE", 0xFCFF)
+        else:
+            param_table.set("PORT_DISABLE", 0x0)
+        param_table.set("RACK_SHELF", 0x0)
+
+        # flash R chip info
+        if device.board_type == "n300":
+            param_table.set("CHIP_COORD", 0x1, right=True)
             # If in isolated mode, set ethernet port to disabled
             if self.layout == "isolated":
-                wh_chip.spi_write(
-                    int(constants.ETH_PARAM_PORT_DISABLE),
-                    bytearray([0xFF, 0xFC, 0x00, 0x00]),
-                )
+                param_table.set("PORT_DISABLE", 0xFFFC, right=True)
             else:
-                wh_chip.spi_write(
-                    int(constants.ETH_PARAM_PORT_DISABLE),
-                    int(0x0).to_bytes(4, byteorder="little"),
-                )
-            wh_chip.spi_write(
-                int(constants.ETH_PARAM_RACK_SHELF),
-                int(0x0).to_bytes(4, byteorder="little")
-                # bytearray([0x0, 0x0, 0x0, 0x0])
-            )
+                param_table.set("PORT_DISABLE", 0x0, right=True)
+            param_table.set("RACK_SHELF", 0x0, right=True)
+        # Queue left to right copy
+        return self.commit_param_table(device, param_table)
 
-            # flash R chip info
-            if get_board_type(str(hex(device.board_id())).replace("0x", "")) == "n300":
-                wh_chip.spi_write(
-                    int(
-                        constants.ETH_PARAM_CHIP_COORD
-                        + constants.ETH_PARAM_RIGHT_OFFSET
-                    ),
-                    int(0x1).to_bytes(4, byteorder="little"),
-                )
-                chip_coord_r = bytearray(4)
-                wh_chip.spi_read(
-                    int(
-                        constants.ETH_PARAM_CHIP_COORD
-                        + constants.ETH_PARAM_RIGHT_OFFSET
-                    ),
-                    chip_coord_r,
-                )
-                # If in isolated mode, set ethernet port to disabled
-                if self.layout == "isolated":
-                    wh_chip.spi_write(
-                        int(
-                            constants.ETH_PARAM_PORT_DISABLE
-                            + constants.ETH_PARAM_RIGHT_OFFSET
-                        ),
-                        bytearray([0xFC, 0xFF, 0x0, 0x0]),
-                    )
-                else:
-                    wh_chip.spi_write(
-                        int(
-                            constants.ETH_PARAM_PORT_DISABLE
-                            + constants.ETH_PARAM_RIGHT_OFFSET
-                        ),
-                        int(0x0).to_bytes(4, byteorder="little"),
-                    )
-                wh_chip.spi_write(
-                    int(
-                        constants.ETH_PARAM_RACK_SHELF
-                        + constants.ETH_PARAM_RIGHT_OFFSET
-                    ),
-                    int(0x0).to_bytes(4, byteorder="little")
-                    # bytearray([0x0, 0x0, 0x0, 0x0]),
-                )
-            board_id = str(hex(device.board_id())).replace("0x", "")
-            # Left to right copy
-            try:
-                wh_chip.arc_msg(
-                    init_fw_defines("wormhole", "tt_topology")[
-                        "MSG_TRIGGER_SPI_COPY_LtoR"
-                    ],
-                    wait_for_done=True,
-                    arg0=0,
-                    arg1=0,
-                    timeout=5,
+    def flash_to_default_state(self):
+        """
+        Flash param table to default state
+        Check if device is going to be trained
+        """
+        # The default state changes which links train, so the link count seen so far doesn't apply
+        self.expected_links = None
+        # Flash all the boards in parallel, then report in device order
+        results = run_per_chip(
+            self.flash_device_to_default_state, self.devices, lock_key=pci_interface_key
+        )
+        copy_errors = self.copy_l_to_r()
+        for i, result in enumerate(results):
+            board_id = result.item.board_id
+            if result.error is not None:
+                print(
+                    CMD_LINE_COLOR.RED,
+                    f"Something went wrong with default flash for chip {i}: {board_id}!!\nError: {result.error}",
+                    CMD_LINE_COLOR.ENDC,
                 )
-            except Exception as e:
+                sys.exit(1)
+            copy_error = copy_errors.get(pci_interface_key(result.item))
+            if copy_error is not None:
                 print(
                     CMD_LINE_COLOR.RED,
-                    f"Something went wrong with L to R copy for chip {i}: {board_id}!!\nError: {e}",
+                    f"Something went wrong with L to R copy for chip {i}: {board_id}!!\nError: {copy_error}",
                     CMD_LINE_COLOR.ENDC,
                 )
                 sys.exit(1)
-            print(
-                CMD_LINE_COLOR.GREEN,
-                f"Completed default flash for board {i}: {board_id}",
-                CMD_LINE_COLOR.ENDC,
-            )
+            if result.value:
+                print(
+                    CMD_LINE_COLOR.GREEN,
+                    f"Completed default flash for board {i}: {board_id}",
+                    CMD_LINE_COLOR.ENDC,
+                )
+            else:
+                print(
+                    CMD_LINE_COLOR.GREEN,
+                    f"Board {i}: {board_id} already in default state, skipped flash",
+                    CMD_LINE_COLOR.ENDC,
+                )
 
     def get_local_eth_board_info(self, chip):
         """
         Get the local board info from noc, making it eth fw version agnostic
         """
-        local_board_id = bytearray(4)
-        local_board_type = bytearray(4)
-
-        for port in range(16):
-            eth_x, eth_y = self.eth_xy_decode(port)
-            chip.noc_read(0, eth_x, eth_y, constants.ETH_TEST_RESULT_LOCAL_TYPE, local_board_type)
+        return read_local_eth_board_info(chip)
 
-            if int.from_bytes(local_board_type, "little") != 0:
-                chip.noc_read(0, eth_x, eth_y, constants.ETH_TEST_RESULT_LOCAL_ID, local_board_id)
-                local_board_type = int.from_bytes(local_board_type, "little")
-                local_board_id = int.from_bytes(local_board_id, "little")
-                local_board_info = f"{(local_board_type << 32) | local_board_id:016x}"
-                return local_board_info
-
-    def generate_connection_map(self):
+    def generate_connection_map(self, port_table=None):
         """
-        Generate an map with chip data and a list of connections
+        Generate an map with chip data and a list of connections.
+        The ports of every chip are scanned unless the port table of an earlier scan, with a row per
+        device in device order, is given.
 
         Returns:
-            map of chip_data with the following information:
+            Topology keyed by eth_board_info with the following chip data:
                 "id": idx,
                 "chip_obj": chip,
                 "board_type": board_type,
                 "board_id": board_id,
                 "connections": [(neighbor_chip_id, connection_type), ...],
+            Every physical link and its ports are kept in the Topology, see Topology.link_ports.
+            The port table the connections were worked out from is kept in its port_table
         """
-        chip_data = {}
-        log_connection_map = []
-        for idx, device in enumerate(self.devices):
-            chip = device.as_wh()
-            board_id = str(hex(device.board_id())).replace("0x", "")
-            board_type = get_board_type(board_id)
-            eth_board_info = self.get_local_eth_board_info(chip)
+        import numpy as np
+        from tt_topology import log
+        from tt_topology.port_table import PortTable
+
+        # Read the test results of every port of every chip once, they hold both the local and remote info.
+        # Reuse the last scan of the link training barrier if there was one since the reset
+        if port_table is None:
+            port_disables = None
+            scans = []
+            for idx, device in enumerate(self.devices):
+                if idx < len(self.link_scans) and self.link_scans[idx] is not None:
+                    scans.append(self.link_scans[idx])
+                else:
+                    if port_disables is None:
+                        port_disables = self.port_disable_masks()
+                    scans.append(scan_eth_ports(device.wh, port_disables[idx]))
+            port_table = PortTable.from_scans(scans)
 
-            chip_data[eth_board_info] = {
-                "id": idx,
-                "chip_obj": device,
-                "board_type": board_type,
-                "board_id": board_id,
-                "connections": [],
-            }
+        chip_data = Topology()
+        chip_data.port_table = port_table
+        log_connection_map = []
+        log_connection_map_by_info = {}
+        for idx, (device, eth_board_info) in enumerate(
+            zip(self.devices, port_table.local_eth_board_info())
+        ):
+            device.eth_board_info = eth_board_info
+            chip_data.add_chip(eth_board_info, idx, device)
             # Log the same info for the json dump
             connection_map_log_obj = log.ConnectionMap()
             connection_map_log_obj.id = idx
-            connection_map_log_obj.board_id = board_id + (
-                " R" if device.is_remote() else " L"
-            )
-            connection_map_log_obj.board_type = board_type
+            connection_map_log_obj.board_id = f"{device.board_id} {device.side}"
+            connection_map_log_obj.board_type = device.board_type
             connection_map_log_obj.eth_board_info = eth_board_info
             log_connection_map.append(connection_map_log_obj)
+            log_connection_map_by_info.setdefault(eth_board_info, connection_map_log_obj)
+
+        if port_table.unknown_remote_ports().any():
+            print(
+                CMD_LINE_COLOR.YELLOW,
+                "Warning: Detected an unrecognized remote chip (likely on another host). This chip will be skipped, as multi-host topologies are not supported.",
+                CMD_LINE_COLOR.ENDC,
+            )
+
         # Vectorized representation of the connections
         # Each chip will have a list of if indices of which chip it's connected to
         # It will also have a list of connection types - X : Regular, T : Tfly
@@ -415,71 +751,64 @@ class TopoBackend:
         # b: {"id": 1, connections: [(0, "X"), (3, "T")]}
         # c: {"id": 2, connections: [(0, "X"), (3, "X")]}
         # d: {"id": 3, connections: [(1, "T"), (2, "X")]}
+        # The remote chip and the connection type of every port of every chip are worked out at once.
+        # Port 14 and 15 are Tfly ports on NB for local chips, port 6 and 7 for remote chips.
+        remote_chips = port_table.remote_chip_index()
+        tfly_ports = port_table.tfly_ports(
+            [device.is_remote for device in self.devices],
+            [device.board_type for device in self.devices],
+        )
         for eth_board_info, data in chip_data.items():
-            device = data["chip_obj"]
-            chip = data["chip_obj"].as_wh()
-            connection_map_log_obj = None
-            for log_obj in log_connection_map:
-                if log_obj.eth_board_info == eth_board_info:
-                    connection_map_log_obj = log_obj
-                    break
-
-            # get fw version and collect remote_info accordingly
-            chip_eth_fw_ver = bytearray(4)
-            chip.spi_read(int(constants.ETH_FW_VERSION_ADDR), chip_eth_fw_ver)
-            chip_eth_fw_ver = int.from_bytes(chip_eth_fw_ver, "little")
-            # Go through all 16 ETH ports and read their remote chip ids (if applicable)
-            # Use those IDs to construct the vectorized representation
-            for port in range(16):
-                eth_x, eth_y = self.eth_xy_decode(port)
-                remote_type = bytearray(4)
-                chip.noc_read(
-                    0, eth_x, eth_y, constants.ETH_TEST_RESULT_REMOTE_TYPE, remote_type
-                )
-                remote_id = bytearray(4)
-                chip.noc_read(
-                    0, eth_x, eth_y, constants.ETH_TEST_RESULT_REMOTE_ID, remote_id
+            chip_id = data["id"]
+            # Every port keeps its link, the first port to a remote chip adds the connection, in port order
+            for port in np.flatnonzero(remote_chips[chip_id] >= 0):
+                chip_data.add_link(
+                    chip_id,
+                    int(port),
+                    int(remote_chips[chip_id, port]),
+                    "T" if tfly_ports[chip_id, port] else "X",
                 )
-                remote_type = int.from_bytes(remote_type, "little")
-                remote_id = int.from_bytes(remote_id, "little")
-                remote_info = f"{(remote_type << 32) | remote_id:016x}"
-
-                remote_data = chip_data.get(remote_info)
-                # If there is no remote chip, continue
-                if remote_data is None:
-                    if remote_info != "0" * 16:
-                        print(
-                            CMD_LINE_COLOR.YELLOW,
-                            "Warning: Detected an unrecognized remote chip (likely on another host). This chip will be skipped, as multi-host topologies are not supported.",
-                            CMD_LINE_COLOR.ENDC,
-                        )
-                    continue
+            log_connection_map_by_info[eth_board_info].connections = data["connections"]
 
-                # If there is a remote chip, add it to the connections list
-                # if it's not already there
-                if not any(remote_data["id"] == tup[0] for tup in data["connections"]):
-                    if (
-                        data["board_type"] in ["n300", "n150"]
-                        and port in [14, 15]
-                        and not (device.is_remote())
-                    ):
-                        # Port 14 and 16 are Tfly ports on NB for local chips
-                        data["connections"].append((remote_data["id"], "T"))
-                    elif (
-                        data["board_type"] in ["n300"]
-                        and port in [6, 7]
-                        and device.is_remote()
-                    ):
-                        # Port 6 and 7 are Tfly ports on NB for remote chips
-                        data["connections"].append((remote_data["id"], "T"))
-                    else:
-                        # All other ports are regular connections
-                        data["connections"].append((remote_data["id"], "X"))
-                connection_map_log_obj.connections = data["connections"]
+        # Both ends of every link are known once all chips are added
+        for eth_board_info, data in chip_data.items():
+            chip_id = data["id"]
+            log_connection_map_by_info[eth_board_info].links = [
+                (port, neighbor_id, neighbor_port)
+                for neighbor_id in chip_data.neighbors(chip_id)
+                for port, neighbor_port in chip_data.link_ports(chip_id, neighbor_id, inferred=False)
+                if port is not None
+            ]
 
         self.log.connection_map = log_connection_map
         return chip_data
 
+    def restore_connection_map(self, eth_board_info: List[Optional[str]], port_table):
+        """
+        Rebuild the connection map of an earlier discovery from its port table, to resume an interrupted run.
+        The devices are put back in the order of the port table rows, matched by their eth_board_info.
+
+        Returns:
+            The connection map, None if the chips on the host aren't the chips of the port table
+        """
+        devices_by_info = {}
+        for result in run_per_chip(
+            lambda device: read_local_eth_board_info(device.wh),
+            self.devices,
+            lock_key=pci_interface_key,
+        ):
+            if result.error is None and result.value is not None:
+                devices_by_info[result.value] = result.item
+        if (
+            len(eth_board_info) != port_table.num_chips
+            or len(eth_board_info) != len(self.devices)
+            or len(devices_by_info) != len(self.devices)
+            or set(devices_by_info) != set(eth_board_info)
+        ):
+            return None
+        self.devices = [devices_by_info[info] for info in eth_board_info]
+        return self.generate_connection_map(port_table=port_table)
+
     def check_num_available_connections(self, chip_data) -> int:
         """
         Given a connection map, check whether
@@ -502,23 +831,37 @@ class TopoBackend:
 
         8 chips, 10 connections.
 
+        The number of physical links between every connected pair of chips is printed as well,
+        chips linked by several cables have that much more ETH bandwidth between them.
+
         Returns: Number of connections missing, if any, else 0
         """
 
-        # Get a set of unique connections
-        connections = set()
-        for k, v in chip_data.items():
-            chip_id = v['id']
-            # Get a list of the IDs this chips is connected to
-            connected_idxs = [x[0] for x in v['connections']]
-            for idx in connected_idxs:
-                # Sort tuple to ensure uniqueness; (1, 3) and (3, 1) are the same
-                connection_tuple = tuple(sorted((chip_id, idx)))
-                connections.add(connection_tuple)
-
-        total_connections = len(connections)
+        # Get a set of unique connections, (1, 3) and (3, 1) are the same
+        total_connections = len(chip_data.edges())
         num_chips = len(chip_data)
 
+        link_counts = chip_data.link_counts()
+        if link_counts:
+            print(
+                CMD_LINE_COLOR.BLUE,
+                f"ETH links per chip pair ({sum(link_counts.values())} links): "
+                + ", ".join(f"{a}-{b} x{count}" for (a, b), count in link_counts.items()),
+                CMD_LINE_COLOR.ENDC,
+            )
+        one_sided = [
+            (a, b)
+            for a, port, b, neighbor_port in chip_data.links()
+            if port is None or neighbor_port is None
+        ]
+        if one_sided:
+            print(
+                CMD_LINE_COLOR.YELLOW,
+                "Warning: Links only reported by one end between chips "
+                + ", ".join(f"{a}-{b}" for a, b in sorted(set(one_sided))),
+                CMD_LINE_COLOR.ENDC,
+            )
+
         expected_connections = ((3 * num_chips) - 4) // 2
 
         if total_connections > expected_connections:
@@ -529,36 +872,6 @@ class TopoBackend:
             )
         return max(0, expected_connections - total_connections)
 
-    def convert_connections_to_map(self, connection_map):
-        """
-        Convert the connection map to a type agnostic adj map
-        Input example:
-        0  :  [(3, 'X'), (4, 'X'), (1, 'T')]
-        1  :  [(2, 'X'), (5, 'X'), (0, 'T')]
-        2  :  [(1, 'X'), (6, 'X'), (3, 'T')]
-        3  :  [(0, 'X'), (7, 'X'), (2, 'T')]
-        4  :  [(0, 'X'), (5, 'T')]
-        5  :  [(1, 'X'), (4, 'T')]
-        6  :  [(2, 'X'), (7, 'T')]
-        7  :  [(3, 'X'), (6, 'T')]
-        Output:
-        0: [3, 4, 1],
-        1: [2, 5, 0],
-        2: [1, 6, 3],
-        3: [0, 7, 2],
-        4: [0, 5],
-        5: [1, 4],
-        6: [2, 7],
-        7: [3, 6]
-        """
-        adj_map = {}
-        for chip_id, connections in connection_map.items():
-            adj_map[chip_id] = []
-            for conn in connections:
-                # Add the connected chip ID to the adjacency map
-                adj_map[chip_id].append(conn[0])
-        return adj_map
-
     def generate_mesh_connection_independent(self, chip_data):
         """
         Given coordinates for a fully connected mesh using BFS
@@ -569,60 +882,26 @@ class TopoBackend:
                 a. Candidate coordinates must not be already assigned to another node
                 b. Candidate coordinates cannot be negative
                 c. Candidate coordinates must be ± 1 in X or Y direction from all its neighbours
+        If the mesh can't be placed from the first corner, the next few corners are tried and then
+        a backtracking search that can move chips already placed.
         """
-        directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]  # Right, Up, Left, Down
-        connection_map = {data["id"]: data["connections"] for data in chip_data.values()}
-        adjacency_map = self.convert_connections_to_map(connection_map)
-        for node in adjacency_map:
-            if len(adjacency_map[node]) == 2:
-                start_node = node
-                break
-        coordinates = {start_node: (0, 0)}
-        visited = {start_node}
-        queue = deque([start_node])
+        from tt_topology.mesh_embed import embed_mesh
 
-        # BFS
-        while queue:
-            u = queue.popleft()
-            for v in adjacency_map[u]:
-                if v not in visited:
-                    for dx, dy in directions:
-                        candidate_coord = (coordinates[u][0] + dx, coordinates[u][1] + dy)
-                        compliant = True  # Assume the candidate coordinates are compliant
-                        # Check if the candidate coord is already assigned to another node
-                        if candidate_coord in coordinates.values():
-                            compliant = False
-                            continue
-                        # Check if the candidate coord is compliant with all its neighbours
-                        for neighbor in adjacency_map[v]:
-                            # If the neighbor has coordinates assigned, check consistency
-                            if neighbor in coordinates:
-                                nx, ny = coordinates[neighbor]
-                                if not ((abs(nx - candidate_coord[0]) == 1 and ny == candidate_coord[1]) or \
-                                        (abs(ny - candidate_coord[1]) == 1 and nx == candidate_coord[0])):
-                                    compliant = False
-                                    break
-                        # Ensure coordinates never go into the negative
-                        if candidate_coord[0] < 0 or candidate_coord[1] < 0:
-                            compliant = False
-
-                        # We found a suitable candidate coordinate
-                        if compliant:
-                            coordinates[v] = candidate_coord
-                            visited.add(v)
-                            queue.append(v)
-                            break
-                    else:
-                        # If we exit the for loop without breaking, it means we couldn't find a compliant coordinate
-                        print(
-                        CMD_LINE_COLOR.RED,
-                        f"Could not assign compliant coordinates to node {v} from node {u} with candidate {candidate_coord}",
-                        "Not a true mesh, exiting to avoid flashing wrong coords....",
-                        CMD_LINE_COLOR.ENDC,
-                        sys.exit(1)
-                    )
-        self.log.coordinate_map = coordinates
-        return coordinates
+        embedding = embed_mesh(chip_data.adjacency())
+        if not embedding.ok:
+            if embedding.failed_chip is not None:
+                failure = f"Could not assign compliant coordinates to node {embedding.failed_chip} from node {embedding.parent_chip}: {embedding.reason}."
+            else:
+                failure = f"Could not assign mesh coordinates: {embedding.reason}."
+            print(
+                CMD_LINE_COLOR.RED,
+                failure,
+                "Not a true mesh, exiting to avoid flashing wrong coords....",
+                CMD_LINE_COLOR.ENDC,
+            )
+            sys.exit(1)
+        self.log.coordinate_map = embedding.coordinates
+        return embedding.coordinates
 
     def apply_mesh_v2_coordinates(self):
         """
@@ -663,10 +942,10 @@ class TopoBackend:
         Returns:
             map - {chip_idx: (x_coord, y_coord), ...}
         """
-        adjacency_map = {data["id"]: data["connections"] for data in chip_data.values()}
+        adjacency_map = chip_data.connection_map()
         coordinates = {}
         visited = set()
-        chip_l_or_r = ["R" if chip.is_remote() else "L" for chip in self.devices]
+        chip_l_or_r = [chip.side for chip in self.devices]
 
         for chip in adjacency_map:
             if len(adjacency_map[chip]) == 2:
@@ -730,41 +1009,22 @@ class TopoBackend:
     def generate_coordinates_torus_or_linear(self, chip_data):
         """
         Generate coordinates for torus/linear topology
-        Look for the first cycle in the graph and assign coordinates to it
+        Look for a ring through every chip and assign coordinates to it
         In both cases the coordinates are the same.
 
         Returns:
             map - {chip_idx: (x_coord, y_coord), ...}
         """
+        from tt_topology.ring_solver import find_hamiltonian_cycle
 
         # Only taking the index from chip data, since the connection type is irrelevant
-        adjacency_map = {
-            data["id"]: [index[0] for index in data["connections"]]
-            for data in chip_data.values()
-        }
-        G = nx.Graph(adjacency_map)
-        # Generate a list of cycles
-        try:
-            cycle_list = nx.simple_cycles(G)
-        except Exception as e:
-            print(
-                CMD_LINE_COLOR.RED,
-                "No cycles detected!",
-                e,
-                CMD_LINE_COLOR.ENDC,
-            )
-
-        torus_cycle = []
-
-        for i in cycle_list:
-            if len(i) == len(G.nodes):
-                # Take the first viable cycle
-                torus_cycle = i
-                break
+        adjacency_map = chip_data.adjacency()
+        ring = find_hamiltonian_cycle(adjacency_map)
+        torus_cycle = ring.cycle
         if torus_cycle == []:
             print(
                 ORANGE,
-                "Warning: No cycle detected - cannot do a torus layout, going to try longest simple path instead for linear layout.",
+                f"Warning: No cycle detected ({ring.reason}) - cannot do a torus layout, going to try longest simple path instead for linear layout.",
                 CMD_LINE_COLOR.ENDC,
             )
             torus_cycle = self.find_longest_simple_path(adjacency_map)
@@ -786,43 +1046,21 @@ class TopoBackend:
 
     def find_longest_simple_path(self, adj_list):
         """
-        Given an adj_list, find the longest simple path using DFS. For linear layouts that don't have a cycle.
+        Given an adj_list, find the longest simple path. For linear layouts that don't have a cycle.
 
         Returns:
             List of nodes in order of the longest simple path found.
         """
+        from tt_topology.ring_solver import find_longest_path, TIMEOUT
 
-        G = nx.Graph()
-        for node, neighbors in adj_list.items():
-            for neighbor in neighbors:
-                G.add_edge(node, neighbor)
-
-        # DFS to find the longest simple path
-        def dfs(node, visited, path):
-            nonlocal max_path
-            visited.add(node)
-            path.append(node)
-
-            # Update max_path if current path is longer
-            if len(path) > len(max_path):
-                max_path = list(path)
-
-            # Explore neighbors
-            for neighbor in G.neighbors(node):
-                if neighbor not in visited:
-                    dfs(neighbor, visited, path)
-
-            # Backtrack
-            path.pop()
-            visited.remove(node)
-
-        # Try DFS from each node - store max_path found so far
-        max_path = []
-        nodes = list(G.nodes())
-
-        for start_node in nodes:
-            dfs(start_node, set(), [])
-
+        longest = find_longest_path(adj_list)
+        max_path = longest.path
+        if longest.status == TIMEOUT:
+            print(
+                ORANGE,
+                "Warning: Search for the longest simple path ran out of time, using the longest path found so far.",
+                CMD_LINE_COLOR.ENDC,
+            )
         print(
             CMD_LINE_COLOR.YELLOW,
             "Longest simple path:",
@@ -831,211 +1069,286 @@ class TopoBackend:
         )
         return max_path
 
-    def flash_n300_multihost(self, chip_data, coord_map):
+    def get_plan_labeling(self, chip_data):
         """
-        Flash n300 boards in a multi-host configuration.
-        Will only be applied if there are 4 n300 boards aka 8 WH n300 chips.
+        Canonical labeling of the link graph, see plan_cache.canonical_labeling
         """
-        # We need 8 chips and all of type n300
-        n300_chips = [data for data in chip_data.values() if data["board_type"] == "n300"]
-        if len(n300_chips) != 8 or self.layout != "mesh":
-            # Not a multi-host n300 configuration
-            return
-        else:
-            print(
-                CMD_LINE_COLOR.YELLOW,
-                "Detected 8 n300 boards, applying multi-host n300 flashing procedure",
-                CMD_LINE_COLOR.ENDC,
-            )
-            # Apply the multi-host n300 flashing procedure
-            # coords 1,0 and 2,0 are flashed the same
-            # coords 1,1 and 2,1 are flashed the same
-
-            for cid, coord in coord_map.items():
-                if coord == (1, 0) or coord == (2, 0):
-                    for _, data in chip_data.items():
-                        if data["id"] == cid:
-                            curr_flash_data = data
-                            break
-                    chip_to_flash = curr_flash_data["chip_obj"]
-                    # flash eth coordinate check disable.
-                    chip_to_flash.as_wh().spi_write(
-                        int(constants.ETH_PARAM_COORD_CHECK_DISABLE),
-                        int(0x0).to_bytes(4, byteorder="little"),
-                    )
-                    # flash eth routing disable left.
-                    chip_to_flash.as_wh().spi_write(
-                        int(constants.ETH_PARAM_ROUTING_DISABLE),
-                        int(0xC002).to_bytes(4, byteorder="little"),
-                    )
-                    # flash eth routing disable right.
-                    chip_to_flash.as_wh().spi_write(
-                        int(constants.ETH_PARAM_ROUTING_DISABLE + constants.ETH_PARAM_RIGHT_OFFSET),
-                        int(0x02).to_bytes(4, byteorder="little"),
-                    )
-                    # L2R copy
-                    try:
-                        chip_to_flash.as_wh().arc_msg(
-                            init_fw_defines("wormhole", "tt_topology")[
-                                "MSG_TRIGGER_SPI_COPY_LtoR"
-                            ],
-                            wait_for_done=True,
-                            arg0=0,
-                            arg1=0,
-                            timeout=5,
-                        )
-                    except Exception as e:
-                        print(
-                            CMD_LINE_COLOR.RED,
-                            "Failed to trigger L2R copy on chip:",
-                            curr_flash_data,
-                            CMD_LINE_COLOR.ENDC,
-                        )
-
-                elif coord == (1, 1) or coord == (2, 1):
-                    for _, data in chip_data.items():
-                        if data["id"] == cid:
-                            curr_flash_data = data
-                            break
-                    chip_to_flash = curr_flash_data["chip_obj"]
-                    # flash eth coordinate check disable.
-                    chip_to_flash.as_wh().spi_write(
-                        int(constants.ETH_PARAM_COORD_CHECK_DISABLE),
-                        int(0x0).to_bytes(4, byteorder="little"),
-                    )
-                    # flash eth routing disable left.
-                    chip_to_flash.as_wh().spi_write(
-                        int(constants.ETH_PARAM_ROUTING_DISABLE),
-                        int(0x302).to_bytes(4, byteorder="little"),
-                    )
-                    # flash eth routing disable right.
-                    chip_to_flash.as_wh().spi_write(
-                        int(constants.ETH_PARAM_ROUTING_DISABLE + constants.ETH_PARAM_RIGHT_OFFSET),
-                        int(0x02).to_bytes(4, byteorder="little"),
-                    )
-                    # L2R copy
-                    try:
-                        chip_to_flash.as_wh().arc_msg(
-                            init_fw_defines("wormhole", "tt_topology")[
-                                "MSG_TRIGGER_SPI_COPY_LtoR"
-                            ],
-                            wait_for_done=True,
-                            arg0=0,
-                            arg1=0,
-                            timeout=5,
-                        )
-                    except Exception as e:
-                        print(
-                            CMD_LINE_COLOR.RED,
-                            "Failed to trigger L2R copy on chip:",
-                            curr_flash_data,
-                            CMD_LINE_COLOR.ENDC,
-                        )
-            print(
-                CMD_LINE_COLOR.BLUE,
-                "Completed multi-host n300 setup",
-                CMD_LINE_COLOR.ENDC,
-            )
-        return
+        if self.plan_labeling is None or self.plan_labeling[0] is not chip_data:
+            self.plan_labeling = (chip_data, canonical_labeling(chip_data))
+        return self.plan_labeling[1]
 
-    def flash_n300_multihost_v2(self, chip_data, coord_map):
+    def plan_port_disables(self, chip_data, coord_map) -> Dict[int, int]:
         """
-        Flash n300 boards in a multi-host configuration with mesh_v2 topology.
-        Will only be applied if there are 4 n300 boards aka 8 WH n300 chips.
-
-        Key differences in the mesh_v2 multihost config:
-        - Inter-mesh programming @0x2114c is swapped between PCI:2 and PCI:3
+        Port disable of every chip the coordinate flash would write, {chip id: port disable}
         """
-        # We need 8 chips and all of type n300
-        n300_chips = [data for data in chip_data.values() if data["board_type"] == "n300"]
-        if len(n300_chips) != 8 or self.layout != "mesh_v2":
-            # Not a multi-host n300 configuration
-            return
+        _, chip_params, _ = self.plan_coord_flash(chip_data, coord_map)
+        return {data["id"]: port_disable for data, _, _, port_disable in chip_params}
 
-        @dataclass
-        class EthParams:
-            coord_check_disable: int
-            routing_disable_left: int
-            routing_disable_right: int
-
-        eth_param_vals = {
-            0: EthParams(0x0, 0xc002, 0x02),  # PCI:0
-            1: EthParams(0x0, 0x302, 0x02),   # PCI:1
-            2: EthParams(0x0, 0xc002, 0x02),  # PCI:2
-            3: EthParams(0x0, 0x302, 0x02),   # PCI:3
-        }
+    def load_cached_plan(self, chip_data) -> Optional[dict]:
+        """
+        Look up the coordinates of the link graph in the plan cache.
+        A cached plan is only used if the live links still hold every link it relies on and the live
+        port tables give the port disables it was stored with, otherwise it is evicted.
 
+        Returns:
+            map - {chip_idx: (x_coord, y_coord), ...}, None if there is no usable cached plan
+        """
+        if self.plan_cache is None or self.layout not in ["linear", "torus", "mesh"]:
+            return None
+        labeling = self.get_plan_labeling(chip_data)
+        if labeling is None:
+            return None
+        fingerprint, order = labeling
+        entry = self.plan_cache.lookup(self.layout, fingerprint)
+        if entry is None:
+            return None
+        try:
+            coord_map = {order[position]: (x, y) for position, x, y in entry["coordinates"]}
+            port_disables = {order[position]: value for position, value in entry["port_disables"]}
+            usable = (
+                len(coord_map) == len(entry["coordinates"])
+                and self.is_valid_plan(chip_data, coord_map)
+                and self.plan_port_disables(chip_data, coord_map) == port_disables
+            )
+        except (IndexError, KeyError, TypeError, ValueError):
+            usable = False
+        if not usable:
+            self.plan_cache.evict(self.layout, fingerprint)
+            return None
         print(
-            CMD_LINE_COLOR.YELLOW,
-            "Detected 4 n300 boards, applying multi-host n300 mesh_v2 flashing procedure",
+            CMD_LINE_COLOR.GREEN,
+            f"Using the cached {self.layout} coordinates of this link graph.",
             CMD_LINE_COLOR.ENDC,
         )
-        # Only flash chips with valid PCI indices (0, 1, 2, 3)
-        valid_pci_indices = [0, 1, 2, 3]
+        self.log.coordinate_map = coord_map
+        return coord_map
 
-        # Apply mesh_v2 programming based on PCI index
-        for _, curr_chip_data in chip_data.items():
-            pci_index = curr_chip_data["id"]
-            if pci_index not in valid_pci_indices:
-                continue
+    def save_cached_plan(self, chip_data, coord_map):
+        """
+        Store the coordinates and port disables worked out for the link graph in the plan cache
+        """
+        if self.plan_cache is None or self.layout not in ["linear", "torus", "mesh"]:
+            return
+        labeling = self.get_plan_labeling(chip_data)
+        if labeling is None:
+            return
+        fingerprint, order = labeling
+        position = {chip_id: idx for idx, chip_id in enumerate(order)}
+        try:
+            self.plan_cache.store(
+                self.layout,
+                fingerprint,
+                [(position[chip_id], x, y) for chip_id, (x, y) in coord_map.items()],
+                [
+                    (position[chip_id], port_disable)
+                    for chip_id, port_disable in self.plan_port_disables(chip_data, coord_map).items()
+                ],
+            )
+        except OSError as e:
+            print(
+                ORANGE,
+                f"Warning: Could not store the coordinate plan in {self.plan_cache.folder}: {e}",
+                CMD_LINE_COLOR.ENDC,
+            )
+
+    def is_valid_plan(self, chip_data, coord_map) -> bool:
+        """
+        Check the links a coordinate plan relies on are in chip_data.
+        Unlike is_valid_layout, a plan doesn't have to cover every chip or close the torus ring,
+        so the plans of degraded link graphs, ex: a torus that fell back to the longest line, pass.
+        """
+        adjacency = chip_data.neighbor_sets()
+        coords = list(coord_map.values())
+        if not coords or not set(coord_map) <= set(adjacency) or len(set(coords)) != len(coords):
+            return False
+
+        if self.layout in ["linear", "torus"]:
+            ring = list(coord_map.keys())
+            if coords != [(0, idx) for idx in range(len(ring))]:
+                return False
+            return all(b in adjacency[a] for a, b in zip(ring, ring[1:]))
+        elif self.layout == "mesh":
+            # Every link between placed chips has to join chips that are next to each other on the grid
+            for a, (ax, ay) in coord_map.items():
+                for b in adjacency[a]:
+                    if b in coord_map:
+                        bx, by = coord_map[b]
+                        if abs(ax - bx) + abs(ay - by) != 1:
+                            return False
+            return min(x for x, _ in coords) == 0 and min(y for _, y in coords) == 0
+        return False
+
+    def is_valid_layout(self, chip_data, coord_map) -> bool:
+        """
+        Check whether a coordinate map is a valid layout of the requested type for the links in chip_data.
+        For linear/torus the coordinate map has to be in ring order.
+        """
+        adjacency = chip_data.neighbor_sets()
+        coords = list(coord_map.values())
+        if set(coord_map.keys()) != set(adjacency.keys()) or len(set(coords)) != len(coords):
+            return False
+
+        if self.layout in ["linear", "torus"]:
+            ring = list(coord_map.keys())
+            if coords != [(0, idx) for idx in range(len(ring))]:
+                return False
+            links = list(zip(ring, ring[1:]))
+            if self.layout == "torus":
+                links.append((ring[-1], ring[0]))
+            return all(b in adjacency[a] for a, b in links)
+        elif self.layout == "mesh":
+            # Every link has to join chips that are next to each other on the grid
+            for a, neighbours in adjacency.items():
+                for b in neighbours:
+                    (ax, ay), (bx, by) = coord_map[a], coord_map[b]
+                    if abs(ax - bx) + abs(ay - by) != 1:
+                        return False
+            if min(x for x, _ in coords) != 0 or min(y for _, y in coords) != 0:
+                return False
+            return self.check_num_available_connections(chip_data) == 0
+        elif self.layout == "mesh_v2":
+            return coord_map == self.apply_mesh_v2_coordinates()
+        return False
+
+    def is_flashed(self, chip_data, coord_map) -> bool:
+        """
+        Check whether the SPI of every chip already holds the params that would be flashed for a coordinate map
+        """
+        boards, _, _ = self.plan_coord_flash(chip_data, coord_map)
+        expected = [
+            (board["data"]["chip_obj"], board["writes"]) for board in boards.values()
+        ]
+        for result in run_per_chip(
+            self.get_param_table,
+            [device for device, _ in expected],
+            lock_key=pci_interface_key,
+        ):
+            if result.error is not None:
+                return False
+        for device, writes in expected:
+            param_table = self.get_param_table(device)
+            for field, right, value in writes:
+                if param_table.get(field, right=right) != value:
+                    return False
+        return True
+
+    def check_current_layout(self) -> bool:
+        """
+        Pre-flight check to see if the host is already running the requested layout, if so there is nothing to flash.
+        Detects all chips (including remote) and builds the live connection map, then checks that
+            1. The coordinates the chips are running with are a valid layout for the live links
+            2. The coordinates, port disables and multi-host params in the SPI match what would be flashed
+        If the check fails the backend is left with the local devices it started with.
+
+        Returns:
+            True if the host is already in the requested layout
+        """
+        if self.layout not in ["linear", "torus", "mesh", "mesh_v2"]:
+            return False
 
-            chip_to_flash = curr_chip_data["chip_obj"].as_wh()
+        local_devices = self.devices
 
+        def check_failed(reason):
             print(
-                CMD_LINE_COLOR.BLUE,
-                f"Enabling multi-host mesh_v2 on PCI:{pci_index}",
+                ORANGE,
+                f"Warning: Could not check the current layout, {reason}",
                 CMD_LINE_COLOR.ENDC,
             )
+            self.devices = local_devices
+            return False
 
-            params = eth_param_vals[pci_index]
-            # flash eth coordinate check disable
-            chip_to_flash.spi_write(
-                int(constants.ETH_PARAM_COORD_CHECK_DISABLE),
-                int(params.coord_check_disable).to_bytes(4, byteorder="little"),
-            )
-            # flash eth routing disable left
-            chip_to_flash.spi_write(
-                int(constants.ETH_PARAM_ROUTING_DISABLE),
-                int(params.routing_disable_left).to_bytes(4, byteorder="little"),
-            )
-            # flash eth routing disable right
-            chip_to_flash.spi_write(
-                int(constants.ETH_PARAM_ROUTING_DISABLE + constants.ETH_PARAM_RIGHT_OFFSET),
-                int(params.routing_disable_right).to_bytes(4, byteorder="little"),
+        # pyluwen reports failed detections and reads as plain exceptions
+        try:
+            devices = self.registry.enumerate()
+        except Exception as e:
+            return check_failed(f"chip detection failed: {e}")
+        # Remote chips that didn't come up mean the links aren't trained, n300 boards have an R chip
+        # behind every local chip
+        if len(devices) < len(local_devices) * 2:
+            return check_failed(
+                f"detected {len(devices)} chips, expecting {len(local_devices) * 2}"
             )
-            # L2R copy
-            try:
-                chip_to_flash.arc_msg(
-                    init_fw_defines("wormhole", "tt_topology")[
-                        "MSG_TRIGGER_SPI_COPY_LtoR"
-                    ],
-                    wait_for_done=True,
-                    arg0=0,
-                    arg1=0,
-                    timeout=5,
-                )
-            except Exception as e:
-                print(
-                    CMD_LINE_COLOR.RED,
-                    "Failed to trigger L2R copy on chip:",
-                    curr_chip_data,
-                    CMD_LINE_COLOR.ENDC,
-                )
 
-        print(
-            CMD_LINE_COLOR.BLUE,
-            "Completed multi-host n300 mesh_v2 setup",
-            CMD_LINE_COLOR.ENDC,
+        self.devices = devices
+        try:
+            chip_data = self.generate_connection_map()
+            # All chips need to report their eth info to be part of the live link graph
+            if None in chip_data:
+                return check_failed("not every chip reports its eth board info")
+            current_coords = {}
+            for data in chip_data.values():
+                coord = data["chip_obj"].wh.get_local_coord()
+                current_coords[data["id"]] = (coord.shelf_x, coord.shelf_y)
+        except Exception as e:
+            return check_failed(f"reading the chips failed: {e}")
+        if self.layout in ["linear", "torus"]:
+            # The ring order is the order of the y coordinates
+            current_coords = dict(sorted(current_coords.items(), key=lambda item: item[1][1]))
+        in_layout = self.is_valid_layout(chip_data, current_coords) and self.is_flashed(
+            chip_data, current_coords
         )
-        return
 
-    def flash_to_specified_state(self, chip_data, coord_map):
-        """Given the chips and the coordinates assigned to them, flash the boards with the correct port disables anc coordinates"""
+        if in_layout:
+            self.log.coordinate_map = current_coords
+        else:
+            self.devices = local_devices
+        return in_layout
+
+    def get_multihost_params(self, chip_data, coord_map):
+        """
+        Work out the multi-host eth params of a 4 n300 board (8 WH n300 chips) mesh or mesh_v2 host.
+
+        Returns:
+            [(chip data, EthParams), ...], empty if this isn't a multi-host n300 configuration
+        """
+        # We need 8 chips and all of type n300
+        n300_chips = [data for data in chip_data.values() if data["board_type"] == "n300"]
+        if len(n300_chips) != 8 or self.layout not in ["mesh", "mesh_v2"]:
+            # Not a multi-host n300 configuration
+            return []
+
+        multihost_params = []
+        if self.layout == "mesh":
+            # coords 1,0 and 2,0 are flashed the same
+            # coords 1,1 and 2,1 are flashed the same
+            for cid, coord in coord_map.items():
+                if coord == (1, 0) or coord == (2, 0):
+                    multihost_params.append((chip_data.chip(cid), EthParams(0x0, 0xC002, 0x02)))
+                elif coord == (1, 1) or coord == (2, 1):
+                    multihost_params.append((chip_data.chip(cid), EthParams(0x0, 0x302, 0x02)))
+        else:
+            # Inter-mesh programming @0x2114c is swapped between PCI:2 and PCI:3
+            eth_param_vals = {
+                0: EthParams(0x0, 0xc002, 0x02),  # PCI:0
+                1: EthParams(0x0, 0x302, 0x02),   # PCI:1
+                2: EthParams(0x0, 0xc002, 0x02),  # PCI:2
+                3: EthParams(0x0, 0x302, 0x02),   # PCI:3
+            }
+            # Only flash chips with valid PCI indices (0, 1, 2, 3)
+            for data in chip_data.values():
+                if data["id"] in eth_param_vals:
+                    multihost_params.append((data, eth_param_vals[data["id"]]))
+        return multihost_params
+
+    def plan_coord_flash(self, chip_data, coord_map):
+        """
+        Work out every param the coordinate flash writes: the coordinate and port disable params of
+        every chip in the coordinate map and, on multi-host n300 hosts, the multi-host params.
+        The multi-host params only depend on the coordinates, so they go out in the same flash and reset.
+        All chips of a board are flashed through its local chip, remote chips use the R params.
+
+        Returns:
+            boards - {pci_interface: {"data": local chip data, "writes": [(field, right, value), ...]}}
+            chip_params - [(chip data, right, (x, y), port_disable), ...] in coordinate map order
+            multihost_params - [(chip data, EthParams), ...], see get_multihost_params
+        """
         connection_type = self.layout
 
+        cycle = list(coord_map.keys())
+        cycle_index = {chip_id: idx for idx, chip_id in enumerate(cycle)}
+
         def get_adj_chips(cid, connection_type):
-            cycle = list(coord_map.keys())
-            idx = cycle.index(cid)
+            idx = cycle_index[cid]
 
             if connection_type == "torus":
                 next_chip = cycle[(idx + 1) % len(cycle)]
@@ -1045,84 +1358,120 @@ class TopoBackend:
                 prev_chip = cycle[idx - 1] if idx > 0 else None
             return [prev_chip, next_chip]
 
+        if connection_type not in ["mesh", "mesh_v2"]:
+            import numpy as np
+
+            # Work out the ports of every chip that go to its previous or next chip in one go,
+            # from the remote chip ids of all 16 ETH ports already read during discovery
+            port_table = chip_data.port_table
+            ring_neighbors = np.zeros((port_table.num_chips, port_table.num_chips), dtype=bool)
+            for cid in cycle:
+                adj_chips = [adj for adj in get_adj_chips(cid, connection_type) if adj is not None]
+                ring_neighbors[cid, adj_chips] = True
+            ring_ports = port_table.port_mask(port_table.ports_to(ring_neighbors))
+
+        boards = {}
+        for _, data in chip_data.items():
+            if not data["chip_obj"].is_remote:
+                boards[pci_interface_key(data["chip_obj"])] = {
+                    "data": data,
+                    "writes": [],
+                }
+        chip_params = []
+
         for cid, coord in coord_map.items():
             x, y = coord
 
-            for _, data in chip_data.items():
-                if data["id"] == cid:
-                    curr_flash_data = data
-                    break
+            curr_flash_data = chip_data.chip(cid)
 
             chip_to_flash = curr_flash_data["chip_obj"]
             if curr_flash_data["board_type"] in ["n300", "n150"] and not (
-                chip_to_flash.is_remote()
+                chip_to_flash.is_remote
             ):
-                coord_addr = constants.ETH_PARAM_CHIP_COORD
-                port_disable_addr = constants.ETH_PARAM_PORT_DISABLE
+                right = False
 
-            elif chip_to_flash.is_remote():
-                remote_chip_board_id = curr_flash_data["board_id"]
+            elif chip_to_flash.is_remote:
                 # find the local chip to the remote chip
-                for _, data in chip_data.items():
-                    if data["board_id"] == remote_chip_board_id and (
-                        not data["chip_obj"].is_remote()
-                    ):
-                        chip_to_flash = data["chip_obj"]
-                        break
-
-                coord_addr = (
-                    constants.ETH_PARAM_CHIP_COORD + constants.ETH_PARAM_RIGHT_OFFSET
-                )
-                port_disable_addr = (
-                    constants.ETH_PARAM_PORT_DISABLE + constants.ETH_PARAM_RIGHT_OFFSET
-                )
+                local_data = chip_data.local_chip(curr_flash_data)
+                if local_data is not None:
+                    chip_to_flash = local_data["chip_obj"]
+
+                right = True
             else:
                 raise Exception("UNEXPECTED CHIP TYPE!")
 
             # Port disables:
             # 1. if it's a mesh, then don't disable anything
             # 2. if it's a torus or line, then disable the ports that aren't connected to the previous and next chip
-            chip_to_flash = chip_to_flash.as_wh()
             if connection_type in ["mesh", "mesh_v2"]:
                 port_disable = 0x0
             else:
-                port_disable = 0xFFFF
-
-                # Get the adjacent chips
-                adj_chips = get_adj_chips(cid, connection_type)
-
-                # Go through all 16 ETH ports and read their remote chip ids (if applicable)
-                # See if those IDs are in the list of adjacent chips
-                for port in range(16):
-                    eth_x, eth_y = self.eth_xy_decode(port)
-
-                    # Read the remote type and idq
-                    remote_type = bytearray(4)
-                    curr_flash_data["chip_obj"].noc_read(
-                        0,
-                        eth_x,
-                        eth_y,
-                        constants.ETH_TEST_RESULT_REMOTE_TYPE,
-                        remote_type,
-                    )
-                    remote_id = bytearray(4)
-                    curr_flash_data["chip_obj"].noc_read(
-                        0, eth_x, eth_y, constants.ETH_TEST_RESULT_REMOTE_ID, remote_id
-                    )
-                    remote_type = int.from_bytes(remote_type, "little")
-                    remote_id = int.from_bytes(remote_id, "little")
-                    remote_info = f"{(remote_type << 32) | remote_id:016x}"
+                # Keep the ports to the adjacent chips enabled
+                port_disable = 0xFFFF & ~int(ring_ports[cid])
+
+            # TODO: make sure local chips are getting flashed twice correctly
 
-                    # If there is no remote chip, continue
-                    if remote_info == "0" * 16:
-                        continue
+            boards[pci_interface_key(chip_to_flash)]["writes"] += [
+                ("CHIP_COORD", right, (y << 8) | x),
+                ("PORT_DISABLE", right, port_disable & 0xFFFF),
+            ]
+            chip_params.append((curr_flash_data, right, (x, y), port_disable))
 
-                    # If the remote chip is an adjacent chip, then don't disable the port
-                    remote_data = chip_data[remote_info]
-                    if remote_data["id"] in adj_chips:
-                        port_disable &= ~(1 << port)
+        multihost_params = self.get_multihost_params(chip_data, coord_map)
+        for curr_flash_data, params in multihost_params:
+            # The multi-host params cover both chips of the board, they are written through its local chip
+            local_data = chip_data.local_chip(curr_flash_data) or curr_flash_data
+            boards[pci_interface_key(local_data["chip_obj"])]["writes"] += params.writes()
+        return boards, chip_params, multihost_params
+
+    def count_expected_links(self, chip_data, chip_params):
+        """
+        Number of ETH ports expected to train once the coordinate flash is applied:
+        the ports connected during discovery that are not disabled
+        """
+        import numpy as np
+        from tt_topology.port_table import PORT_BITS
 
-            # Flash the coord and port disable
+        if not chip_params:
+            return 0
+        chip_ids = [curr_flash_data["id"] for curr_flash_data, _, _, _ in chip_params]
+        port_disables = np.array([port_disable for _, _, _, port_disable in chip_params])
+        enabled = (port_disables[:, None] & PORT_BITS) == 0
+        return int((chip_data.port_table.connected()[chip_ids] & enabled).sum())
+
+    def flash_to_specified_state(self, chip_data, coord_map):
+        """
+        Given the chips and the coordinates assigned to them, flash the boards with the correct port disables and coordinates.
+        Multi-host n300 hosts (4 n300 boards aka 8 WH n300 chips in a mesh or mesh_v2 layout) get their
+        multi-host params in the same flash.
+        """
+        # Collect the writes for every board first, then flash
+        boards, chip_params, multihost_params = self.plan_coord_flash(chip_data, coord_map)
+        self.expected_links = self.count_expected_links(chip_data, chip_params)
+
+        if multihost_params:
+            if self.layout == "mesh_v2":
+                print(
+                    CMD_LINE_COLOR.YELLOW,
+                    "Detected 4 n300 boards, applying multi-host n300 mesh_v2 flashing procedure",
+                    CMD_LINE_COLOR.ENDC,
+                )
+                for data, _ in multihost_params:
+                    print(
+                        CMD_LINE_COLOR.BLUE,
+                        f"Enabling multi-host mesh_v2 on PCI:{data['id']}",
+                        CMD_LINE_COLOR.ENDC,
+                    )
+            else:
+                print(
+                    CMD_LINE_COLOR.YELLOW,
+                    "Detected 8 n300 boards, applying multi-host n300 flashing procedure",
+                    CMD_LINE_COLOR.ENDC,
+                )
+
+        for curr_flash_data, right, (x, y), port_disable in chip_params:
+            coord_addr = param_addr("CHIP_COORD", right)
+            port_disable_addr = param_addr("PORT_DISABLE", right)
             print(
                 CMD_LINE_COLOR.BLUE,
                 f"Flashing {curr_flash_data['board_type']} - {curr_flash_data['board_id']} coord address : 0x{coord_addr:08x} to {x}, {y}",
@@ -1135,65 +1484,83 @@ class TopoBackend:
             )
             print()
 
-            # TODO: make sure local chips are getting flashed twice correctly
-
-            chip_to_flash.spi_write(coord_addr, bytearray([x, y, 0x0, 0x0]))
-            chip_to_flash.spi_write(
-                port_disable_addr,
-                bytearray([port_disable & 0xFF, (port_disable >> 8) & 0xFF, 0x0, 0x0]),
-            )
-            readback_local = bytearray(4)
-            readback_remote = bytearray(4)
-            chip_to_flash.spi_read(coord_addr, readback_local)
-            chip_to_flash.spi_read(
-                port_disable_addr,
-                readback_remote,
-            )
-        # Perform LtoR copies for nebula x2 left chips
-        for _, data in chip_data.items():
+        # Flash all the boards in parallel, then report in chip order
+        results = run_per_chip(self.flash_board_writes, list(boards.values()))
+        copy_errors = self.copy_l_to_r()
+        for result in results:
+            data = result.item["data"]
             board_id = data["board_id"]
-            # If the chip is a nebula x2, perform the LtoR copy
-            if data["board_type"] == "n300" and not data["chip_obj"].is_remote():
-                try:
-                    data["chip_obj"].arc_msg(
-                        init_fw_defines("wormhole", "tt_topology")[
-                            "MSG_TRIGGER_SPI_COPY_LtoR"
-                        ],
-                        wait_for_done=True,
-                        arg0=0,
-                        arg1=0,
-                        timeout=5,
+            # If the chip is a nebula x2, the LtoR copy was performed
+            if data["board_type"] == "n300":
+                if result.error is not None:
+                    print(
+                        CMD_LINE_COLOR.RED,
+                        f"Something went wrong with coord flash for chip {board_id}!!\nError: {result.error}",
+                        CMD_LINE_COLOR.ENDC,
                     )
-                except Exception as e:
+                    sys.exit(1)
+                copy_error = copy_errors.get(pci_interface_key(data["chip_obj"]))
+                if copy_error is not None:
                     print(
                         CMD_LINE_COLOR.RED,
-                        f"Something went wrong with L to R copy for chip {board_id}!!\nError: {e}",
+                        f"Something went wrong with L to R copy for chip {board_id}!!\nError: {copy_error}",
                         CMD_LINE_COLOR.ENDC,
                     )
                     sys.exit(1)
-                print(
-                    CMD_LINE_COLOR.GREEN,
-                    f"Completed coord flash for board {board_id}",
-                    CMD_LINE_COLOR.ENDC,
-                )
+                if result.value:
+                    print(
+                        CMD_LINE_COLOR.GREEN,
+                        f"Completed coord flash for board {board_id}",
+                        CMD_LINE_COLOR.ENDC,
+                    )
+                else:
+                    print(
+                        CMD_LINE_COLOR.GREEN,
+                        f"Board {board_id} already has these coords, skipped flash",
+                        CMD_LINE_COLOR.ENDC,
+                    )
+            elif result.error is not None:
+                raise result.error
+
+        if multihost_params:
+            suffix = " mesh_v2" if self.layout == "mesh_v2" else ""
+            print(
+                CMD_LINE_COLOR.BLUE,
+                f"Completed multi-host n300{suffix} setup",
+                CMD_LINE_COLOR.ENDC,
+            )
+
+    def flash_board_writes(self, board):
+        """
+        Write the params collected for a single board to its param table.
+        Queue the LtoR copy afterwards if the board is a nebula x2.
+
+        Returns:
+            True if the board was flashed, False if its SPI already held every value
+        """
+        data = board["data"]
+        param_table = self.get_param_table(data["chip_obj"])
+        for field, right, value in board["writes"]:
+            param_table.set(field, value, right=right)
+        return self.commit_param_table(
+            data["chip_obj"], param_table, l_to_r_copy=data["board_type"] == "n300"
+        )
 
     def graph_visualization(self, chip_data, coordinates):
         """
         Visualize the graph
         """
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
         # Create a directed graph
-        graph = {
-            data["id"]: [index[0] for index in data["connections"]]
-            for data in chip_data.values()
-        }
-        G = nx.DiGraph(graph)
+        G = nx.DiGraph(chip_data.adjacency())
 
         # Visualize graph components
         labels = {node: None for node in G.nodes()}
         for i, chip in enumerate(chip_data):
             board_id = str(chip_data[chip]["board_id"])
-            pos_suffix = " R" if chip_data[chip]["chip_obj"].is_remote() else " L"
-            board_type = chip_data[chip]["board_type"] + pos_suffix
+            board_type = f"{chip_data[chip]['board_type']} {chip_data[chip]['chip_obj'].side}"
             board_id = f"{board_id[8:10]}-{board_id[10:12]}-{board_id[12:15]}"
             index = chip_data[chip]["id"]
             labels[index] = f"{board_type}\n{board_id}\n{index} : {coordinates[i]}"
@@ -1250,7 +1617,13 @@ class TopoBackend_Octopus:
         devices: List[PciChip],
         mobo_dict_list: List[dict],
     ):
-        self.devices_local = devices
+        # Only the local n150s are detected, the galaxies behind them come up after the resets
+        self.registry = DeviceRegistry(
+            devices,
+            local_only=True,
+            detect=lambda **kwargs: detect_chips_with_callback(**kwargs),
+        )
+        self.devices_local = self.registry.records
         self.devices_remote = [
             entry["mobo"] for entry in mobo_dict_list["wh_mobo_reset"]
         ]
@@ -1261,14 +1634,15 @@ class TopoBackend_Octopus:
         Set eth-mobo-enable on every n150
         """
         for device in self.devices_local:
-            device = device.as_wh()
-            device.spi_write(
-                int(constants.ETH_PARAM_MOBO_ETH_EN),
-                int(0xC3).to_bytes(4, byteorder="little"),
-            )
+            device = device.wh
+            param_table = ParamTable.read(device)
+            param_table.set("MOBO_ETH_EN", 0xC3)
+            param_table.commit(device)
 
     def set_rack_shelf_remote(self, mobo_dict):
         mobo_list = [entry["mobo"] for entry in mobo_dict]
+        from tt_tools_common.reset_common.galaxy_reset import GalaxyReset
+
         galaxy_reset_obj = GalaxyReset()
         for i, mobo in enumerate(mobo_list):
             cmd = "rackshelf"
@@ -1281,24 +1655,24 @@ class TopoBackend_Octopus:
         """
         Setup the initial chip coordinated to be all R0, S0, X0, Y0
         """
-        xy_addr = constants.ETH_PARAM_CHIP_COORD
-        rack_shelf_addr = constants.ETH_PARAM_RACK_SHELF
-
         for device in self.devices_local:
-            device = device.as_wh()
-            device.spi_write(int(xy_addr), bytearray([0x0, 0x0, 0x0, 0x0]))
-            device.spi_write(int(rack_shelf_addr), bytearray([0x0, 0x0, 0x0, 0x0]))
+            device = device.wh
+            param_table = ParamTable.read(device)
+            param_table.set("CHIP_COORD", 0x0)
+            param_table.set("RACK_SHELF", 0x0)
+            param_table.commit(device)
 
     def galaxy_reset(self, mobo_dict):
         """
         Reset all galaxies
         """
+        from tt_tools_common.reset_common.galaxy_reset import GalaxyReset
+
         mobo_reset_obj = GalaxyReset()
         mobo_reset_obj.warm_reset_mobo(mobo_dict)
 
-        chips = detect_chips_with_callback(local_only=True, ignore_ethernet=False)
-        for device in chips:
-            device.init()
+        # Reopen the local n150s at their PCI interfaces, only enumerating again if they changed
+        self.devices_local = self.registry.refresh()
 
     def read_remote_set_local(self):
         """
@@ -1309,12 +1683,9 @@ class TopoBackend_Octopus:
         On each shelf for the n150s, the y coordinates should be set to 0,1,2,3 based on
         where they connect to on the galaxy
         """
-        xy_addr = constants.ETH_PARAM_CHIP_COORD
-        shelf_rack_addr = constants.ETH_PARAM_RACK_SHELF
-
         coord_map = {}
         for i, device in enumerate(self.devices_local):
-            device = device.as_wh()
+            device = device.wh
             neighbours = device.get_neighbouring_chips()
 
             if len(neighbours) > 0:
@@ -1345,11 +1716,10 @@ class TopoBackend_Octopus:
             shelf_rack = (nb_shelf << 8) | 0  # Set rack to 0 for now
 
             for i, (idx, _) in enumerate(sorted_coord_map):
-                device = self.devices_local[idx].as_wh()
+                device = self.devices_local[idx].wh
 
                 xy = (i << 8) | 0
-                device.spi_write(int(xy_addr), int(xy).to_bytes(4, byteorder="little"))
-                device.spi_write(
-                    int(shelf_rack_addr),
-                    int(shelf_rack).to_bytes(4, byteorder="little"),
-                )
+                param_table = ParamTable.read(device)
+                param_table.set("CHIP_COORD", xy)
+                param_table.set("RACK_SHELF", shelf_rack)
+                param_table.commit(device)
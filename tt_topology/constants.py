@@ -16,6 +16,9 @@ ETH_PARAM_COORD_CHECK_DISABLE   = ETH_PARAM_BASE_ADDR + (0x4) * 60
 # Offset for params on right chip
 ETH_PARAM_RIGHT_OFFSET = 0x100
 
+# Size of the param table region read in one go, covers the L and R params up to COORD_CHECK_DISABLE
+ETH_PARAM_TABLE_SIZE = ETH_PARAM_RIGHT_OFFSET + (0x4) * 61
+
 # Addresses needed to read the "board_id" generated for eth fw
 ETH_L1_PARAM_BASE_ADDR  = 0x1000
 ETH_L1_PARAM_BOARD_TYPE = ETH_L1_PARAM_BASE_ADDR + (0x4) * 56
@@ -32,3 +35,11 @@ ETH_TEST_RESULT_LOCAL_TYPE         = ETH_TEST_RESULT_BASE_ADDR + (0x4) * 64
 ETH_TEST_RESULT_LOCAL_ID           = ETH_TEST_RESULT_BASE_ADDR + (0x4) * 65
 ETH_TEST_RESULT_LOCAL_COORD        = ETH_TEST_RESULT_BASE_ADDR + (0x4) * 66  # 0x0000YYXX
 ETH_TEST_RESULT_LOCAL_SHELF_RACK   = ETH_TEST_RESULT_BASE_ADDR + (0x4) * 67  # 0x0000SSRR
+
+# The local and remote test results for a port are laid out back to back (words 64 - 75),
+# so the whole block can be fetched with a single noc read per port
+ETH_TEST_RESULT_PORT_BLOCK_ADDR     = ETH_TEST_RESULT_LOCAL_TYPE
+ETH_TEST_RESULT_PORT_BLOCK_SIZE     = (0x4) * 12
+
+# Number of ETH ports on a WH chip
+ETH_NUM_PORTS = 16
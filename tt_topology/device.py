@@ -0,0 +1,205 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Per-device metadata read once per detection.
+Every query on a PciChip is a call into pyluwen, and for remote chips some of them go over ETH,
+so the values that don't change until the next reset are read once and kept in a DeviceRecord.
+The DeviceRegistry keeps the records across resets. After a reset the local chips are reopened from
+their PCI interfaces instead of enumerating them again, remote chips always have to be enumerated.
+"""
+from typing import Callable, List, Optional
+
+
+def get_board_type(board_id: str) -> str:
+    """
+    Get board type from board ID string.
+    Ex:
+        Board ID: AA-BBBBB-C-D-EE-FF-XXX
+                   ^     ^ ^ ^  ^  ^   ^
+                   |     | | |  |  |   +- XXX
+                   |     | | |  |  +----- FF
+                   |     | | |  +-------- EE
+                   |     | | +----------- D
+                   |     | +------------- C = Revision
+                   |     +--------------- BBBBB = Unique Part Identifier (UPI)
+                   +--------------------- AA
+    """
+    UPI_TO_BOARD_TYPE = {
+        # Wormhole cards
+        0x8: "nb_cb",
+        0xB: "wh_4u",
+        0x14: "n300",
+        0x18: "n150",
+        0x35: "tt-galaxy-wh",
+        # Blackhole cards
+        0x36: "bh-scrappy",
+        0x43: "p100a",
+        0x40: "p150a",
+        0x41: "p150b",
+        0x42: "p150c",
+        0x44: "p300b",
+        0x45: "p300a",
+        0x46: "p300c",
+        0x47: "tt-galaxy-bh",
+    }
+    try:
+        serial_num = int(f"0x{board_id}", base=16)
+    except ValueError:
+        return "N/A"
+    upi = (serial_num >> 36) & 0xFFFFF
+
+    return UPI_TO_BOARD_TYPE.get(upi, "N/A")
+
+
+class DeviceRecord:
+    """
+    Metadata of a detected chip along with its pyluwen handles
+    """
+
+    __slots__ = (
+        "device",
+        "wh",
+        "board_id",
+        "board_type",
+        "is_remote",
+        "pci_interface",
+        "board_interface",
+        "eth_board_info",
+    )
+
+    def __init__(self, device):
+        self.device = device
+        self.wh = device.as_wh()
+        # Board id as a hex string without the 0x prefix
+        self.board_id = f"{device.board_id():x}"
+        self.board_type = get_board_type(self.board_id)
+        self.is_remote = device.is_remote()
+        # Remote chips have no PCIe interface of their own, pyluwen raises when asked for it
+        self.pci_interface = None if self.is_remote else device.get_pci_interface_id()
+        # PCIe interface of the local chip of the board, remote chips are reached through it.
+        # Filled in for remote chips by build_device_records, None if their local chip isn't detected
+        self.board_interface = self.pci_interface
+        # Local eth board info reported by eth fw, filled in once the chip's ports are scanned
+        self.eth_board_info: Optional[str] = None
+
+    @property
+    def side(self) -> str:
+        """
+        R for remote chips, L for local chips
+        """
+        return "R" if self.is_remote else "L"
+
+    def __repr__(self):
+        return f"DeviceRecord({self.board_type} {self.side} {self.board_id})"
+
+
+def build_device_records(devices: List) -> List[DeviceRecord]:
+    """
+    Wrap freshly detected devices in DeviceRecords, devices that already are records are kept as is.
+    Remote chips get the PCIe interface of the local chip with the same board id as their board interface.
+    """
+    records = [
+        device if isinstance(device, DeviceRecord) else DeviceRecord(device)
+        for device in devices
+    ]
+    board_interfaces = {
+        record.board_id: record.pci_interface for record in records if not record.is_remote
+    }
+    for record in records:
+        if record.is_remote:
+            record.board_interface = board_interfaces.get(record.board_id)
+    return records
+
+
+class DeviceRegistry:
+    """
+    The detected chips, kept across resets.
+    The PCI interface of a local chip doesn't change when it is reset, so after a reset the local
+    chips are reopened at the interfaces they had and checked to be the same boards instead of being
+    enumerated from scratch. Remote chips are reached over ETH by their chip coordinates, so they
+    come back through enumerate.
+    """
+
+    def __init__(
+        self,
+        devices: List,
+        local_only: bool = False,
+        detect: Optional[Callable] = None,
+        scan_interfaces: Optional[Callable] = None,
+        open_chip: Optional[Callable] = None,
+    ):
+        self.records = build_device_records(devices)
+        # Remote chips were left out of the detection the records come from
+        self.local_only = local_only
+        # detect_chips_with_callback, pyluwen's pci_scan and PciChip, replaceable for testing
+        self._detect = detect
+        self._scan_interfaces = scan_interfaces
+        self._open_chip = open_chip
+        # Number of full enumerations run, for reporting
+        self.num_enumerations = 0
+
+    def enumerate(self, local_only: bool = False) -> List[DeviceRecord]:
+        """
+        Detect every chip from scratch and replace the records with them
+        """
+        if self._detect is None:
+            from tt_tools_common.utils_common.tools_utils import detect_chips_with_callback
+
+            self._detect = detect_chips_with_callback
+        self.records = build_device_records(self._detect(local_only=local_only))
+        self.local_only = local_only
+        self.num_enumerations += 1
+        return self.records
+
+    def refresh(self) -> List[DeviceRecord]:
+        """
+        Get the local chips back after a reset.
+        Their handles are stale after the reset, so new ones are opened at the PCI interfaces of the
+        records and waited on until the chips are up and their ETH links trained, like a detection does.
+        If a chip is missing or another board answers at its interface, the local chips are enumerated
+        again.
+
+        Returns:
+            DeviceRecords of the local chips
+        """
+        records = self.reopen([record for record in self.records if not record.is_remote])
+        if records is None:
+            return self.enumerate(local_only=True)
+        self.records = records
+        self.local_only = True
+        return self.records
+
+    def reopen(self, records: List[DeviceRecord]) -> Optional[List[DeviceRecord]]:
+        """
+        Open new handles for local chips at the PCI interfaces of their records and wait for them to
+        come up
+
+        Returns:
+            New DeviceRecords in the same order, None if a chip is missing or isn't the board it was
+        """
+        if self._scan_interfaces is None:
+            from pyluwen import pci_scan
+
+            self._scan_interfaces = pci_scan
+        if self._open_chip is None:
+            from pyluwen import PciChip
+
+            self._open_chip = PciChip
+        try:
+            if not {record.pci_interface for record in records} <= set(self._scan_interfaces()):
+                return None
+            devices = [self._open_chip(pci_interface=record.pci_interface) for record in records]
+            # A new handle doesn't wait for the chip, init waits for the ARC and the ETH training
+            # to finish like detect_chips_fallible does
+            for device in devices:
+                device.init()
+            reopened = build_device_records(devices)
+        except Exception:
+            return None
+        if any(
+            new.is_remote or new.board_id != old.board_id
+            for new, old in zip(reopened, records)
+        ):
+            return None
+        return reopened
@@ -0,0 +1,163 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Scan engine for the ETH test result registers used to discover chip to chip connections.
+Each port's local and remote test results are read with a single noc read and decoded here.
+"""
+import struct
+from typing import List, Optional
+from dataclasses import dataclass
+import tt_topology.constants as constants
+
+NO_CONNECTION = "0" * 16
+
+# Offsets of each field (in words) from the start of the port test result block
+_LOCAL_TYPE_WORD = (constants.ETH_TEST_RESULT_LOCAL_TYPE - constants.ETH_TEST_RESULT_PORT_BLOCK_ADDR) // 4
+_LOCAL_ID_WORD = (constants.ETH_TEST_RESULT_LOCAL_ID - constants.ETH_TEST_RESULT_PORT_BLOCK_ADDR) // 4
+_LOCAL_COORD_WORD = (constants.ETH_TEST_RESULT_LOCAL_COORD - constants.ETH_TEST_RESULT_PORT_BLOCK_ADDR) // 4
+_LOCAL_SHELF_RACK_WORD = (constants.ETH_TEST_RESULT_LOCAL_SHELF_RACK - constants.ETH_TEST_RESULT_PORT_BLOCK_ADDR) // 4
+_REMOTE_TYPE_WORD = (constants.ETH_TEST_RESULT_REMOTE_TYPE - constants.ETH_TEST_RESULT_PORT_BLOCK_ADDR) // 4
+_REMOTE_ID_WORD = (constants.ETH_TEST_RESULT_REMOTE_ID - constants.ETH_TEST_RESULT_PORT_BLOCK_ADDR) // 4
+_REMOTE_COORD_WORD = (constants.ETH_TEST_RESULT_REMOTE_COORD - constants.ETH_TEST_RESULT_PORT_BLOCK_ADDR) // 4
+_REMOTE_SHELF_RACK_WORD = (constants.ETH_TEST_RESULT_REMOTE_SHELF_RACK - constants.ETH_TEST_RESULT_PORT_BLOCK_ADDR) // 4
+_BLOCK_FORMAT = f"<{constants.ETH_TEST_RESULT_PORT_BLOCK_SIZE // 4}I"
+
+
+def eth_xy_decode(eth_id):
+    """
+    Get the noc x/y location of the ETH core for a given port
+    """
+    if (eth_id % 2) == 1:
+        eth_x = 1 + ((eth_id % 8) // 2)
+    else:
+        eth_x = 9 - ((eth_id % 8) // 2)
+    if eth_id > 7:
+        eth_y = 6
+    else:
+        eth_y = 0
+    return eth_x, eth_y
+
+
+# Noc x/y of the ETH core of every port, indexed by port number
+ETH_XY_LUT = tuple(eth_xy_decode(port) for port in range(constants.ETH_NUM_PORTS))
+
+
+def format_eth_board_info(board_type: int, board_id: int) -> str:
+    """
+    Format the board type and id reported by eth fw into the eth_board_info string used as a chip key
+    """
+    return f"{(board_type << 32) | board_id:016x}"
+
+
+def split_coord(coord: int):
+    """
+    Split a 0x0000YYXX coord or 0x0000SSRR shelf/rack word into its two bytes
+    """
+    return coord & 0xFF, (coord >> 8) & 0xFF
+
+
+@dataclass
+class EthPortInfo:
+    """
+    Decoded test results for a single ETH port
+    """
+    port: int
+    local_type: int
+    local_id: int
+    local_coord: int  # 0x0000YYXX
+    local_shelf_rack: int  # 0x0000SSRR
+    remote_type: int
+    remote_id: int
+    remote_coord: int  # 0x0000YYXX
+    remote_shelf_rack: int  # 0x0000SSRR
+
+    @property
+    def local_eth_board_info(self) -> str:
+        return format_eth_board_info(self.local_type, self.local_id)
+
+    @property
+    def remote_eth_board_info(self) -> str:
+        return format_eth_board_info(self.remote_type, self.remote_id)
+
+    @property
+    def has_local_info(self) -> bool:
+        return self.local_type != 0
+
+    @property
+    def is_connected(self) -> bool:
+        return self.remote_eth_board_info != NO_CONNECTION
+
+    @property
+    def local_xy(self):
+        return split_coord(self.local_coord)
+
+    @property
+    def remote_xy(self):
+        return split_coord(self.remote_coord)
+
+
+def decode_eth_port_block(port: int, data) -> EthPortInfo:
+    """
+    Decode the raw bytes of a port test result block read from ETH_TEST_RESULT_PORT_BLOCK_ADDR
+    """
+    words = struct.unpack_from(_BLOCK_FORMAT, data)
+    return EthPortInfo(
+        port=port,
+        local_type=words[_LOCAL_TYPE_WORD],
+        local_id=words[_LOCAL_ID_WORD],
+        local_coord=words[_LOCAL_COORD_WORD],
+        local_shelf_rack=words[_LOCAL_SHELF_RACK_WORD],
+        remote_type=words[_REMOTE_TYPE_WORD],
+        remote_id=words[_REMOTE_ID_WORD],
+        remote_coord=words[_REMOTE_COORD_WORD],
+        remote_shelf_rack=words[_REMOTE_SHELF_RACK_WORD],
+    )
+
+
+def read_eth_port(chip, port: int) -> EthPortInfo:
+    """
+    Read the whole test result block of a single port in one noc transaction
+    """
+    eth_x, eth_y = ETH_XY_LUT[port]
+    data = bytearray(constants.ETH_TEST_RESULT_PORT_BLOCK_SIZE)
+    chip.noc_read(0, eth_x, eth_y, constants.ETH_TEST_RESULT_PORT_BLOCK_ADDR, data)
+    return decode_eth_port_block(port, data)
+
+
+def empty_eth_port(port: int) -> EthPortInfo:
+    """
+    Test results of a port that wasn't read, no local info and no connection
+    """
+    return EthPortInfo(port, 0, 0, 0, 0, 0, 0, 0, 0)
+
+
+def scan_eth_ports(chip, port_disable: int = 0) -> List[EthPortInfo]:
+    """
+    Read and decode the test results of the ETH ports on a chip.
+    Ports set in the port_disable mask can't train a link, so they are not read and come back empty.
+    The first port is still read if every port is disabled, so the chip's local info is known.
+
+    Returns:
+        List of EthPortInfo indexed by port number
+    """
+    ports = [port for port in range(constants.ETH_NUM_PORTS) if not (port_disable >> port) & 1]
+    to_read = set(ports or [0])
+    return [
+        read_eth_port(chip, port) if port in to_read else empty_eth_port(port)
+        for port in range(constants.ETH_NUM_PORTS)
+    ]
+
+
+def read_local_eth_board_info(chip) -> Optional[str]:
+    """
+    Read the local eth_board_info of a chip port by port, stopping at the first port that reports it
+
+    Returns:
+        eth_board_info string, None if no port reports it
+    """
+    for port in range(constants.ETH_NUM_PORTS):
+        port_info = read_eth_port(chip, port)
+        if port_info.has_local_info:
+            return port_info.local_eth_board_info
+    return None
@@ -0,0 +1,82 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Process wide registry of the fw message definitions in data/<chip>/fw_defines.yaml.
+Each chip's definitions are loaded once on first use. If the package was built with the
+definitions compiled into _fw_defines_compiled.py no YAML is parsed at runtime at all.
+
+Compile them in place with:
+    python tt_topology/fw_defines.py
+"""
+import os
+from types import MappingProxyType
+from functools import lru_cache
+from typing import Mapping
+
+TOOL_NAME = "tt_topology"
+COMPILED_MODULE = "_fw_defines_compiled.py"
+FW_DEFINES_FILE = "fw_defines.yaml"
+
+
+@lru_cache(maxsize=None)
+def get_fw_defines(chip_name: str = "wormhole") -> Mapping[str, int]:
+    """
+    Get the fw message definitions of a chip, ex: get_fw_defines("wormhole")["MSG_TRIGGER_SPI_COPY_LtoR"]
+
+    Returns:
+        Read only mapping of definition name to value, shared by every caller
+    """
+    try:
+        from tt_topology._fw_defines_compiled import FW_DEFINES
+    except ImportError:
+        FW_DEFINES = {}
+    if chip_name in FW_DEFINES:
+        return MappingProxyType(FW_DEFINES[chip_name])
+
+    from tt_tools_common.utils_common.tools_utils import init_fw_defines
+
+    return MappingProxyType(init_fw_defines(chip_name, TOOL_NAME))
+
+
+def compile_fw_defines(data_dir: str, output_path: str) -> str:
+    """
+    Parse the fw_defines.yaml of every chip under data_dir and write them out as a python module
+    that get_fw_defines picks up instead of parsing the YAML. Used at build time by setup.py.
+
+    Returns:
+        Path of the written module
+    """
+    from yaml import safe_load
+
+    fw_defines = {}
+    for chip_name in sorted(os.listdir(data_dir)):
+        yaml_path = os.path.join(data_dir, chip_name, FW_DEFINES_FILE)
+        if os.path.isfile(yaml_path):
+            with open(yaml_path) as f:
+                fw_defines[chip_name] = safe_load(f) or {}
+
+    lines = [
+        "# Generated from data/*/fw_defines.yaml by tt_topology/fw_defines.py, do not edit",
+        "FW_DEFINES = {",
+    ]
+    for chip_name, defines in fw_defines.items():
+        lines.append(f"    {chip_name!r}: {{")
+        for name, value in defines.items():
+            value = f"0x{value:X}" if isinstance(value, int) else repr(value)
+            lines.append(f"        {name!r}: {value},")
+        lines.append("    },")
+    lines.append("}")
+    with open(output_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return output_path
+
+
+if __name__ == "__main__":
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    print(
+        "Wrote",
+        compile_fw_defines(
+            os.path.join(package_dir, "data"), os.path.join(package_dir, COMPILED_MODULE)
+        ),
+    )
@@ -0,0 +1,136 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+On-disk journal of the phases of a flash run.
+Every completed phase is recorded along with the connection map and coordinate map, so a run that
+failed or was interrupted can be resumed from the first phase that didn't complete with --resume
+instead of starting over from the default flash.
+"""
+import os
+import json
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Phases of run_and_flash in the order they complete
+PHASES = [
+    "default_flash",
+    "default_reset",
+    "discovery",
+    "coordinates",
+    "coord_flash",
+    "coord_reset",
+]
+JOURNAL_FILENAME = "run_journal.json"
+PORT_TABLE_FILENAME = "run_journal_ports.npz"
+
+
+class RunJournal:
+    """
+    Phases completed by a flash run on this host and the maps they produced
+    """
+
+    def __init__(self, folder: str, layout: str, boards: List[Tuple[int, str]]):
+        self.folder = folder
+        self.layout = layout
+        # (pci interface, board id) of every local chip, the journal only applies to the same boards
+        self.boards = [list(board) for board in boards]
+        self.completed: List[str] = []
+        # eth_board_info of every row of the port table snapshot, in device order
+        self.eth_board_info: List[Optional[str]] = []
+        # {chip id: [[neighbor chip id, connection type], ...]} as discovered
+        self.connection_map: Dict[str, List[List]] = {}
+        # [(chip id, x, y), ...] in coordinate map order, the order is the ring order for linear and torus
+        self.coordinate_map: List[List[int]] = []
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.folder, JOURNAL_FILENAME)
+
+    @property
+    def port_table_path(self) -> str:
+        return os.path.join(self.folder, PORT_TABLE_FILENAME)
+
+    @classmethod
+    def open(
+        cls, folder: str, layout: str, boards: List[Tuple[int, str]], resume: bool = False
+    ) -> "RunJournal":
+        """
+        Get the journal for a run. With resume, the journal of the last run is picked up if it was
+        for the same layout and boards, otherwise a new journal is started.
+        """
+        if resume:
+            journal = cls.load(folder)
+            if journal is not None and journal.layout == layout and journal.boards == [
+                list(board) for board in boards
+            ]:
+                return journal
+        journal = cls(folder, layout, boards)
+        journal.save()
+        return journal
+
+    @classmethod
+    def load(cls, folder: str) -> Optional["RunJournal"]:
+        """
+        Load the journal saved in a folder, None if there is none or it can't be read
+        """
+        try:
+            with open(os.path.join(folder, JOURNAL_FILENAME)) as f:
+                saved = json.load(f)
+            journal = cls(folder, saved["layout"], saved["boards"])
+            journal.completed = [phase for phase in saved["completed"] if phase in PHASES]
+            journal.eth_board_info = saved.get("eth_board_info", [])
+            journal.connection_map = saved.get("connection_map", {})
+            journal.coordinate_map = saved.get("coordinate_map", [])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return journal
+
+    def save(self):
+        """
+        Write the journal, through a temporary file so an interrupted write leaves the last journal intact
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "time": datetime.datetime.now().isoformat(),
+                    "layout": self.layout,
+                    "boards": self.boards,
+                    "completed": self.completed,
+                    "eth_board_info": self.eth_board_info,
+                    "connection_map": self.connection_map,
+                    "coordinate_map": self.coordinate_map,
+                },
+                f,
+                indent=4,
+            )
+        os.replace(tmp_path, self.path)
+
+    def is_done(self, phase: str) -> bool:
+        return phase in self.completed
+
+    def complete(self, phase: str):
+        """
+        Record a phase as completed and save the journal
+        """
+        if phase not in PHASES:
+            raise KeyError(f"Unknown run phase: {phase}")
+        if phase not in self.completed:
+            self.completed.append(phase)
+        self.save()
+
+    def set_coordinate_map(self, coord_map: Dict[int, Tuple[int, int]]):
+        self.coordinate_map = [[chip_id, x, y] for chip_id, (x, y) in coord_map.items()]
+
+    def get_coordinate_map(self) -> Dict[int, Tuple[int, int]]:
+        return {chip_id: (x, y) for chip_id, x, y in self.coordinate_map}
+
+    def clear(self):
+        """
+        Remove the journal once the run is complete, there is nothing left to resume
+        """
+        for path in [self.path, self.port_table_path]:
+            if os.path.exists(path):
+                os.remove(path)
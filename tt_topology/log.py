@@ -10,7 +10,7 @@ import base64
 import inspect
 import datetime
 from pathlib import Path
-from typing import Any, Union, List, TypeVar, Generic, Tuple
+from typing import Any, Union, List, Optional, TypeVar, Generic, Tuple
 try:
     # Try the newer v2 pydantic and use that first
     from pydantic.v1 import BaseModel
@@ -170,6 +170,9 @@ class ConnectionMap(ElasticModel):
     board_id: str
     eth_board_info: str
     connections: List[Tuple[int, str]]
+    # Every physical link as (port, neighbor id, neighbor port), the neighbor port is None when it
+    # isn't known, ex: when there are several links to the neighbor
+    links: List[Tuple[int, int, Optional[int]]]
 
 
 @optional
@@ -0,0 +1,264 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Place the chips of a mesh on a grid so that linked chips are next to each other.
+Chips are placed breadth first from a corner chip, each one on the first free position next to the
+chip it was reached from (right, up, left, down) that is next to all of its placed neighbors.
+Positions are kept in a coordinate -> chip index, so every chip is placed in time proportional to
+its links and the whole mesh in linear time.
+The greedy placement never revisits a chip, so a cabling order can lead it into a corner even though
+the mesh fits on a grid. Only then a backtracking search places the chips one at a time, always the
+chip with the fewest positions left, and drops a partial placement as soon as a chip or its free
+neighbors run out of positions. The first two placements are fixed so only one of the 8 rotations
+and mirror images of a placement is searched, and partial placements already known to fail are
+remembered so they aren't searched again.
+A mesh that can't be placed is reported as a MeshEmbedding with the chip that couldn't be placed,
+it is up to the caller to decide what to do about it.
+"""
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Directions tried from a placed chip, in order: right, up, left, down
+DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+# Number of corner chips a mesh placement is started from before giving up
+MAX_CORNER_ATTEMPTS = 4
+# Default time budget of the backtracking search in seconds
+DEFAULT_SEARCH_TIMEOUT = 10.0
+# Most partial placements remembered as failed by the backtracking search
+MAX_FAILED_STATES = 100000
+# Number of search steps between checks of the time budget
+_STEPS_PER_CLOCK_CHECK = 256
+
+
+@dataclass
+class MeshEmbedding:
+    """
+    Outcome of placing the chips of a mesh on a grid
+    """
+    # {chip id: (x, y)} of the chips placed, in placement order
+    coordinates: Dict[int, Tuple[int, int]] = field(default_factory=dict)
+    # Chip that couldn't be placed and the placed chip it was reached from
+    failed_chip: Optional[int] = None
+    parent_chip: Optional[int] = None
+    # Why the mesh couldn't be placed, empty if it was
+    reason: str = ""
+    # Largest x and y coordinate used
+    max_x: int = 0
+    max_y: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.reason
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """
+        Width and height of the bounding box of the placed chips
+        """
+        if not self.coordinates:
+            return (0, 0)
+        return (self.max_x + 1, self.max_y + 1)
+
+
+def is_grid_neighbor(a: Tuple[int, int], b: Tuple[int, int]) -> bool:
+    """
+    Check two coordinates are ± 1 apart in X or in Y
+    """
+    return abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1
+
+
+def corner_candidates(adjacency: Dict[int, List[int]]) -> List[int]:
+    """
+    Chips a placement can start from, in the order to try them.
+    Chips with 2 links come first, they are the corners of a mesh, then the chips with the fewest links.
+    """
+    corners = [chip for chip, neighbors in adjacency.items() if len(neighbors) == 2]
+    others = sorted(
+        (chip for chip, neighbors in adjacency.items() if len(neighbors) != 2),
+        key=lambda chip: len(adjacency[chip]),
+    )
+    return corners + [chip for chip in others if adjacency[chip]]
+
+
+def embed_from(adjacency: Dict[int, List[int]], start: int) -> MeshEmbedding:
+    """
+    Place the chips reachable from a start chip breadth first, with the start chip at (0, 0).
+    Rules:
+        1. Any connection type is valid and can be used to generate coordinates
+        2. Check compliance of candidate coordinates with neighbouring nodes.
+            a. Candidate coordinates must not be already assigned to another node
+            b. Candidate coordinates cannot be negative
+            c. Candidate coordinates must be ± 1 in X or Y direction from all its neighbours
+    """
+    embedding = MeshEmbedding(coordinates={start: (0, 0)})
+    coordinates = embedding.coordinates
+    occupied = {(0, 0): start}
+    queue = deque([start])
+    while queue:
+        chip = queue.popleft()
+        x, y = coordinates[chip]
+        for neighbor in adjacency.get(chip, []):
+            if neighbor in coordinates:
+                continue
+            placed_links = [
+                coordinates[link] for link in adjacency.get(neighbor, []) if link in coordinates
+            ]
+            for dx, dy in DIRECTIONS:
+                candidate = (x + dx, y + dy)
+                if candidate[0] < 0 or candidate[1] < 0 or candidate in occupied:
+                    continue
+                if all(is_grid_neighbor(coord, candidate) for coord in placed_links):
+                    coordinates[neighbor] = candidate
+                    occupied[candidate] = neighbor
+                    embedding.max_x = max(embedding.max_x, candidate[0])
+                    embedding.max_y = max(embedding.max_y, candidate[1])
+                    queue.append(neighbor)
+                    break
+            else:
+                embedding.failed_chip = neighbor
+                embedding.parent_chip = chip
+                embedding.reason = (
+                    f"no free position next to chip {chip} at {(x, y)} is next to "
+                    f"every placed neighbour of chip {neighbor}"
+                )
+                return embedding
+    return embedding
+
+
+def _search_positions(
+    adjacency: Dict[int, List[int]], chip: int, coordinates: Dict, occupied: Dict
+) -> List[Tuple[int, int]]:
+    """
+    Free positions of a chip next to every one of its placed neighbors, in direction order
+    """
+    placed_links = [coordinates[link] for link in adjacency.get(chip, []) if link in coordinates]
+    x, y = placed_links[0]
+    positions = [
+        (x + dx, y + dy)
+        for dx, dy in DIRECTIONS
+        if (x + dx, y + dy) not in occupied
+        and all(is_grid_neighbor(coord, (x + dx, y + dy)) for coord in placed_links[1:])
+    ]
+    if len(coordinates) == 1:
+        # Every placement can be rotated so the second chip is right of the first
+        return positions[:1]
+    if all(coord[1] == 0 for coord in occupied):
+        # Until a chip leaves the X axis a placement can be mirrored, only search the upper half
+        positions = [position for position in positions if position[1] >= 0]
+    return positions
+
+
+def _next_chip(adjacency: Dict[int, List[int]], coordinates: Dict, occupied: Dict):
+    """
+    The unplaced chip next to the placement with the fewest positions left and those positions.
+    None if every chip reachable from the placement is placed, an empty list of positions if a chip
+    or a placed chip's unplaced neighbors can't be placed anymore.
+    """
+    best = None
+    for chip, (x, y) in coordinates.items():
+        unplaced = [link for link in adjacency.get(chip, []) if link not in coordinates]
+        if not unplaced:
+            continue
+        free = sum((x + dx, y + dy) not in occupied for dx, dy in DIRECTIONS)
+        if len(set(unplaced)) > free:
+            return (unplaced[0], [])
+        for link in unplaced:
+            positions = _search_positions(adjacency, link, coordinates, occupied)
+            if best is None or len(positions) < len(best[1]):
+                best = (link, positions)
+                if not positions:
+                    return best
+    return best
+
+
+def embed_search(
+    adjacency: Dict[int, List[int]], start: int, timeout: float = DEFAULT_SEARCH_TIMEOUT
+) -> MeshEmbedding:
+    """
+    Place the chips reachable from a start chip with a backtracking search
+
+    Returns:
+        MeshEmbedding moved so the smallest X and Y coordinates are 0, or with a reason if there
+        is no placement or the time budget ran out
+    """
+    deadline = time.monotonic() + timeout
+    # A link reported by only one of its ends still has to be between grid neighbours
+    links = {
+        chip: [link for link in dict.fromkeys(neighbors) if link != chip]
+        for chip, neighbors in adjacency.items()
+    }
+    for chip, neighbors in adjacency.items():
+        for link in neighbors:
+            if link != chip and chip not in links.setdefault(link, []):
+                links[link].append(chip)
+    adjacency = links
+    if any(len(neighbors) > len(DIRECTIONS) for neighbors in adjacency.values()):
+        return MeshEmbedding(reason="a chip has more links than a grid position has neighbours")
+    coordinates = {start: (0, 0)}
+    occupied = {(0, 0): start}
+    failed = set()
+    stack = []
+    frame = _next_chip(adjacency, coordinates, occupied)
+    steps = 0
+    while frame is not None:
+        chip, positions = frame
+        if positions:
+            if steps % _STEPS_PER_CLOCK_CHECK == 0 and time.monotonic() > deadline:
+                return MeshEmbedding(reason=f"no grid placement found within {timeout}s")
+            steps += 1
+            position = positions.pop(0)
+            coordinates[chip] = position
+            occupied[position] = chip
+            state = frozenset(coordinates.items())
+            if state not in failed:
+                stack.append(frame)
+                frame = _next_chip(adjacency, coordinates, occupied)
+                continue
+        else:
+            if not stack:
+                return MeshEmbedding(reason="no grid placement exists")
+            if len(failed) < MAX_FAILED_STATES:
+                failed.add(frozenset(coordinates.items()))
+            frame = stack.pop()
+            chip = frame[0]
+        # Take the chip back off the grid and try its next position
+        del occupied[coordinates.pop(chip)]
+
+    min_x = min(x for x, _ in coordinates.values())
+    min_y = min(y for _, y in coordinates.values())
+    embedding = MeshEmbedding(
+        coordinates={chip: (x - min_x, y - min_y) for chip, (x, y) in coordinates.items()}
+    )
+    embedding.max_x = max(x for x, _ in embedding.coordinates.values())
+    embedding.max_y = max(y for _, y in embedding.coordinates.values())
+    return embedding
+
+
+def embed_mesh(
+    adjacency: Dict[int, List[int]], timeout: float = DEFAULT_SEARCH_TIMEOUT
+) -> MeshEmbedding:
+    """
+    Place the chips of an adjacency map {chip id: [neighbor chip id, ...]} on a grid, starting from
+    the first few corner candidates in turn, and with the backtracking search if none of them works
+
+    Returns:
+        MeshEmbedding of the first placement of every reachable chip, otherwise the failure from
+        the first corner
+    """
+    candidates = corner_candidates(adjacency)
+    if not candidates:
+        return MeshEmbedding(reason="no chip has any links")
+    first_failure = None
+    for start in candidates[:MAX_CORNER_ATTEMPTS]:
+        embedding = embed_from(adjacency, start)
+        if embedding.ok:
+            return embedding
+        first_failure = first_failure or embedding
+    embedding = embed_search(adjacency, candidates[0], timeout)
+    if embedding.ok:
+        return embedding
+    first_failure.reason += f", and {embedding.reason}"
+    return first_failure
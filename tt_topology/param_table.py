@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+In-memory image of the eth param table in the SPI.
+The whole table is read with a single SPI read, fields are edited by name
+and only the words that were changed are written back.
+"""
+import struct
+from typing import List, Tuple
+import tt_topology.constants as constants
+
+# Named fields of the param table, each maps to its ETH_PARAM_<name> address in constants
+PARAM_FIELDS = [
+    "CHIP_COORD",
+    "PORT_DISABLE",
+    "ROUTING_DISABLE",
+    "MOBO_ETH_EN",
+    "RACK_SHELF",
+    "COORD_CHECK_DISABLE",
+]
+
+NUM_PARAM_WORDS = constants.ETH_PARAM_TABLE_SIZE // 4
+
+
+def param_addr(field: str, right: bool = False) -> int:
+    """
+    Get the SPI address of a named param, on the R chip side if right is set
+    """
+    if field not in PARAM_FIELDS:
+        raise KeyError(f"Unknown eth param: {field}")
+    addr = getattr(constants, f"ETH_PARAM_{field}")
+    if right:
+        addr += constants.ETH_PARAM_RIGHT_OFFSET
+    return addr
+
+
+def contiguous_runs(word_indices) -> List[Tuple[int, int]]:
+    """
+    Group word indices into (first_word, num_words) runs of consecutive words
+    """
+    runs = []
+    for word in sorted(word_indices):
+        if runs and runs[-1][0] + runs[-1][1] == word:
+            runs[-1] = (runs[-1][0], runs[-1][1] + 1)
+        else:
+            runs.append((word, 1))
+    return runs
+
+
+class ParamTable:
+    """
+    Image of the eth param table (L and R params) of a single chip
+    """
+
+    def __init__(self, data, force: bool = False):
+        self.words = list(struct.unpack(f"<{NUM_PARAM_WORDS}I", bytes(data)))
+        self.dirty = set()
+        # Write params on commit even if they already hold the value being set
+        self.force = force
+
+    @classmethod
+    def read(cls, chip, force: bool = False):
+        """
+        Read the whole param table of a chip with a single SPI read
+        """
+        data = bytearray(constants.ETH_PARAM_TABLE_SIZE)
+        chip.spi_read(int(constants.ETH_PARAM_BASE_ADDR), data)
+        return cls(data, force=force)
+
+    @staticmethod
+    def _word_index(field: str, right: bool) -> int:
+        return (param_addr(field, right) - constants.ETH_PARAM_BASE_ADDR) // 4
+
+    def get(self, field: str, right: bool = False) -> int:
+        return self.words[self._word_index(field, right)]
+
+    def set(self, field: str, value: int, right: bool = False):
+        """
+        Update a param in the image, it will be written to the SPI on the next commit.
+        Params that already hold the value are skipped unless the table is forced.
+        """
+        idx = self._word_index(field, right)
+        value &= 0xFFFFFFFF
+        if self.force or self.words[idx] != value:
+            self.words[idx] = value
+            self.dirty.add(idx)
+
+    def changed(self, field: str, right: bool = False) -> bool:
+        """
+        Check if a param will be written on the next commit
+        """
+        return self._word_index(field, right) in self.dirty
+
+    def commit(self, chip) -> int:
+        """
+        Write all the changed words back to the SPI, one write per run of consecutive words
+
+        Returns:
+            Number of words written
+        """
+        num_written = 0
+        for first_word, num_words in contiguous_runs(self.dirty):
+            data = struct.pack(
+                f"<{num_words}I", *self.words[first_word : first_word + num_words]
+            )
+            chip.spi_write(int(constants.ETH_PARAM_BASE_ADDR + first_word * 4), data)
+            num_written += num_words
+        self.dirty.clear()
+        return num_written
@@ -0,0 +1,213 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+On-disk cache of the coordinate plans worked out for the link graphs seen on this host.
+Hosts are cabled the same way and flashed to the same layout again and again, so instead of searching
+for a ring or a mesh placement on every run, the plan of a link graph is looked up by the layout and a
+fingerprint of the graph, and only reused once it checks out against the live links.
+The fingerprint is taken over a canonical labeling of the chips, so it doesn't depend on the order
+the chips were detected in, only on board types, L/R sides, link types and the ports of every link.
+Plans are stored by canonical position and mapped back onto the chip ids of the live graph.
+"""
+import os
+import json
+import time
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+# Bump when the fingerprint or the entry format changes, entries of other versions are ignored
+CACHE_VERSION = 1
+# Folder of the cache in the log folder
+PLAN_CACHE_FOLDERNAME = "plan_cache"
+# Most plans kept, the least recently used ones are evicted first
+MAX_ENTRIES = 64
+# Plans older than this are evicted, in seconds
+MAX_AGE = 30 * 24 * 60 * 60
+# Most discrete labelings the canonical labeling search looks at before giving up on a graph
+MAX_LABELINGS = 4096
+
+
+def _refine(colors: Dict[int, int], out_links: Dict, in_links: Dict) -> Dict[int, int]:
+    """
+    Split the chips of a coloring by the colors and labels of their links until no color splits further.
+    Colors are numbered in the order of their signatures, so equal graphs get equal colors.
+    """
+    num_colors = len(set(colors.values()))
+    while True:
+        signatures = {
+            chip: (
+                color,
+                tuple(sorted((label, colors[link]) for link, label in out_links[chip])),
+                tuple(sorted((label, colors[link]) for link, label in in_links[chip])),
+            )
+            for chip, color in colors.items()
+        }
+        index = {signature: idx for idx, signature in enumerate(sorted(set(signatures.values())))}
+        colors = {chip: index[signature] for chip, signature in signatures.items()}
+        if len(index) == num_colors:
+            return colors
+        num_colors = len(index)
+
+
+def canonical_labeling(chip_data) -> Optional[Tuple[str, List[int]]]:
+    """
+    Canonical labeling of the chips of a link graph, by color refinement and then individualizing the
+    chips of the first color shared by several chips, keeping the labeling with the smallest encoding.
+
+    Returns:
+        (sha256 fingerprint of the graph, chip ids in canonical order), None if the graph is too
+        symmetric to label within MAX_LABELINGS
+    """
+    chips = {data["id"]: data for data in chip_data.values()}
+    out_links = {chip: [] for chip in chips}
+    in_links = {chip: [] for chip in chips}
+    for chip in chips:
+        for link, connection_type in chip_data.neighbors(chip).items():
+            ports = tuple(
+                (-1 if port is None else port, -1 if link_port is None else link_port)
+                for port, link_port in chip_data.link_ports(chip, link)
+            )
+            label = (connection_type, ports)
+            out_links[chip].append((link, label))
+            in_links.setdefault(link, []).append((chip, label))
+    if set(in_links) != set(chips):
+        # A link to a chip that isn't part of the graph
+        return None
+    chip_labels = {
+        chip: (data["board_type"], "R" if data["chip_obj"].is_remote else "L")
+        for chip, data in chips.items()
+    }
+    index = {label: idx for idx, label in enumerate(sorted(set(chip_labels.values())))}
+    colors = _refine({chip: index[label] for chip, label in chip_labels.items()}, out_links, in_links)
+
+    best = None
+    num_labelings = 0
+    pending = [colors]
+    while pending:
+        colors = pending.pop()
+        cells = {}
+        for chip, color in colors.items():
+            cells.setdefault(color, []).append(chip)
+        shared = [color for color, cell in cells.items() if len(cell) > 1]
+        if shared:
+            color = min(shared)
+            for chip in sorted(cells[color], reverse=True):
+                # The individualized chip gets a color of its own just below the rest of its cell
+                split = {
+                    other: 2 * other_color + (other_color == color and other != chip)
+                    for other, other_color in colors.items()
+                }
+                pending.append(_refine(split, out_links, in_links))
+            continue
+        num_labelings += 1
+        if num_labelings > MAX_LABELINGS:
+            return None
+        order = sorted(colors, key=colors.get)
+        position = {chip: idx for idx, chip in enumerate(order)}
+        encoding = (
+            tuple(chip_labels[chip] for chip in order),
+            tuple(
+                sorted(
+                    (position[chip], position[link], label)
+                    for chip in order
+                    for link, label in out_links[chip]
+                )
+            ),
+        )
+        if best is None or encoding < best[0]:
+            best = (encoding, order)
+    fingerprint = hashlib.sha256(repr((CACHE_VERSION, best[0])).encode()).hexdigest()
+    return fingerprint, best[1]
+
+
+class PlanCache:
+    """
+    Coordinate plans keyed by layout and link graph fingerprint, one json file per plan
+    """
+
+    def __init__(self, folder: str, max_entries: int = MAX_ENTRIES, max_age: float = MAX_AGE):
+        self.folder = folder
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+    def path(self, layout: str, fingerprint: str) -> str:
+        return os.path.join(self.folder, f"{layout}_{fingerprint}.json")
+
+    def lookup(self, layout: str, fingerprint: str) -> Optional[dict]:
+        """
+        Get the plan stored for a layout and fingerprint, None if there is none or it expired
+        """
+        path = self.path(layout, fingerprint)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            if (
+                entry["version"] != CACHE_VERSION
+                or entry["layout"] != layout
+                or entry["fingerprint"] != fingerprint
+                or time.time() - entry["created"] > self.max_age
+            ):
+                self.evict(layout, fingerprint)
+                return None
+            # Plans are evicted least recently used first
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return entry
+
+    def store(
+        self,
+        layout: str,
+        fingerprint: str,
+        coordinates: List[Tuple[int, int, int]],
+        port_disables: List[Tuple[int, int]],
+    ):
+        """
+        Store the plan of a link graph, the coordinates as [(canonical position, x, y), ...] in coordinate
+        map order and the port disables as [(canonical position, port disable), ...]
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path(layout, fingerprint)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "version": CACHE_VERSION,
+                    "layout": layout,
+                    "fingerprint": fingerprint,
+                    "created": time.time(),
+                    "coordinates": [list(coordinate) for coordinate in coordinates],
+                    "port_disables": [list(port_disable) for port_disable in port_disables],
+                },
+                f,
+                indent=4,
+            )
+        os.replace(tmp_path, path)
+        self.prune()
+
+    def evict(self, layout: str, fingerprint: str):
+        path = self.path(layout, fingerprint)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def prune(self):
+        """
+        Evict the plans that expired, then the least recently used ones over max_entries
+        """
+        try:
+            paths = [
+                os.path.join(self.folder, filename)
+                for filename in os.listdir(self.folder)
+                if filename.endswith(".json")
+            ]
+            last_used = sorted(((os.path.getmtime(path), path) for path in paths), reverse=True)
+        except OSError:
+            return
+        now = time.time()
+        for idx, (mtime, path) in enumerate(last_used):
+            if idx >= self.max_entries or now - mtime > self.max_age:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
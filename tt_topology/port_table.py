@@ -0,0 +1,179 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Dense chips x ETH ports x fields array of the ETH test results of a whole system.
+Link analysis (adjacency, Tfly ports, port disable masks and link counts) is done with
+array operations over every port of every chip instead of per port Python loops.
+numpy is only imported when this module is, keep it out of the CLI startup path.
+"""
+from typing import List, Optional, Sequence
+import numpy as np
+import tt_topology.constants as constants
+from tt_topology.eth_scan import ETH_XY_LUT, EthPortInfo
+
+# Fields of each port, in the order of the last axis of the table
+FIELDS = (
+    "local_type",
+    "local_id",
+    "local_coord",
+    "local_shelf_rack",
+    "remote_type",
+    "remote_id",
+    "remote_coord",
+    "remote_shelf_rack",
+)
+LOCAL_TYPE, LOCAL_ID, LOCAL_COORD, LOCAL_SHELF_RACK = 0, 1, 2, 3
+REMOTE_TYPE, REMOTE_ID, REMOTE_COORD, REMOTE_SHELF_RACK = 4, 5, 6, 7
+
+# Noc x/y of the ETH core of every port as a (ports, 2) array
+ETH_XY = np.array(ETH_XY_LUT, dtype=np.int32)
+# Bit of every port in a port disable mask
+PORT_BITS = np.left_shift(1, np.arange(constants.ETH_NUM_PORTS, dtype=np.int64))
+# Tfly ports on NB for local chips (n300/n150) and for remote chips (n300)
+LOCAL_TFLY_PORTS = np.isin(np.arange(constants.ETH_NUM_PORTS), [14, 15])
+REMOTE_TFLY_PORTS = np.isin(np.arange(constants.ETH_NUM_PORTS), [6, 7])
+
+# Marks ports without a known remote chip in remote_chip_index
+NO_CHIP = -1
+
+
+def board_info(board_type: np.ndarray, board_id: np.ndarray) -> np.ndarray:
+    """
+    Combine type and id words into the 64 bit value behind the eth_board_info strings
+    """
+    return (board_type.astype(np.uint64) << np.uint64(32)) | board_id.astype(np.uint64)
+
+
+class PortTable:
+    """
+    ETH test results of every port of every chip, indexed [chip, port, field]
+    """
+
+    def __init__(self, table: np.ndarray):
+        assert table.ndim == 3 and table.shape[1:] == (constants.ETH_NUM_PORTS, len(FIELDS))
+        self.table = table.astype(np.uint32, copy=False)
+
+    @classmethod
+    def from_scans(cls, scans: Sequence[List[EthPortInfo]]) -> "PortTable":
+        """
+        Build the table from the per chip port scans, chip i of the table is scans[i]
+        """
+        table = np.zeros((len(scans), constants.ETH_NUM_PORTS, len(FIELDS)), dtype=np.uint32)
+        for chip, ports in enumerate(scans):
+            table[chip] = [[getattr(port_info, field) for field in FIELDS] for port_info in ports]
+        return cls(table)
+
+    @classmethod
+    def load(cls, path) -> "PortTable":
+        """
+        Load a snapshot written by save
+        """
+        with np.load(path) as snapshot:
+            return cls(snapshot["table"])
+
+    def save(self, path):
+        """
+        Write a compact snapshot of the table to an .npz file
+        """
+        np.savez_compressed(path, table=self.table)
+
+    @property
+    def num_chips(self) -> int:
+        return self.table.shape[0]
+
+    def local_board_info(self) -> np.ndarray:
+        """
+        64 bit local eth board info of every chip, taken from the first port that reports it, 0 if none does
+        """
+        has_local = self.table[:, :, LOCAL_TYPE] != 0
+        first = has_local.argmax(axis=1)
+        rows = np.arange(self.num_chips)
+        info = board_info(self.table[rows, first, LOCAL_TYPE], self.table[rows, first, LOCAL_ID])
+        return np.where(has_local.any(axis=1), info, np.uint64(0))
+
+    def local_eth_board_info(self) -> List[Optional[str]]:
+        """
+        eth_board_info string of every chip, None for chips that don't report it
+        """
+        return [f"{info:016x}" if info else None for info in self.local_board_info().tolist()]
+
+    def remote_board_info(self) -> np.ndarray:
+        """
+        (chips, ports) 64 bit eth board info of the chip on the other end of every port, 0 if not connected
+        """
+        return board_info(self.table[:, :, REMOTE_TYPE], self.table[:, :, REMOTE_ID])
+
+    def connected(self) -> np.ndarray:
+        """
+        (chips, ports) mask of the ports with a trained link
+        """
+        return self.remote_board_info() != 0
+
+    def same_links(self, other: "PortTable") -> bool:
+        """
+        Check two scans see the same chips with the same links on every port, coordinates aside
+        """
+        return (
+            self.table.shape == other.table.shape
+            and np.array_equal(self.local_board_info(), other.local_board_info())
+            and np.array_equal(self.remote_board_info(), other.remote_board_info())
+        )
+
+    def remote_chip_index(self) -> np.ndarray:
+        """
+        (chips, ports) index of the chip in this table on the other end of every port.
+        NO_CHIP for ports that are not connected or connect to a chip that isn't in the table.
+        When chips share an eth board info the last one wins, like the dicts keyed by it.
+        """
+        local = self.local_board_info()
+        last_chip = {info: chip for chip, info in enumerate(local.tolist()) if info}
+        remote = self.remote_board_info()
+        if not last_chip:
+            return np.full(remote.shape, NO_CHIP, dtype=np.int64)
+        keys = np.array(sorted(last_chip), dtype=np.uint64)
+        chips = np.array([last_chip[key] for key in keys.tolist()], dtype=np.int64)
+        pos = np.minimum(np.searchsorted(keys, remote), len(keys) - 1)
+        return np.where((keys[pos] == remote) & (remote != 0), chips[pos], NO_CHIP)
+
+    def tfly_ports(self, is_remote: np.ndarray, board_types: Sequence[str]) -> np.ndarray:
+        """
+        (chips, ports) mask of the ports that are Tfly connections, ports 14 and 15 on local
+        n300/n150 chips and ports 6 and 7 on remote n300 chips
+        """
+        board_types = np.asarray(board_types)
+        is_remote = np.asarray(is_remote, dtype=bool)
+        local_tfly = (~is_remote & np.isin(board_types, ["n300", "n150"]))[:, None] & LOCAL_TFLY_PORTS
+        remote_tfly = (is_remote & (board_types == "n300"))[:, None] & REMOTE_TFLY_PORTS
+        return local_tfly | remote_tfly
+
+    def unknown_remote_ports(self) -> np.ndarray:
+        """
+        (chips, ports) mask of the ports connected to a chip that isn't in the table, ex: on another host
+        """
+        return self.connected() & (self.remote_chip_index() == NO_CHIP)
+
+    def edges(self) -> np.ndarray:
+        """
+        (links, 2) array with every link between chips of the table once, as sorted chip index pairs
+        """
+        remote = self.remote_chip_index()
+        chip, port = np.nonzero(remote != NO_CHIP)
+        pairs = np.sort(np.stack([chip, remote[chip, port]], axis=1), axis=1)
+        return np.unique(pairs, axis=0) if len(pairs) else pairs.reshape(0, 2)
+
+    def port_mask(self, ports: np.ndarray) -> np.ndarray:
+        """
+        Collapse a (chips, ports) boolean array into a port bit mask per chip
+        """
+        return (np.asarray(ports, dtype=bool) * PORT_BITS).sum(axis=-1)
+
+    def ports_to(self, allowed_chips: np.ndarray) -> np.ndarray:
+        """
+        (chips, ports) mask of the ports connected to an allowed neighbour,
+        allowed_chips is a (chips, chips) boolean array [chip, neighbour chip]
+        """
+        remote = self.remote_chip_index()
+        chip = np.arange(self.num_chips)[:, None]
+        known = remote != NO_CHIP
+        return known & allowed_chips[chip, np.where(known, remote, 0)]
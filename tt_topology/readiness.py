@@ -0,0 +1,52 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Wait times for flashing and resetting the chips, and a helper that polls a value until it settles.
+"""
+import time
+from typing import Any, Callable, Optional, Tuple
+
+# Default fixed delay between flashing params and a reset
+DEFAULT_SETTLE_DELAY = 15.0
+# Default time to wait for ETH links to finish training after a reset
+DEFAULT_LINK_TIMEOUT = 60.0
+
+
+def wait_until_stable(
+    sample: Callable,
+    stable_polls: int = 3,
+    timeout: float = DEFAULT_LINK_TIMEOUT,
+    interval: float = 0.5,
+    is_complete: Optional[Callable] = None,
+    on_change: Optional[Callable] = None,
+    can_settle: Optional[Callable] = None,
+) -> Tuple[Any, bool]:
+    """
+    Call sample() until it returns the same value stable_polls times in a row,
+    is_complete(value) is true or the timeout expires.
+    Values for which can_settle(value) is false never count as stable, ex: no links trained yet.
+    on_change(value) is called every time the sampled value changes, for progress reporting.
+
+    Returns:
+        (last sampled value, True if it settled before the timeout)
+    """
+    deadline = time.monotonic() + timeout
+    last = None
+    num_same = 0
+    while True:
+        value = sample()
+        if num_same and value == last:
+            num_same += 1
+        else:
+            num_same = 1
+            last = value
+            if on_change is not None:
+                on_change(value)
+        stable = num_same >= stable_polls and (can_settle is None or can_settle(value))
+        if stable or (is_complete is not None and is_complete(value)):
+            return value, True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return value, False
+        time.sleep(min(interval, remaining))
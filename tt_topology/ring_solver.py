@@ -0,0 +1,393 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Search for the ring of chips used by the torus and linear layouts, and for the longest line of
+chips when there is no ring.
+A ring is a Hamiltonian cycle of the link graph. Systems of up to SIMPLE_CYCLES_MAX_CHIPS chips
+still take the first simple cycle networkx enumerates that covers all chips, so they keep the rings
+they always got. On larger systems, instead of enumerating every simple cycle, a single depth first
+search extends one path and prunes it as soon as the chips it hasn't reached can no longer be closed
+into a ring. Both have a time budget, so they either find a ring, prove there is none or give up.
+The longest line is looked for with a short branch and bound search first, on well linked systems it
+finds a line through every chip right away. Otherwise a dynamic program over the sets of chips a path
+can cover finds it on small systems, and the branch and bound search carries on with a time budget on
+larger ones.
+Chips are bits of an int, so the sets the searches work on are single int operations.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Outcomes of a ring search
+FOUND = "found"
+NO_CYCLE = "no_cycle"
+TIMEOUT = "timeout"
+
+# Default time budget of a ring search in seconds
+DEFAULT_RING_TIMEOUT = 10.0
+# Largest system whose ring is the first full length cycle of nx.simple_cycles, the number of simple
+# cycles grows too fast to enumerate them on larger ones
+SIMPLE_CYCLES_MAX_CHIPS = 8
+# Default time budget of a longest path search in seconds
+DEFAULT_PATH_TIMEOUT = 10.0
+# Largest system the longest path dynamic program is run on, its state grows with the sets of chips
+# a path can cover
+DP_MAX_CHIPS = 24
+# Number of search steps between checks of the time budget
+_STEPS_PER_CLOCK_CHECK = 1024
+# Steps of the quick search run before the longest path dynamic program, well linked systems have a
+# path through every chip that it finds right away
+_QUICK_SEARCH_STEPS = 8192
+
+
+@dataclass
+class RingResult:
+    """
+    Outcome of a ring search
+    """
+    status: str
+    # Chip ids in ring order, empty unless a ring was found
+    cycle: List[int] = field(default_factory=list)
+    # Why there is no ring or why the search stopped
+    reason: str = ""
+    # Number of paths tried
+    steps: int = 0
+
+
+@dataclass
+class PathResult:
+    """
+    Outcome of a longest path search
+    """
+    # FOUND if the path is known to be the longest, TIMEOUT if it is the longest found in the time budget
+    status: str
+    # Chip ids in path order
+    path: List[int] = field(default_factory=list)
+    # Number of search states visited
+    steps: int = 0
+
+
+def adjacency_masks(adjacency: Dict[int, List[int]]) -> Tuple[List[int], List[int], List[List[int]]]:
+    """
+    Index the chips of an adjacency map, links are taken to go both ways like in a nx.Graph
+
+    Returns:
+        chip ids by index, neighbor bit mask of every index and neighbor indexes in link order
+    """
+    nodes = list(adjacency)
+    for neighbors in adjacency.values():
+        nodes.extend(neighbor for neighbor in neighbors if neighbor not in adjacency)
+    nodes = list(dict.fromkeys(nodes))
+    index = {node: idx for idx, node in enumerate(nodes)}
+    masks = [0] * len(nodes)
+    order: List[List[int]] = [[] for _ in nodes]
+    for node, neighbors in adjacency.items():
+        a = index[node]
+        for neighbor in neighbors:
+            b = index[neighbor]
+            if a == b or masks[a] >> b & 1:
+                continue
+            masks[a] |= 1 << b
+            masks[b] |= 1 << a
+            order[a].append(b)
+            order[b].append(a)
+    return nodes, masks, order
+
+
+def reachable(start: int, subset: int, masks: List[int]) -> int:
+    """
+    Bit mask of the chips of a subset reachable from the chips in start over links within the subset
+    """
+    reached = start
+    frontier = start
+    while frontier:
+        bit = frontier & -frontier
+        frontier ^= bit
+        new = masks[bit.bit_length() - 1] & subset & ~reached
+        reached |= new
+        frontier |= new
+    return reached
+
+
+def is_connected(subset: int, masks: List[int]) -> bool:
+    """
+    Check the chips in a bit mask are connected by links between themselves
+    """
+    return subset == 0 or reachable(subset & -subset, subset, masks) == subset
+
+
+def _bits(mask: int):
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+def _no_ring_reason(nodes: List[int], masks: List[int]) -> str:
+    """
+    Cheap proofs that a graph has no ring, empty if none of them applies
+    """
+    num_chips = len(nodes)
+    full = (1 << num_chips) - 1
+    if num_chips < 3:
+        return f"a ring needs at least 3 chips, found {num_chips}"
+    for idx, mask in enumerate(masks):
+        if mask.bit_count() < 2:
+            return f"chip {nodes[idx]} has {mask.bit_count()} linked chips, a ring needs 2"
+    if not is_connected(full, masks):
+        return "the chips are not all linked together"
+    for idx in range(num_chips):
+        if not is_connected(full & ~(1 << idx), masks):
+            return f"chip {nodes[idx]} is the only link between two groups of chips"
+    # A ring alternates sides of a bipartite graph, so both sides need the same number of chips
+    side = {0: 0}
+    pending = [0]
+    bipartite = True
+    while pending and bipartite:
+        idx = pending.pop()
+        for neighbor in _bits(masks[idx]):
+            if neighbor not in side:
+                side[neighbor] = 1 - side[idx]
+                pending.append(neighbor)
+            elif side[neighbor] == side[idx]:
+                bipartite = False
+                break
+    if bipartite:
+        num_odd = sum(side.values())
+        if num_odd * 2 != num_chips:
+            return f"the links split the chips into groups of {num_chips - num_odd} and {num_odd}, a ring needs equal groups"
+    return ""
+
+
+def _can_close(start: int, current: int, visited: int, full: int, masks: List[int]) -> bool:
+    """
+    Check the path from start to current can still be extended into a ring over the unvisited chips
+    """
+    unvisited = full & ~visited
+    ends = (1 << start) | (1 << current)
+    if not masks[start] & unvisited or not masks[current] & unvisited:
+        return False
+    available = unvisited | ends
+    last_chip = unvisited & (unvisited - 1) == 0
+    for idx in _bits(unvisited):
+        links = masks[idx] & available
+        if links.bit_count() < 2:
+            return False
+        # Only the last chip of the ring can sit between current and start
+        if links == ends and not last_chip:
+            return False
+    return is_connected(unvisited, masks)
+
+
+def _warnsdorff(current: int, unvisited: int, masks: List[int], order: List[List[int]]) -> List[int]:
+    """
+    Unvisited neighbors of a chip to try next, fewest onward links first and ties in link order.
+    Reversed so the preferred chip is popped first.
+    """
+    candidates = [idx for idx in order[current] if unvisited >> idx & 1]
+    candidates.sort(key=lambda idx: (masks[idx] & unvisited).bit_count())
+    return candidates[::-1]
+
+
+def _canonical(path: List[int], order: List[List[int]]) -> List[int]:
+    """
+    Start the ring at the first chip and go towards its ring neighbor that comes first in link order
+    """
+    first = path.index(0)
+    ring = path[first:] + path[:first]
+    if order[0].index(ring[-1]) < order[0].index(ring[1]):
+        ring = ring[:1] + ring[:0:-1]
+    return ring
+
+
+def _first_simple_cycle(adjacency: Dict[int, List[int]], deadline: float, timeout: float) -> RingResult:
+    """
+    The first cycle nx.simple_cycles reports that goes through every chip
+    """
+    import networkx as nx
+
+    graph = nx.Graph(adjacency)
+    steps = 0
+    for cycle in nx.simple_cycles(graph):
+        steps += 1
+        if len(cycle) == graph.number_of_nodes():
+            return RingResult(FOUND, cycle=cycle, steps=steps)
+        if steps % _STEPS_PER_CLOCK_CHECK == 0 and time.monotonic() > deadline:
+            return RingResult(TIMEOUT, reason=f"no ring found within {timeout}s", steps=steps)
+    return RingResult(NO_CYCLE, reason="no cycle goes through every chip", steps=steps)
+
+
+def find_hamiltonian_cycle(
+    adjacency: Dict[int, List[int]], timeout: float = DEFAULT_RING_TIMEOUT
+) -> RingResult:
+    """
+    Find a ring through every chip of an adjacency map {chip id: [neighbor chip id, ...]}.
+    Up to SIMPLE_CYCLES_MAX_CHIPS chips the ring is the first full length cycle of nx.simple_cycles.
+    On larger systems paths are extended towards the neighbor with the fewest unvisited neighbors
+    first (Warnsdorff's rule) and dropped as soon as an unvisited chip is left with fewer than 2
+    usable links or the unvisited chips are split into groups.
+
+    Returns:
+        RingResult with status FOUND and the ring, NO_CYCLE if the search proved there is none,
+        or TIMEOUT if the time budget ran out first
+    """
+    nodes, masks, order = adjacency_masks(adjacency)
+    reason = _no_ring_reason(nodes, masks)
+    if reason:
+        return RingResult(NO_CYCLE, reason=reason)
+
+    num_chips = len(nodes)
+    full = (1 << num_chips) - 1
+    deadline = time.monotonic() + timeout
+    if num_chips <= SIMPLE_CYCLES_MAX_CHIPS:
+        return _first_simple_cycle(adjacency, deadline, timeout)
+
+    # Every ring goes through the chip with the fewest links, starting there branches the least
+    start = min(range(num_chips), key=lambda idx: masks[idx].bit_count())
+    path = [start]
+    visited = 1 << start
+    stack = [_warnsdorff(start, full & ~visited, masks, order)]
+    steps = 0
+    while stack:
+        if steps % _STEPS_PER_CLOCK_CHECK == 0 and time.monotonic() > deadline:
+            return RingResult(TIMEOUT, reason=f"no ring found within {timeout}s", steps=steps)
+        candidates = stack[-1]
+        if not candidates:
+            stack.pop()
+            visited &= ~(1 << path.pop())
+            continue
+        chip = candidates.pop()
+        steps += 1
+        visited |= 1 << chip
+        path.append(chip)
+        if len(path) == num_chips:
+            if masks[chip] >> start & 1:
+                return RingResult(
+                    FOUND, cycle=[nodes[idx] for idx in _canonical(path, order)], steps=steps
+                )
+        elif _can_close(start, chip, visited, full, masks):
+            stack.append(_warnsdorff(chip, full & ~visited, masks, order))
+            continue
+        visited &= ~(1 << path.pop())
+    return RingResult(NO_CYCLE, reason="every path through the chips was tried", steps=steps)
+
+
+def find_longest_path(
+    adjacency: Dict[int, List[int]], timeout: float = DEFAULT_PATH_TIMEOUT
+) -> PathResult:
+    """
+    Find the longest line of linked chips in an adjacency map {chip id: [neighbor chip id, ...]}.
+    Chips without links are left out. The search stops as soon as a path covers every chip it can.
+
+    Returns:
+        PathResult with status FOUND if the path is the longest there is, or TIMEOUT with the longest
+        path found before the time budget ran out
+    """
+    nodes, masks, order = adjacency_masks(adjacency)
+    linked = [idx for idx in range(len(nodes)) if masks[idx]]
+    if not linked:
+        return PathResult(FOUND)
+    # A path stays within a group of linked chips and only its two ends can be chips with a single link
+    leaves = sum(1 << idx for idx in linked if masks[idx].bit_count() == 1)
+    longest = 0
+    remaining = sum(1 << idx for idx in linked)
+    while remaining:
+        group = reachable(remaining & -remaining, remaining, masks)
+        longest = max(longest, group.bit_count() - max(0, (group & leaves).bit_count() - 2))
+        remaining &= ~group
+
+    deadline = time.monotonic() + timeout
+    result = _longest_path_search(linked, masks, order, longest, deadline, max_steps=_QUICK_SEARCH_STEPS)
+    if result.status != FOUND and len(linked) <= DP_MAX_CHIPS:
+        exact = _longest_path_dp(linked, masks, longest, deadline)
+        if exact.status == FOUND:
+            result = exact
+    if result.status != FOUND:
+        result = _longest_path_search(linked, masks, order, longest, deadline, best=result.path)
+    result.path = [nodes[idx] for idx in result.path]
+    return result
+
+
+def _longest_path_dp(linked: List[int], masks: List[int], longest: int, deadline: float) -> PathResult:
+    """
+    Held-Karp style dynamic program. Layer k maps every set of k chips a path can cover to the bit mask
+    of the chips such a path can end on, so a path is only extended by its set and end, never by its order.
+    """
+    layers = [{1 << idx: 1 << idx for idx in linked}]
+    steps = 0
+    while len(layers) < longest:
+        layer = {}
+        for covered, ends in layers[-1].items():
+            steps += 1
+            if steps % _STEPS_PER_CLOCK_CHECK == 0 and time.monotonic() > deadline:
+                return PathResult(TIMEOUT, steps=steps)
+            for end in _bits(ends):
+                for chip in _bits(masks[end] & ~covered):
+                    extended = covered | (1 << chip)
+                    layer[extended] = layer.get(extended, 0) | (1 << chip)
+        if not layer:
+            break
+        layers.append(layer)
+
+    # Walk back from any path of the last layer, dropping its end chip every layer
+    covered, ends = next(iter(layers[-1].items()))
+    end = (ends & -ends).bit_length() - 1
+    path = [end]
+    for layer in reversed(layers[:-1]):
+        covered &= ~(1 << end)
+        links = layer[covered] & masks[end]
+        end = (links & -links).bit_length() - 1
+        path.append(end)
+    return PathResult(FOUND, path=path, steps=steps)
+
+
+def _longest_path_search(
+    linked: List[int],
+    masks: List[int],
+    order: List[List[int]],
+    longest: int,
+    deadline: float,
+    max_steps: Optional[int] = None,
+    best: Optional[List[int]] = None,
+) -> PathResult:
+    """
+    Depth first branch and bound from every chip. A path is dropped when it can't get longer than the
+    best one even by visiting every unvisited chip still reachable from its end.
+    Stops with TIMEOUT after max_steps paths or at the deadline, whichever comes first.
+    """
+    full = sum(1 << idx for idx in linked)
+    best = list(best or [])
+    steps = 0
+    # Lines tend to end on the chips with the fewest links
+    for start in sorted(linked, key=lambda idx: masks[idx].bit_count()):
+        path = [start]
+        visited = 1 << start
+        if not best:
+            best = [start]
+        stack = [_warnsdorff(start, full & ~visited, masks, order)]
+        while stack:
+            if (max_steps is not None and steps >= max_steps) or (
+                steps % _STEPS_PER_CLOCK_CHECK == 0 and time.monotonic() > deadline
+            ):
+                return PathResult(TIMEOUT, path=best, steps=steps)
+            candidates = stack[-1]
+            if not candidates:
+                stack.pop()
+                visited &= ~(1 << path.pop())
+                continue
+            chip = candidates.pop()
+            steps += 1
+            visited |= 1 << chip
+            path.append(chip)
+            if len(path) > len(best):
+                best = list(path)
+                if len(best) == longest:
+                    return PathResult(FOUND, path=best, steps=steps)
+            unvisited = full & ~visited
+            bound = len(path) + reachable(1 << chip, unvisited | (1 << chip), masks).bit_count() - 1
+            if bound > len(best):
+                stack.append(_warnsdorff(chip, unvisited, masks, order))
+                continue
+            visited &= ~(1 << path.pop())
+    return PathResult(FOUND, path=best, steps=steps)
@@ -0,0 +1,228 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Run the hardware I/O of every chip in parallel and check the layouts the chips are flashed to"""
+import threading
+import time
+from types import SimpleNamespace
+import tt_topology.constants as constants
+from tt_topology import backend
+from tt_topology.backend import ChipResult, TopoBackend, pci_interface_key, run_per_chip
+from tt_topology.device import build_device_records
+from tt_topology.fw_defines import get_fw_defines
+from tt_topology.param_table import ParamTable
+from tt_topology.topology import Topology
+
+N300_BOARD_ID = 0x14 << 36
+
+
+class FakeChip:
+    def __init__(self, board, remote=False, fail_copy=False):
+        self.board = board
+        self.remote = remote
+        self.fail_copy = fail_copy
+        self.msgs = []
+        self.spi = bytearray(constants.ETH_PARAM_TABLE_SIZE)
+
+    def as_wh(self):
+        return self
+
+    def board_id(self):
+        return N300_BOARD_ID | self.board
+
+    def is_remote(self):
+        return self.remote
+
+    def get_pci_interface_id(self):
+        if self.remote:
+            raise Exception("Could not get PCI interface for this chip.")
+        return self.board
+
+    def spi_read(self, addr, data):
+        offset = addr - constants.ETH_PARAM_BASE_ADDR
+        data[:] = self.spi[offset : offset + len(data)]
+
+    def spi_write(self, addr, data):
+        offset = addr - constants.ETH_PARAM_BASE_ADDR
+        self.spi[offset : offset + len(data)] = data
+
+    def arc_msg(self, msg, wait_for_done=True, arg0=0, arg1=0, timeout=1.0):
+        self.msgs.append((msg, wait_for_done, timeout))
+        if self.fail_copy:
+            raise TimeoutError("ARC timed out")
+        return 0, 0
+
+
+def topology(num_chips, links, devices=None):
+    """Topology of n300 chips with a link both ways for every (chip, neighbor)"""
+    chip_data = Topology()
+    for chip in range(num_chips):
+        device = SimpleNamespace(board_id=f"b{chip}", board_type="n300", is_remote=False)
+        chip_data.add_chip(str(chip), chip, devices[chip] if devices else device)
+    for a, b in links:
+        chip_data.add_link(a, 0, b, "X")
+        chip_data.add_link(b, 0, a, "X")
+    return chip_data
+
+
+def make_backend(monkeypatch, devices, layout="mesh"):
+    host_info = dict.fromkeys(["OS", "Distro", "Kernel", "Hostname", "Platform", "Python", "Memory", "Driver"], "")
+    monkeypatch.setattr(backend, "get_host_info", lambda: host_info)
+    return TopoBackend(devices, layout, plan_cache=False)
+
+
+def test_run_per_chip_keeps_order_and_errors():
+    def func(item):
+        if item == 2:
+            raise ValueError("bad chip")
+        # Later items finish first
+        time.sleep(0.01 * (4 - item))
+        return item * 10
+
+    results = run_per_chip(func, [0, 1, 2, 3])
+    assert [result.item for result in results] == [0, 1, 2, 3]
+    assert [result.value for result in results] == [0, 10, None, 30]
+    assert isinstance(results[2].error, ValueError)
+    assert all(result.error is None for result in results if result.item != 2)
+    assert run_per_chip(func, []) == []
+    assert run_per_chip(func, [1], max_workers=1) == [ChipResult(1, value=10)]
+
+
+def test_run_per_chip_serializes_chips_of_a_board():
+    # The L and R chip of board 0 are both reached through interface 0
+    chips = [
+        SimpleNamespace(name="0L", board_interface=0),
+        SimpleNamespace(name="0R", board_interface=0),
+        SimpleNamespace(name="1L", board_interface=1),
+        SimpleNamespace(name="1R", board_interface=1),
+    ]
+    running = {0: 0, 1: 0}
+    most_running = {0: 0, 1: 0}
+    overlap = threading.Barrier(2, timeout=1)
+    guard = threading.Lock()
+
+    def func(chip):
+        key = pci_interface_key(chip)
+        with guard:
+            running[key] += 1
+            most_running[key] = max(most_running[key], running[key])
+        if chip.name.endswith("L"):
+            # Both boards are worked on at the same time
+            overlap.wait()
+        time.sleep(0.01)
+        with guard:
+            running[key] -= 1
+
+    results = run_per_chip(func, chips, lock_key=pci_interface_key)
+    assert all(result.error is None for result in results)
+    assert most_running == {0: 1, 1: 1}
+
+
+def test_copy_l_to_r_waits_for_every_board(monkeypatch):
+    chips = [FakeChip(0), FakeChip(1, fail_copy=True)]
+    topo_backend = make_backend(monkeypatch, chips)
+    assert topo_backend.copy_l_to_r() == {}
+    topo_backend.pending_copies = list(topo_backend.devices)
+    errors = topo_backend.copy_l_to_r()
+    assert errors[0] is None and isinstance(errors[1], TimeoutError)
+    copy_msg = get_fw_defines("wormhole")["MSG_TRIGGER_SPI_COPY_LtoR"]
+    # Only the copy is sent, and it blocks until the board is done
+    assert chips[0].msgs == chips[1].msgs == [(copy_msg, True, backend.L_TO_R_COPY_TIMEOUT)]
+    assert topo_backend.pending_copies == []
+
+
+def test_wait_for_flash_only_waits_after_a_flash(monkeypatch):
+    topo_backend = make_backend(monkeypatch, [FakeChip(0)])
+    topo_backend.settle_delay = 0.2
+    start = time.monotonic()
+    topo_backend.wait_for_flash()
+    assert time.monotonic() - start < 0.1
+    topo_backend.flashed_boards = list(topo_backend.devices)
+    topo_backend.wait_for_flash()
+    assert time.monotonic() - start >= 0.2
+    assert topo_backend.flashed_boards == []
+
+
+def test_boards_to_reset_are_the_written_boards_and_their_neighbors(monkeypatch):
+    topo_backend = make_backend(monkeypatch, [FakeChip(0)])
+    pci_interfaces = list(range(5))
+    # Two linked groups, a chain of three boards and a pair of boards
+    devices = build_device_records([FakeChip(board) for board in pci_interfaces])
+    chip_data = topology(5, [(0, 1), (1, 2), (3, 4)], devices)
+    assert topo_backend.boards_to_reset(pci_interfaces, chip_data) == []
+    # The end of the chain only takes down the board next to it
+    topo_backend.changed_interfaces = {0}
+    assert topo_backend.boards_to_reset(pci_interfaces, chip_data) == [0, 1]
+    topo_backend.changed_interfaces = {1}
+    assert topo_backend.boards_to_reset(pci_interfaces, chip_data) == [0, 1, 2]
+    topo_backend.changed_interfaces = {4}
+    assert topo_backend.boards_to_reset(pci_interfaces, chip_data) == [3, 4]
+    # Without a connection map every board is reset
+    assert topo_backend.boards_to_reset(pci_interfaces) == pci_interfaces
+
+
+def test_valid_plans_of_degraded_link_graphs(monkeypatch):
+    topo_backend = make_backend(monkeypatch, [FakeChip(0)], layout="torus")
+    # A line of 4 chips with a chip off to the side, the ring can't close
+    chip_data = topology(5, [(0, 1), (1, 2), (2, 3)])
+    line = {0: (0, 0), 1: (0, 1), 2: (0, 2), 3: (0, 3)}
+    assert topo_backend.is_valid_plan(chip_data, line)
+    assert not topo_backend.is_valid_layout(chip_data, line)
+    assert not topo_backend.is_valid_plan(chip_data, {0: (0, 0), 2: (0, 1), 1: (0, 2), 3: (0, 3)})
+    assert not topo_backend.is_valid_plan(chip_data, {0: (0, 0), 9: (0, 1)})
+
+    topo_backend.layout = "mesh"
+    chip_data = topology(5, [(0, 1), (1, 3), (3, 2), (2, 0)])
+    square = {0: (0, 0), 1: (1, 0), 2: (0, 1), 3: (1, 1)}
+    assert topo_backend.is_valid_plan(chip_data, square)
+    assert not topo_backend.is_valid_plan(chip_data, {0: (0, 0), 1: (1, 0), 3: (0, 1), 2: (1, 1)})
+
+
+def test_valid_layout(monkeypatch):
+    topo_backend = make_backend(monkeypatch, [FakeChip(0)], layout="linear")
+    chip_data = topology(3, [(0, 1), (1, 2)])
+    assert topo_backend.is_valid_layout(chip_data, {0: (0, 0), 1: (0, 1), 2: (0, 2)})
+    # Not in ring order, not a line, or a chip left out
+    assert not topo_backend.is_valid_layout(chip_data, {1: (0, 0), 0: (0, 1), 2: (0, 2)})
+    assert not topo_backend.is_valid_layout(chip_data, {0: (0, 0), 1: (1, 0), 2: (2, 0)})
+    assert not topo_backend.is_valid_layout(chip_data, {0: (0, 0), 1: (0, 1)})
+    # A torus also needs the link back to the first chip
+    topo_backend.layout = "torus"
+    assert not topo_backend.is_valid_layout(chip_data, {0: (0, 0), 1: (0, 1), 2: (0, 2)})
+    chip_data = topology(3, [(0, 1), (1, 2), (2, 0)])
+    assert topo_backend.is_valid_layout(chip_data, {0: (0, 0), 1: (0, 1), 2: (0, 2)})
+
+
+def test_is_flashed(monkeypatch):
+    # 2 n300 boards in a 2x2 mesh, chips 0 and 1 are the L chips
+    chips = [FakeChip(0), FakeChip(1), FakeChip(0, remote=True), FakeChip(1, remote=True)]
+    topo_backend = make_backend(monkeypatch, chips[:2])
+    chip_data = topology(4, [(0, 1), (0, 2), (1, 3), (2, 3)], build_device_records(chips))
+    coord_map = {0: (0, 0), 1: (1, 0), 2: (0, 1), 3: (1, 1)}
+    assert topo_backend.is_valid_layout(chip_data, coord_map)
+    assert not topo_backend.is_flashed(chip_data, coord_map)
+
+    for board, x in [(0, 0), (1, 1)]:
+        param_table = ParamTable.read(chips[board])
+        param_table.set("CHIP_COORD", x)
+        param_table.set("CHIP_COORD", (1 << 8) | x, right=True)
+        param_table.commit(chips[board])
+    topo_backend.param_tables = {}
+    assert topo_backend.is_flashed(chip_data, coord_map)
+
+
+def test_copy_skipped_only_when_the_r_chip_has_the_params(monkeypatch):
+    local, remote = FakeChip(0), FakeChip(0, remote=True)
+    topo_backend = make_backend(monkeypatch, [local], layout="torus")
+    assert topo_backend.flash_device_to_default_state(topo_backend.devices[0])
+    # The SPI of the L chip already holds the default state, but the R chip can't be checked
+    topo_backend.pending_copies = []
+    assert topo_backend.flash_device_to_default_state(topo_backend.devices[0])
+    assert len(topo_backend.pending_copies) == 1
+
+    topo_backend.devices = [local, remote]
+    topo_backend.pending_copies = []
+    assert topo_backend.flash_device_to_default_state(topo_backend.devices[0])
+    assert len(topo_backend.pending_copies) == 1
+    # Once the copy is done there is nothing left to flash
+    remote.spi[:] = local.spi
+    assert not topo_backend.flash_device_to_default_state(topo_backend.devices[0])
@@ -0,0 +1,137 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Read the metadata of every device once per detection and keep it across resets"""
+import pytest
+from tt_topology.device import DeviceRecord, DeviceRegistry, build_device_records
+
+N300_BOARD_ID = (0x14 << 36) | 0x1234
+
+
+class FakeDevice:
+    def __init__(self, remote):
+        self.remote = remote
+        self.calls = 0
+
+    def _call(self, value):
+        self.calls += 1
+        return value
+
+    def as_wh(self):
+        return self._call(self)
+
+    def board_id(self):
+        return self._call(N300_BOARD_ID)
+
+    def is_remote(self):
+        return self._call(self.remote)
+
+    def get_pci_interface_id(self):
+        if self.remote:
+            raise Exception("Could not get PCI interface for this chip.")
+        return self._call(3)
+
+    def init(self):
+        self.inits = getattr(self, "inits", 0) + 1
+        # Number of queries made before the chip was waited on
+        self.calls_before_init = self.calls
+
+    def noc_read(self, noc_id, x, y, addr, data):
+        # Every port reports local eth board info 0x14/0x1
+        data[0:8] = (0x14).to_bytes(4, "little") + (0x1).to_bytes(4, "little")
+
+
+def test_record_reads_device_once():
+    device = FakeDevice(remote=True)
+    record = DeviceRecord(device)
+    assert device.calls == 3
+    assert record.board_id == f"{N300_BOARD_ID:x}"
+    assert record.board_type == "n300"
+    assert record.side == "R"
+    assert record.pci_interface is None
+    assert record.wh is device
+    assert record.eth_board_info is None
+    # Using the record doesn't query the device again
+    assert (record.board_id, record.is_remote, record.board_type) == (f"{N300_BOARD_ID:x}", True, "n300")
+    assert device.calls == 3
+    with pytest.raises(AttributeError):
+        record.extra = 1
+
+
+def test_build_records_keeps_existing_records():
+    record = DeviceRecord(FakeDevice(remote=False))
+    device = FakeDevice(remote=False)
+    records = build_device_records([record, device])
+    assert records[0] is record
+    assert records[1].device is device and records[1].side == "L"
+
+
+def test_remote_chips_take_the_interface_of_their_local_chip():
+    remote, local = FakeDevice(remote=True), FakeDevice(remote=False)
+    records = build_device_records([remote, local])
+    assert [record.pci_interface for record in records] == [None, 3]
+    assert [record.board_interface for record in records] == [3, 3]
+    # Without its local chip the board's interface isn't known
+    assert build_device_records([FakeDevice(remote=True)])[0].board_interface is None
+
+
+class FakeDetect:
+    def __init__(self, devices):
+        self.devices = devices
+        self.calls = []
+
+    def __call__(self, local_only=False):
+        self.calls.append(local_only)
+        return [device for device in self.devices if not (local_only and device.remote)]
+
+
+class FakeOpen:
+    """Opens a new handle for the local chip at a PCI interface"""
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self, pci_interface):
+        device = FakeDevice(remote=False)
+        self.opened.append((pci_interface, device))
+        return device
+
+
+def test_registry_reopens_local_chips():
+    local, remote = FakeDevice(remote=False), FakeDevice(remote=True)
+    detect = FakeDetect([local, remote])
+    open_chip = FakeOpen()
+    registry = DeviceRegistry(
+        [local, remote], detect=detect, scan_interfaces=lambda: [3], open_chip=open_chip
+    )
+    records = registry.refresh()
+    # The stale handle is replaced by a new one at the same interface
+    assert [record.device for record in records] == [device for _, device in open_chip.opened]
+    # and the chip is waited on before it is read
+    assert records[0].device.inits == 1 and records[0].device.calls_before_init == 0
+    assert open_chip.opened[0][0] == 3 and records[0].device is not local
+    assert records[0].board_id == f"{N300_BOARD_ID:x}"
+    assert registry.local_only and detect.calls == []
+    assert registry.num_enumerations == 0
+
+
+def test_registry_enumerates_when_the_chips_changed():
+    local = FakeDevice(remote=False)
+    detect = FakeDetect([local, FakeDevice(remote=True)])
+    registry = DeviceRegistry(
+        [local], local_only=True, detect=detect, scan_interfaces=lambda: [4], open_chip=FakeOpen()
+    )
+    # The local chip is gone
+    assert [record.device for record in registry.refresh()] == [local]
+    assert detect.calls == [True]
+
+    # Another board answers at the interface
+    other = FakeDevice(remote=False)
+    other.board_id = lambda: N300_BOARD_ID + 1
+    registry._scan_interfaces = lambda: [3]
+    registry._open_chip = lambda pci_interface: other
+    registry.refresh()
+    assert detect.calls == [True, True]
+
+    # Remote chips only come back through enumerate
+    assert len(registry.enumerate()) == 2
+    assert registry.num_enumerations == 3
@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Decode ETH test result blocks the same way the per-register reads did"""
+import struct
+import tt_topology.constants as constants
+from tt_topology.eth_scan import (
+    NO_CONNECTION,
+    decode_eth_port_block,
+    eth_xy_decode,
+    scan_eth_ports,
+)
+
+
+class FakeChip:
+    """Serves noc reads from a {(x, y): {addr: word}} register map"""
+
+    def __init__(self, registers):
+        self.registers = registers
+        self.reads = 0
+
+    def noc_read(self, noc_id, x, y, addr, data):
+        self.reads += 1
+        core = self.registers.get((x, y), {})
+        for offset in range(0, len(data), 4):
+            word = core.get(addr + offset, 0)
+            data[offset : offset + 4] = word.to_bytes(4, "little")
+
+
+def port_registers(local_type, local_id, remote_type, remote_id, remote_coord=0):
+    return {
+        constants.ETH_TEST_RESULT_LOCAL_TYPE: local_type,
+        constants.ETH_TEST_RESULT_LOCAL_ID: local_id,
+        constants.ETH_TEST_RESULT_LOCAL_COORD: 0x0100,
+        constants.ETH_TEST_RESULT_REMOTE_TYPE: remote_type,
+        constants.ETH_TEST_RESULT_REMOTE_ID: remote_id,
+        constants.ETH_TEST_RESULT_REMOTE_COORD: remote_coord,
+    }
+
+
+def test_decode_block():
+    words = [0] * (constants.ETH_TEST_RESULT_PORT_BLOCK_SIZE // 4)
+    words[0], words[1], words[2], words[3] = 0x14, 0xABCD, 0x0201, 0x0003
+    words[8], words[9], words[10], words[11] = 0x18, 0x1234, 0x0102, 0x0300
+    port_info = decode_eth_port_block(5, struct.pack(f"<{len(words)}I", *words))
+    assert port_info.port == 5
+    assert port_info.local_eth_board_info == "000000140000abcd"
+    assert port_info.remote_eth_board_info == "0000001800001234"
+    assert port_info.local_xy == (1, 2)
+    assert port_info.remote_xy == (2, 1)
+    assert port_info.is_connected
+
+
+def test_scan_reads_each_port_once():
+    chip = FakeChip(
+        {
+            eth_xy_decode(3): port_registers(0x14, 0x1, 0x14, 0x2, remote_coord=0x0001),
+            eth_xy_decode(14): port_registers(0x14, 0x1, 0x14, 0x3),
+        }
+    )
+    ports = scan_eth_ports(chip)
+    assert chip.reads == constants.ETH_NUM_PORTS
+    connected = {p.port: p.remote_eth_board_info for p in ports if p.is_connected}
+    assert connected == {3: "0000001400000002", 14: "0000001400000003"}
+    assert ports[3].remote_xy == (1, 0)
+    assert ports[0].remote_eth_board_info == NO_CONNECTION
+
+
+def test_scan_skips_disabled_ports():
+    chip = FakeChip(
+        {
+            eth_xy_decode(8): port_registers(0x14, 0x1, 0x14, 0x2),
+            eth_xy_decode(14): port_registers(0x14, 0x1, 0x14, 0x3),
+        }
+    )
+    # Isolated mode mask, only the ports 8 and 9 to the R chip are enabled
+    ports = scan_eth_ports(chip, port_disable=0xFCFF)
+    assert chip.reads == 2
+    assert [p.port for p in ports if p.is_connected] == [8]
+    assert ports[14].remote_eth_board_info == NO_CONNECTION
+
+    chip.reads = 0
+    ports = scan_eth_ports(chip, port_disable=0xFFFF)
+    assert chip.reads == 1
+    assert not any(p.is_connected for p in ports)
@@ -0,0 +1,22 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Load the fw message definitions once, optionally from a module compiled at build time"""
+import os
+import runpy
+import yaml
+from tt_topology.fw_defines import get_fw_defines, compile_fw_defines
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+
+def test_fw_defines_are_loaded_once():
+    with open(os.path.join(DATA_DIR, "wormhole", "fw_defines.yaml")) as f:
+        expected = yaml.safe_load(f)
+    assert dict(get_fw_defines("wormhole")) == expected
+    assert get_fw_defines("wormhole") is get_fw_defines("wormhole")
+
+
+def test_compiled_fw_defines_match_yaml(tmp_path):
+    output = compile_fw_defines(DATA_DIR, str(tmp_path / "_fw_defines_compiled.py"))
+    compiled = runpy.run_path(output)["FW_DEFINES"]
+    assert compiled["wormhole"] == dict(get_fw_defines("wormhole"))
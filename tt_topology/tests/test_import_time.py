@@ -0,0 +1,38 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Importing the CLI entry point must not pull in the heavy dependencies only used when flashing"""
+import re
+import sys
+import subprocess
+
+HEAVY_MODULES = ["matplotlib", "networkx", "pydantic", "numpy"]
+
+
+def import_cli():
+    """
+    Import the CLI entry point in a fresh interpreter
+
+    Returns:
+        ({top level modules that were loaded}, cumulative import time of tt_topology in us)
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import sys, tt_topology; print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = set(result.stdout.split())
+    import_us = int(re.search(r"\|\s*(\d+) \| tt_topology$", result.stderr, re.M).group(1))
+    return modules, import_us
+
+
+def test_cli_import_skips_heavy_dependencies():
+    modules, import_us = import_cli()
+    print(f"tt_topology import time: {import_us / 1000:.1f} ms")
+    assert not modules & set(HEAVY_MODULES)
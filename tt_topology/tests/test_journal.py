@@ -0,0 +1,45 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Record the completed phases of a flash run and pick them up again on resume"""
+import os
+from tt_topology.journal import RunJournal
+
+BOARDS = [(0, "14000000100"), (1, "14000000101")]
+
+
+def test_resume_picks_up_the_last_run(tmp_path):
+    journal = RunJournal.open(str(tmp_path), "torus", BOARDS)
+    journal.complete("default_flash")
+    journal.complete("default_reset")
+    journal.eth_board_info = ["0000001400000001", None]
+    journal.connection_map = {"0": [[1, "X"]], "1": [[0, "X"]]}
+    journal.set_coordinate_map({1: (0, 0), 0: (0, 1)})
+    journal.complete("coordinates")
+
+    resumed = RunJournal.open(str(tmp_path), "torus", BOARDS, resume=True)
+    assert resumed.completed == ["default_flash", "default_reset", "coordinates"]
+    assert resumed.is_done("coordinates") and not resumed.is_done("coord_flash")
+    assert resumed.eth_board_info == ["0000001400000001", None]
+    assert resumed.connection_map == {"0": [[1, "X"]], "1": [[0, "X"]]}
+    # The ring order of the coordinate map is kept
+    assert list(resumed.get_coordinate_map().items()) == [(1, (0, 0)), (0, (0, 1))]
+
+
+def test_journal_of_another_run_is_not_resumed(tmp_path):
+    RunJournal.open(str(tmp_path), "torus", BOARDS).complete("default_flash")
+    assert not RunJournal.open(str(tmp_path), "mesh", BOARDS, resume=True).completed
+    RunJournal.open(str(tmp_path), "torus", BOARDS).complete("default_flash")
+    assert not RunJournal.open(str(tmp_path), "torus", BOARDS[:1], resume=True).completed
+    # Without resume a new run starts over
+    RunJournal.open(str(tmp_path), "torus", BOARDS).complete("default_flash")
+    assert not RunJournal.open(str(tmp_path), "torus", BOARDS).completed
+
+
+def test_clear_and_unreadable_journal(tmp_path):
+    journal = RunJournal.open(str(tmp_path), "mesh", BOARDS)
+    journal.clear()
+    assert not os.path.exists(journal.path)
+    assert RunJournal.load(str(tmp_path)) is None
+    with open(journal.path, "w") as f:
+        f.write("{not json")
+    assert RunJournal.load(str(tmp_path)) is None
@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Place the chips of a mesh on a grid breadth first from a corner chip"""
+from tt_topology.mesh_embed import corner_candidates, embed_from, embed_mesh, embed_search, is_grid_neighbor
+
+
+def grid(cols, rows):
+    """cols x rows mesh, chip y * cols + x"""
+    return {
+        y * cols + x: [y * cols + x + 1] * (x < cols - 1)
+        + [(y + 1) * cols + x] * (y < rows - 1)
+        + [y * cols + x - 1] * (x > 0)
+        + [(y - 1) * cols + x] * (y > 0)
+        for y in range(rows)
+        for x in range(cols)
+    }
+
+
+def test_same_coordinates_as_bfs_placement():
+    # Coordinates the previous breadth first placement gave for these layouts
+    layouts = [
+        (
+            {0: [1, 2], 1: [0, 3], 2: [0, 3], 3: [1, 2]},
+            {0: (0, 0), 1: (1, 0), 2: (0, 1), 3: (1, 1)},
+        ),
+        (
+            {0: [3, 4, 1], 1: [2, 5, 0], 2: [1, 6, 3], 3: [0, 7, 2], 4: [0, 5], 5: [1, 4], 6: [2, 7], 7: [3, 6]},
+            {4: (0, 0), 0: (1, 0), 5: (0, 1), 3: (2, 0), 1: (1, 1), 7: (3, 0), 2: (2, 1), 6: (3, 1)},
+        ),
+        (
+            {0: [1, 2, 6], 1: [0, 3], 2: [0, 3, 4], 3: [1, 2], 4: [2, 5, 6], 5: [4, 7], 6: [0, 4, 7], 7: [5, 6]},
+            {1: (0, 0), 0: (1, 0), 3: (0, 1), 2: (1, 1), 6: (2, 0), 4: (2, 1), 7: (3, 0), 5: (3, 1)},
+        ),
+    ]
+    for adjacency, coordinates in layouts:
+        embedding = embed_mesh(adjacency)
+        assert embedding.ok
+        assert list(embedding.coordinates.items()) == list(coordinates.items())
+        assert embedding.size == (
+            max(x for x, _ in coordinates.values()) + 1,
+            max(y for _, y in coordinates.values()) + 1,
+        )
+
+
+def test_large_mesh():
+    adjacency = grid(20, 15)
+    embedding = embed_mesh(adjacency)
+    assert embedding.ok
+    assert embedding.size == (20, 15)
+    coordinates = embedding.coordinates
+    assert len(set(coordinates.values())) == len(adjacency)
+    assert all(
+        is_grid_neighbor(coordinates[chip], coordinates[neighbor])
+        for chip, neighbors in adjacency.items()
+        for neighbor in neighbors
+    )
+
+
+def test_not_a_mesh():
+    # Three chips linked to each other can't all be next to each other on a grid
+    embedding = embed_mesh({0: [1, 2], 1: [0, 2], 2: [0, 1]})
+    assert not embedding.ok
+    assert embedding.failed_chip == 2 and embedding.parent_chip == 0
+    assert not embed_mesh({0: [], 1: []}).ok
+
+
+def test_search_places_what_greedy_cannot():
+    # 3x3 mesh with a cable missing in a cabling order the breadth first placement runs into a corner on
+    adjacency = {0: [1, 7], 1: [4, 5, 0], 4: [8, 1], 7: [5, 6, 0], 5: [7, 1], 8: [2, 4], 6: [3, 7], 3: [2, 6], 2: [3, 8]}
+    assert not any(embed_from(adjacency, start).ok for start in corner_candidates(adjacency))
+    embedding = embed_mesh(adjacency)
+    assert embedding.ok
+    assert embedding.size == (3, 3)
+    coordinates = embedding.coordinates
+    assert len(set(coordinates.values())) == len(adjacency)
+    assert all(
+        is_grid_neighbor(coordinates[chip], coordinates[neighbor])
+        for chip, neighbors in adjacency.items()
+        for neighbor in neighbors
+    )
+    assert not embed_search(adjacency, 0, timeout=0).ok
+
+
+def test_search_proves_no_placement():
+    # A ring of 5 chips can't be laid on a grid, every grid cycle has an even length
+    embedding = embed_search({i: [(i + 1) % 5, (i - 1) % 5] for i in range(5)}, 0)
+    assert not embedding.ok
+    assert embedding.reason == "no grid placement exists"
@@ -0,0 +1,80 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Read the param table in one go and write back only the changed words"""
+import tt_topology.constants as constants
+from tt_topology.param_table import ParamTable, contiguous_runs, param_addr
+
+
+class FakeSpi:
+    """Word addressed SPI that records every transaction"""
+
+    def __init__(self, words=None):
+        self.words = dict(words or {})
+        self.reads = []
+        self.writes = []
+
+    def spi_read(self, addr, data):
+        self.reads.append((addr, len(data)))
+        for offset in range(0, len(data), 4):
+            data[offset : offset + 4] = self.words.get(addr + offset, 0).to_bytes(4, "little")
+
+    def spi_write(self, addr, data):
+        self.writes.append((addr, len(data)))
+        for offset in range(0, len(data), 4):
+            self.words[addr + offset] = int.from_bytes(data[offset : offset + 4], "little")
+
+
+def test_contiguous_runs():
+    assert contiguous_runs([5, 0, 1, 2, 7, 6]) == [(0, 3), (5, 3)]
+    assert contiguous_runs([]) == []
+
+
+def test_read_is_a_single_transaction():
+    spi = FakeSpi(
+        {
+            constants.ETH_PARAM_CHIP_COORD: 0x0201,
+            constants.ETH_PARAM_PORT_DISABLE + constants.ETH_PARAM_RIGHT_OFFSET: 0xFFFC,
+            constants.ETH_PARAM_COORD_CHECK_DISABLE + constants.ETH_PARAM_RIGHT_OFFSET: 0x7,
+        }
+    )
+    table = ParamTable.read(spi)
+    assert spi.reads == [(constants.ETH_PARAM_BASE_ADDR, constants.ETH_PARAM_TABLE_SIZE)]
+    assert table.get("CHIP_COORD") == 0x0201
+    assert table.get("PORT_DISABLE", right=True) == 0xFFFC
+    assert table.get("COORD_CHECK_DISABLE", right=True) == 0x7
+
+
+def test_commit_coalesces_adjacent_words():
+    spi = FakeSpi()
+    table = ParamTable.read(spi)
+    table.set("CHIP_COORD", 0x0100)
+    table.set("PORT_DISABLE", 0xFFFE)
+    table.set("ROUTING_DISABLE", 0xC002, right=True)
+    assert table.commit(spi) == 3
+    assert spi.writes == [
+        (param_addr("CHIP_COORD"), 4),
+        (param_addr("PORT_DISABLE"), 4),
+        (param_addr("ROUTING_DISABLE", right=True), 4),
+    ]
+    assert spi.words[constants.ETH_PARAM_PORT_DISABLE] == 0xFFFE
+
+    # Words 52 and 53 are next to each other and go out in a single write
+    spi.writes.clear()
+    table.set("MOBO_ETH_EN", 0xC3)
+    table.set("RACK_SHELF", 0x0300)
+    assert table.commit(spi) == 2
+    assert spi.writes == [(constants.ETH_PARAM_MOBO_ETH_EN, 8)]
+    assert table.commit(spi) == 0
+
+
+def test_unchanged_params_are_not_written():
+    spi = FakeSpi({constants.ETH_PARAM_PORT_DISABLE: 0xFFFE})
+    table = ParamTable.read(spi)
+    table.set("PORT_DISABLE", 0xFFFE)
+    table.set("CHIP_COORD", 0x0)
+    assert table.commit(spi) == 0
+    assert spi.writes == []
+
+    forced = ParamTable.read(spi, force=True)
+    forced.set("PORT_DISABLE", 0xFFFE)
+    assert forced.commit(spi) == 1
@@ -0,0 +1,75 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Key coordinate plans by a fingerprint of the link graph that doesn't depend on the chip detection order"""
+import os
+import time
+from types import SimpleNamespace
+from tt_topology.topology import Topology
+from tt_topology.plan_cache import PlanCache, canonical_labeling
+
+# 4 n300 boards in a 2x4 mesh as (chip, port, neighbor, neighbor port, type), chip i is on board i % 4
+# with chips 4-7 the R chips
+LINKS = [
+    (0, 14, 1, 14, "T"), (0, 15, 1, 15, "T"), (2, 14, 3, 14, "T"), (2, 15, 3, 15, "T"),
+    (4, 6, 5, 6, "T"), (4, 7, 5, 7, "T"), (6, 6, 7, 6, "T"), (6, 7, 7, 7, "T"),
+    (0, 0, 4, 0, "X"), (1, 0, 5, 0, "X"), (2, 0, 6, 0, "X"), (3, 0, 7, 0, "X"),
+    (1, 8, 2, 8, "X"), (5, 8, 6, 8, "X"),
+]
+
+
+def mesh(order, links=LINKS):
+    """Topology of the mesh with the chip detected as id i being chip order[i] of the links"""
+    topology = Topology()
+    chip_id = {chip: idx for idx, chip in enumerate(order)}
+    for chip in order:
+        device = SimpleNamespace(board_id=f"b{chip % 4}", board_type="n300", is_remote=chip >= 4)
+        topology.add_chip(str(chip), chip_id[chip], device)
+    for a, port, b, b_port, connection_type in links:
+        topology.add_link(chip_id[a], port, chip_id[b], connection_type)
+        topology.add_link(chip_id[b], b_port, chip_id[a], connection_type)
+    return topology
+
+
+def test_fingerprint_ignores_detection_order():
+    fingerprint, order = canonical_labeling(mesh(list(range(8))))
+    detection_order = [5, 2, 7, 0, 3, 6, 1, 4]
+    relabeled_fingerprint, relabeled_order = canonical_labeling(mesh(detection_order))
+    assert relabeled_fingerprint == fingerprint
+
+    # Both labelings put the links between the same canonical positions
+    def canonical_links(physical_order):
+        position = {chip: idx for idx, chip in enumerate(physical_order)}
+        return {(position[a], port, position[b], b_port) for a, port, b, b_port, _ in LINKS}
+
+    assert canonical_links([detection_order[chip_id] for chip_id in relabeled_order]) == canonical_links(order)
+
+
+def test_fingerprint_sees_link_changes():
+    fingerprint, _ = canonical_labeling(mesh(list(range(8))))
+    # Same chips with one cable moved to another port
+    moved = LINKS[:-1] + [(5, 9, 6, 8, "X")]
+    assert canonical_labeling(mesh(list(range(8)), moved))[0] != fingerprint
+
+
+def test_store_lookup_and_evict(tmp_path):
+    cache = PlanCache(str(tmp_path), max_entries=2)
+    assert cache.lookup("torus", "a") is None
+    cache.store("torus", "a", [(0, 0, 0), (1, 0, 1)], [(0, 0xFFFC), (1, 0xFFF3)])
+    entry = cache.lookup("torus", "a")
+    assert entry["coordinates"] == [[0, 0, 0], [1, 0, 1]]
+    assert entry["port_disables"] == [[0, 0xFFFC], [1, 0xFFF3]]
+    assert cache.lookup("mesh", "a") is None
+
+    # The least recently used plan goes first once there are too many
+    old = time.time() - 60
+    cache.store("torus", "b", [], [])
+    os.utime(cache.path("torus", "b"), (old, old))
+    cache.store("torus", "c", [], [])
+    assert cache.lookup("torus", "b") is None
+    assert cache.lookup("torus", "a") is not None
+
+    # Expired plans are not used
+    cache.max_age = 0
+    time.sleep(0.01)
+    assert cache.lookup("torus", "a") is None
+    assert not os.path.exists(cache.path("torus", "a"))
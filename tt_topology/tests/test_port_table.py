@@ -0,0 +1,60 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Analyze the links of every port of every chip with array operations"""
+import numpy as np
+from tt_topology.eth_scan import EthPortInfo, eth_xy_decode
+from tt_topology.port_table import ETH_XY, NO_CHIP, PortTable
+
+N300 = 0x14
+
+
+def scan(local_id, links):
+    """Port scan of a chip with {port: remote id} links"""
+    return [
+        EthPortInfo(port, N300, local_id, 0, 0, N300 if port in links else 0, links.get(port, 0), 0, 0)
+        for port in range(16)
+    ]
+
+
+def n300_pair():
+    # Local chip 0 and its remote chip 1, plus a link from port 14 to a chip on another host
+    return PortTable.from_scans([scan(1, {0: 2, 1: 2, 14: 9}), scan(2, {6: 1})])
+
+
+def test_eth_xy_lut():
+    assert [tuple(xy) for xy in ETH_XY] == [eth_xy_decode(port) for port in range(16)]
+
+
+def test_links():
+    table = n300_pair()
+    assert table.local_eth_board_info() == [f"{(N300 << 32) | 1:016x}", f"{(N300 << 32) | 2:016x}"]
+    remote = table.remote_chip_index()
+    assert remote[0, 0] == remote[0, 1] == 1 and remote[1, 6] == 0
+    assert remote[0, 14] == NO_CHIP and remote[0, 2] == NO_CHIP
+    assert np.flatnonzero(table.unknown_remote_ports()[0]).tolist() == [14]
+    assert table.edges().tolist() == [[0, 1]]
+
+    tfly = table.tfly_ports([False, True], ["n300", "n300"])
+    assert np.flatnonzero(tfly[0]).tolist() == [14, 15]
+    assert np.flatnonzero(tfly[1]).tolist() == [6, 7]
+
+
+def test_same_links():
+    table = n300_pair()
+    assert table.same_links(n300_pair())
+    # A cable moved to another port
+    assert not table.same_links(PortTable.from_scans([scan(1, {0: 2, 2: 2, 14: 9}), scan(2, {6: 1})]))
+    assert not table.same_links(PortTable.from_scans([scan(1, {0: 2, 1: 2, 14: 9})]))
+
+
+def test_port_masks():
+    table = n300_pair()
+    allowed = np.array([[False, True], [False, False]])
+    assert table.port_mask(table.ports_to(allowed)).tolist() == [0b11, 0]
+    assert table.port_mask(table.connected()).tolist() == [(1 << 14) | 0b11, 1 << 6]
+
+
+def test_snapshot_round_trip(tmp_path):
+    table = n300_pair()
+    table.save(tmp_path / "ports.npz")
+    assert np.array_equal(PortTable.load(tmp_path / "ports.npz").table, table.table)
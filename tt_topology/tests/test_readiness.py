@@ -0,0 +1,33 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Poll a value until it settles"""
+from tt_topology.readiness import wait_until_stable
+
+
+def test_waits_for_a_stable_value():
+    samples = iter([0, 2, 2, 5, 6, 6, 6, 6])
+    changes = []
+    value, settled = wait_until_stable(
+        lambda: next(samples), stable_polls=3, timeout=5, interval=0.001, on_change=changes.append
+    )
+    assert (value, settled) == (6, True)
+    assert changes == [0, 2, 5, 6]
+
+
+def test_stable_value_that_cannot_settle_waits_for_completion():
+    samples = iter([0, 0, 0, 0, 3, 4])
+    value, settled = wait_until_stable(
+        lambda: next(samples),
+        stable_polls=2,
+        timeout=5,
+        interval=0.001,
+        is_complete=lambda value: value >= 4,
+        can_settle=lambda value: value > 0,
+    )
+    assert (value, settled) == (4, True)
+
+
+def test_stable_reports_timeout():
+    counter = iter(range(1000))
+    value, settled = wait_until_stable(lambda: next(counter), timeout=0.05, interval=0.01)
+    assert not settled
@@ -0,0 +1,118 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Find the torus/linear ring and the longest line of chips with bounded searches"""
+import random
+import networkx as nx
+from tt_topology.ring_solver import FOUND, NO_CYCLE, TIMEOUT, find_hamiltonian_cycle, find_longest_path
+
+
+def torus(rows, cols):
+    """rows x cols grid with wrap around links, chip r * cols + c"""
+    return {
+        r * cols + c: [
+            r * cols + (c + 1) % cols,
+            r * cols + (c - 1) % cols,
+            ((r + 1) % rows) * cols + c,
+            ((r - 1) % rows) * cols + c,
+        ]
+        for r in range(rows)
+        for c in range(cols)
+    }
+
+
+def is_ring(cycle, adjacency):
+    return sorted(cycle) == sorted(adjacency) and all(
+        b in adjacency[a] or a in adjacency[b] for a, b in zip(cycle, cycle[1:] + cycle[:1])
+    )
+
+
+def test_same_rings_as_simple_cycles():
+    # First full length cycle nx.simple_cycles reported for these graphs
+    graphs = [
+        (
+            {0: [1, 2, 6], 1: [0, 3], 2: [0, 3, 4], 3: [1, 2], 4: [2, 5, 6], 5: [4, 7], 6: [0, 4, 7], 7: [5, 6]},
+            [0, 1, 3, 2, 4, 5, 7, 6],
+        ),
+        (
+            {0: [3, 4, 1], 1: [2, 5, 0], 2: [1, 6, 3], 3: [0, 7, 2], 4: [0, 5], 5: [1, 4], 6: [2, 7], 7: [3, 6]},
+            [0, 3, 7, 6, 2, 1, 5, 4],
+        ),
+    ]
+    for adjacency, cycle in graphs:
+        result = find_hamiltonian_cycle(adjacency)
+        assert result.status == FOUND
+        assert result.cycle == cycle
+
+
+def test_same_rings_as_simple_cycles_on_relabeled_tori():
+    # 2x4 tori with the chips relabeled and the chips and their links in a random order, they have many rings
+    rng = random.Random(0)
+    base = {chip: list(dict.fromkeys(neighbors)) for chip, neighbors in torus(2, 4).items()}
+    for _ in range(50):
+        label = list(range(8))
+        rng.shuffle(label)
+        adjacency = {label[chip]: [label[neighbor] for neighbor in neighbors] for chip, neighbors in base.items()}
+        for neighbors in adjacency.values():
+            rng.shuffle(neighbors)
+        chips = list(adjacency)
+        rng.shuffle(chips)
+        adjacency = {chip: adjacency[chip] for chip in chips}
+        # The first full length cycle the ring used to be taken from
+        expected = next(cycle for cycle in nx.simple_cycles(nx.Graph(adjacency)) if len(cycle) == 8)
+        assert find_hamiltonian_cycle(adjacency).cycle == expected
+
+
+def test_large_torus():
+    adjacency = torus(4, 8)
+    result = find_hamiltonian_cycle(adjacency)
+    assert result.status == FOUND
+    assert is_ring(result.cycle, adjacency)
+
+
+def test_no_ring():
+    # A chip with a single link, and a 3x3 mesh whose bipartite halves don't match
+    assert find_hamiltonian_cycle({0: [1, 2], 1: [0, 2], 2: [0, 1, 3], 3: [2]}).status == NO_CYCLE
+    mesh = {
+        r * 3 + c: [r * 3 + c + 1] * (c < 2) + [(r + 1) * 3 + c] * (r < 2)
+        for r in range(3)
+        for c in range(3)
+    }
+    result = find_hamiltonian_cycle(mesh)
+    assert result.status == NO_CYCLE
+    assert "equal groups" in result.reason
+    # Petersen graph, only an exhaustive search rules it out
+    petersen = {i: [(i + 1) % 5, i + 5] for i in range(5)}
+    petersen.update({i + 5: [(i + 2) % 5 + 5] for i in range(5)})
+    assert find_hamiltonian_cycle(petersen).status == NO_CYCLE
+
+
+def test_timeout():
+    result = find_hamiltonian_cycle(torus(4, 8), timeout=0)
+    assert result.status == TIMEOUT
+    assert result.cycle == []
+
+
+def test_longest_path():
+    # 2x4 mesh with a cable missing, one chip has a single link
+    adjacency = {0: [1, 4], 1: [0, 2, 5], 2: [1, 3, 6], 3: [2, 7], 4: [0, 5], 5: [1, 4], 6: [2, 7], 7: [3, 6]}
+    result = find_longest_path(adjacency)
+    assert result.status == FOUND
+    assert sorted(result.path) == list(range(8))
+    assert all(b in adjacency[a] or a in adjacency[b] for a, b in zip(result.path, result.path[1:]))
+    # Chips without links are left out, three leaves off a line can't all be on one path
+    adjacency = {0: [1], 1: [0, 2, 4], 2: [1, 3], 3: [2], 4: [1], 5: []}
+    result = find_longest_path(adjacency)
+    assert result.status == FOUND
+    assert len(result.path) == 4 and 5 not in result.path
+    assert find_longest_path({0: [], 1: []}).path == []
+
+
+def test_longest_path_large_system():
+    # 4x8 torus with leaves off three chips, no line covers every chip so the search has to prove it
+    adjacency = torus(4, 8)
+    for leaf, chip in [(32, 0), (33, 1), (34, 13)]:
+        adjacency[leaf] = [chip]
+    result = find_longest_path(adjacency)
+    assert result.status == FOUND
+    assert len(result.path) == 34
+    assert find_longest_path(adjacency, timeout=0).status == TIMEOUT
@@ -0,0 +1,75 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+"""Look chips up by id, eth_board_info, board id and partner without scanning the whole topology"""
+from types import SimpleNamespace
+from tt_topology.topology import Topology
+
+
+def n300(board_id, remote):
+    return SimpleNamespace(board_id=board_id, board_type="n300", is_remote=remote)
+
+
+def two_boards():
+    topology = Topology()
+    topology.add_chip("a", 0, n300("b0", False))
+    topology.add_chip("b", 1, n300("b1", False))
+    topology.add_chip("c", 2, n300("b0", True))
+    topology.add_chip("d", 3, n300("b1", True))
+    return topology
+
+
+def test_lookups():
+    topology = two_boards()
+    assert list(topology) == ["a", "b", "c", "d"]
+    assert topology["c"] is topology.chip(2)
+    assert topology.eth_board_info_of(3) == "d"
+    assert topology.local_chip(topology.chip(2)) is topology.chip(0)
+    assert topology.local_chip(topology.chip(0)) is topology.chip(0)
+    assert topology.partner(topology.chip(1)) is topology.chip(3)
+    assert None not in topology
+
+
+def test_connections_are_deduplicated_in_link_order():
+    topology = two_boards()
+    assert topology.add_connection(0, 2, "X")
+    assert topology.add_connection(0, 1, "T")
+    assert not topology.add_connection(0, 2, "T")
+    topology.add_connection(2, 0, "X")
+    assert topology.chip(0)["connections"] == [(2, "X"), (1, "T")]
+    assert topology.adjacency() == {0: [2, 1], 1: [], 2: [0], 3: []}
+    assert topology.is_connected(0, 1) and not topology.is_connected(1, 0)
+    assert topology.edges() == {(0, 1), (0, 2)}
+
+
+def test_every_physical_link_is_kept_with_its_ports():
+    topology = two_boards()
+    # Two cables between chip 0 and 1, reported on both ends
+    assert topology.add_link(0, 14, 1, "T")
+    assert not topology.add_link(0, 15, 1, "T")
+    topology.add_link(1, 15, 0, "T")
+    topology.add_link(1, 14, 0, "T")
+    # A link chip 2 doesn't report back
+    topology.add_link(0, 0, 2, "X")
+    assert topology.chip(0)["connections"] == [(1, "T"), (2, "X")]
+    assert topology.link_ports(0, 1) == [(14, 14), (15, 15)]
+    assert topology.link_ports(2, 0) == [(None, 0)]
+    # Which of the two ports of chip 1 a port of chip 0 links to isn't known
+    assert topology.link_ports(0, 1, inferred=False) == [(14, None), (15, None)]
+    assert topology.link_ports(2, 0, inferred=False) == [(None, 0)]
+    assert topology.links() == [(0, 14, 1, 14), (0, 15, 1, 15), (0, 0, 2, None)]
+    assert topology.link_counts() == {(0, 1): 2, (0, 2): 1}
+
+
+def test_linked_chips_follow_links_in_both_directions():
+    topology = Topology()
+    for chip_id in range(6):
+        topology.add_chip(str(chip_id), chip_id, n300(f"b{chip_id}", False))
+    topology.add_connection(0, 1, "X")
+    topology.add_connection(2, 1, "X")
+    topology.add_connection(3, 4, "T")
+    # Only the chips linked directly, not the ones further down the chain
+    assert topology.linked_chips([0]) == {0, 1}
+    assert topology.linked_chips([2]) == {1, 2}
+    assert topology.linked_chips([1]) == {0, 1, 2}
+    assert topology.linked_chips([4, 5]) == {3, 4, 5}
+    assert topology.linked_chips([]) == set()
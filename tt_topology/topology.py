@@ -0,0 +1,221 @@
+# SPDX-FileCopyrightText: © 2024 Tenstorrent Inc.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Indexed model of the chips on the host and the ETH links between them.
+Chips are kept as the chip data dicts used throughout the tool:
+    {
+        "id": idx,
+        "chip_obj": DeviceRecord,
+        "board_type": board_type,
+        "board_id": board_id,
+        "connections": [(neighbor_chip_id, connection_type), ...],
+    }
+connections has each neighbor once, the layout algorithms only care which chips are linked.
+Every physical link is also kept with its ETH port on both ends, two chips are often linked by
+more than one cable and a missing one only shows up in the per port view.
+Iterating a Topology works like the dict keyed by eth_board_info it replaces, while chips can
+also be looked up by id, board id or board partner without scanning every chip.
+"""
+from collections.abc import Mapping
+from itertools import zip_longest
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from tt_topology.device import DeviceRecord
+
+
+class Topology(Mapping):
+    """
+    Chips keyed by eth_board_info, in discovery order, with the links between them
+    """
+
+    def __init__(self):
+        self._by_eth_board_info: Dict[Optional[str], dict] = {}
+        self._eth_board_info_by_id: Dict[int, Optional[str]] = {}
+        self._by_id: Dict[int, dict] = {}
+        # board id -> {is_remote: chip data}, the L and R chip of an n300 share a board id
+        self._by_board_id: Dict[str, Dict[bool, dict]] = {}
+        # chip id -> {neighbor chip id: connection type}, a dict so it's a set that keeps link order
+        self._adjacency: Dict[int, Dict[int, str]] = {}
+        # chip id -> {neighbor chip id: [local port, ...]} in port order, one entry per physical link
+        self._ports: Dict[int, Dict[int, List[int]]] = {}
+        # PortTable the links were discovered from, rows are indexed by chip id
+        self.port_table = None
+
+    def add_chip(self, eth_board_info: Optional[str], chip_id: int, device: DeviceRecord) -> dict:
+        """
+        Add a chip without any connections, replacing a chip already added with the same eth_board_info
+
+        Returns:
+            chip data of the new chip
+        """
+        if eth_board_info in self._by_eth_board_info:
+            self._remove_chip(self._by_eth_board_info[eth_board_info])
+        data = {
+            "id": chip_id,
+            "chip_obj": device,
+            "board_type": device.board_type,
+            "board_id": device.board_id,
+            "connections": [],
+        }
+        self._by_eth_board_info[eth_board_info] = data
+        self._eth_board_info_by_id[chip_id] = eth_board_info
+        self._by_id[chip_id] = data
+        self._by_board_id.setdefault(device.board_id, {})[device.is_remote] = data
+        self._adjacency[chip_id] = {}
+        self._ports[chip_id] = {}
+        return data
+
+    def _remove_chip(self, data: dict):
+        chip_id = data["id"]
+        del self._by_id[chip_id]
+        del self._eth_board_info_by_id[chip_id]
+        del self._adjacency[chip_id]
+        del self._ports[chip_id]
+        self._by_board_id[data["board_id"]].pop(data["chip_obj"].is_remote, None)
+
+    def add_connection(self, chip_id: int, neighbor_id: int, connection_type: str) -> bool:
+        """
+        Add a link from a chip to a neighbor, unless the chip already has a link to it
+
+        Returns:
+            True if the link was added
+        """
+        neighbors = self._adjacency[chip_id]
+        if neighbor_id in neighbors:
+            return False
+        neighbors[neighbor_id] = connection_type
+        self._by_id[chip_id]["connections"].append((neighbor_id, connection_type))
+        return True
+
+    def add_link(self, chip_id: int, port: int, neighbor_id: int, connection_type: str) -> bool:
+        """
+        Record a physical link from a port of a chip to a neighbor, the connection to the
+        neighbor is added by the first link to it
+
+        Returns:
+            True if this link added the connection
+        """
+        self._ports[chip_id].setdefault(neighbor_id, []).append(port)
+        return self.add_connection(chip_id, neighbor_id, connection_type)
+
+    # Mapping of eth_board_info to chip data
+    def __getitem__(self, eth_board_info: Optional[str]) -> dict:
+        return self._by_eth_board_info[eth_board_info]
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        return iter(self._by_eth_board_info)
+
+    def __len__(self) -> int:
+        return len(self._by_eth_board_info)
+
+    def __contains__(self, eth_board_info) -> bool:
+        return eth_board_info in self._by_eth_board_info
+
+    def chip(self, chip_id: int) -> dict:
+        """
+        Get the chip data of a chip by its id
+        """
+        return self._by_id[chip_id]
+
+    def eth_board_info_of(self, chip_id: int) -> Optional[str]:
+        """
+        Get the eth_board_info of a chip by its id
+        """
+        return self._eth_board_info_by_id[chip_id]
+
+    def local_chip(self, data: dict) -> Optional[dict]:
+        """
+        Get the local chip on the same board as a chip, the chip itself if it is local
+        """
+        return self._by_board_id[data["board_id"]].get(False)
+
+    def partner(self, data: dict) -> Optional[dict]:
+        """
+        Get the other chip on the same board as a chip, ex: the R chip of an n300 L chip
+        """
+        return self._by_board_id[data["board_id"]].get(not data["chip_obj"].is_remote)
+
+    def neighbors(self, chip_id: int) -> Dict[int, str]:
+        """
+        Get the neighbors of a chip as {neighbor chip id: connection type} in link order
+        """
+        return self._adjacency[chip_id]
+
+    def is_connected(self, chip_id: int, neighbor_id: int) -> bool:
+        return neighbor_id in self._adjacency[chip_id]
+
+    def link_ports(
+        self, chip_id: int, neighbor_id: int, inferred: bool = True
+    ) -> List[Tuple[Optional[int], Optional[int]]]:
+        """
+        Every physical link between two chips as (chip port, neighbor port).
+        The test results don't say which remote port a link lands on. With a single link the neighbor
+        port is the one port the neighbor reports, with several links the ports on both ends are paired
+        in port order, which is only a guess. Pass inferred=False to get None for the guessed ports.
+        A link only one end reports has None for the port on the other end.
+        """
+        local_ports = sorted(self._ports[chip_id].get(neighbor_id, []))
+        remote_ports = sorted(self._ports.get(neighbor_id, {}).get(chip_id, []))
+        if not inferred and len(remote_ports) > 1:
+            remote_ports = [None] * len(remote_ports)
+        return list(zip_longest(local_ports, remote_ports))
+
+    def links(self) -> List[Tuple[int, Optional[int], int, Optional[int]]]:
+        """
+        Every physical link once as (chip id, port, neighbor chip id, neighbor port), lower chip id first
+        """
+        return [
+            (chip_id, port, neighbor_id, neighbor_port)
+            for chip_id, neighbor_id in sorted(self.edges())
+            for port, neighbor_port in self.link_ports(chip_id, neighbor_id)
+        ]
+
+    def link_counts(self) -> Dict[Tuple[int, int], int]:
+        """
+        Number of physical links between every pair of linked chips, keyed like edges
+        """
+        return {
+            (chip_id, neighbor_id): len(self.link_ports(chip_id, neighbor_id))
+            for chip_id, neighbor_id in sorted(self.edges())
+        }
+
+    def linked_chips(self, chip_ids) -> Set[int]:
+        """
+        The given chips and every chip with an ETH link to one of them, in either direction
+        """
+        chip_ids = {chip_id for chip_id in chip_ids if chip_id in self._adjacency}
+        linked = set(chip_ids)
+        for chip_id, neighbors in self._adjacency.items():
+            if chip_id in chip_ids:
+                linked.update(neighbors)
+            elif chip_ids.intersection(neighbors):
+                linked.add(chip_id)
+        return linked
+
+    def adjacency(self) -> Dict[int, List[int]]:
+        """
+        Type agnostic adjacency map {chip id: [neighbor chip id, ...]} in link order
+        """
+        return {data["id"]: list(self._adjacency[data["id"]]) for data in self.values()}
+
+    def neighbor_sets(self) -> Dict[int, Set[int]]:
+        """
+        {chip id: {neighbor chip id, ...}}
+        """
+        return {data["id"]: set(self._adjacency[data["id"]]) for data in self.values()}
+
+    def connection_map(self) -> Dict[int, List[Tuple[int, str]]]:
+        """
+        {chip id: [(neighbor chip id, connection type), ...]} in link order
+        """
+        return {data["id"]: data["connections"] for data in self.values()}
+
+    def edges(self) -> Set[Tuple[int, int]]:
+        """
+        Every link once as a sorted (chip id, chip id) pair
+        """
+        return {
+            (min(chip_id, neighbor_id), max(chip_id, neighbor_id))
+            for chip_id, neighbors in self._adjacency.items()
+            for neighbor_id in neighbors
+        }
@@ -7,11 +7,9 @@ to flash ethernet coordinates when multiple NB's are connected together.
 """
 
 import sys
-import time
 import argparse
 import traceback
 from importlib.metadata import version
-from tt_tools_common.reset_common.wh_reset import WHChipReset
 from tt_tools_common.ui_common.themes import CMD_LINE_COLOR
 from tt_tools_common.utils_common.system_utils import (
     get_driver_version,
@@ -19,18 +17,16 @@ from tt_tools_common.utils_common.system_utils import (
 from tt_tools_common.utils_common.tools_utils import (
     detect_chips_with_callback,
 )
-from tt_tools_common.reset_common.reset_utils import (
-    generate_reset_logs,
-    parse_reset_input,
-    ResetType,
-)
+from tt_topology.readiness import DEFAULT_SETTLE_DELAY, DEFAULT_LINK_TIMEOUT
 from tt_topology.backend import (
     TopoBackend,
     TopoBackend_Octopus,
     detect_current_topology,
-    get_board_type,
+    LOG_FOLDER,
     ORANGE,
 )
+from tt_topology.device import build_device_records
+from tt_topology.journal import RunJournal
 
 
 def parse_args():
@@ -103,6 +99,68 @@ def parse_args():
         dest="plot",
     )
 
+    parser.add_argument(
+        "--force_flash",
+        action="store_true",
+        default=False,
+        help=(
+            "Flash and reset even if the chips are already in the requested layout, "
+            "and rewrite every eth param even if the SPI already holds the value."
+        ),
+        dest="force_flash",
+    )
+
+    parser.add_argument(
+        "--settle_delay",
+        metavar="seconds",
+        type=float,
+        default=DEFAULT_SETTLE_DELAY,
+        help=f"Fixed delay after flashing before the boards are reset. Default: {DEFAULT_SETTLE_DELAY:g}s",
+        dest="settle_delay",
+    )
+
+    parser.add_argument(
+        "--link_timeout",
+        metavar="seconds",
+        type=float,
+        default=DEFAULT_LINK_TIMEOUT,
+        help=f"Max time to wait for the ETH links to train after a reset. Default: {DEFAULT_LINK_TIMEOUT:g}s",
+        dest="link_timeout",
+    )
+
+    parser.add_argument(
+        "--full_scan",
+        action="store_true",
+        default=False,
+        help=(
+            "Read the test results of every ETH port when discovering links, "
+            "including the ports disabled in the eth params. For diagnostics."
+        ),
+        dest="full_scan",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help=(
+            "Resume an interrupted flash from the last completed step, "
+            f"using the run journal in {LOG_FOLDER}"
+        ),
+        dest="resume",
+    )
+
+    parser.add_argument(
+        "--no_plan_cache",
+        action="store_true",
+        default=False,
+        help=(
+            "Work out the coordinates from the links instead of reusing the plan cached for the same "
+            f"link graph in {LOG_FOLDER}"
+        ),
+        dest="no_plan_cache",
+    )
+
     parser.add_argument(
         "-r",
         "--reset",
@@ -116,20 +174,13 @@ def parse_args():
     return parser
 
 
-def run_and_flash(topo_backend: TopoBackend):
+def flash_default_and_reset(topo_backend: TopoBackend, journal: RunJournal, pci_interfaces):
     """
-    Main function of tt-topology. Performs the following steps -
-    1. Flash all the boards to default - set all eth port disables to 0 and reset coordinates.
-    2. Issue a board level reset to apply the new flash to the chips.
-    3. Generate a mapping of all possible connections and their type between the available chips.
-    4. Using a graph algorithm generate coordinates for each chip based on user input.
-    5. Write the new coordinates to the chips.
-    6. Issue a board level reset to apply the new flash to the chips.
-    7. Return a png with a graphic representation of the layout
+    Flash all the boards to the default state, reset them and wait for the links to train.
+    When resuming a run that already completed the default reset, the reset is skipped if the SPI
+    still holds the default params.
     """
-    # Store the the original eth config in the log
-    topo_backend.get_eth_config_state()
-
+    resumed = journal.is_done("default_reset")
     print(
         CMD_LINE_COLOR.BLUE,
         "Starting flash on pcie chips to default state.",
@@ -139,61 +190,51 @@ def run_and_flash(topo_backend: TopoBackend):
     topo_backend.flash_to_default_state()
     print(
         CMD_LINE_COLOR.PURPLE,
-        "Sleeping for 15s ...",
+        "Waiting for flash to complete ...",
         CMD_LINE_COLOR.ENDC,
     )
-    time.sleep(15)
+    topo_backend.wait_for_flash()
     print(
         CMD_LINE_COLOR.BLUE,
         "Finished flashing pcie chips to default state.",
         CMD_LINE_COLOR.ENDC,
     )
+    journal.complete("default_flash")
 
-    # Reset all pci devices
-    num_local_chips = len(topo_backend.devices)
-    reset_obj = WHChipReset()
-    pci_interfaces = [dev.get_pci_interface_id() for dev in topo_backend.devices]
-    print(
-        CMD_LINE_COLOR.BLUE,
-        f"Initiating reset on chips at pcie interface: {pci_interfaces}",
-        CMD_LINE_COLOR.ENDC,
-    )
-    reset_devices = reset_obj.full_lds_reset(pci_interfaces)
-    print(
-        CMD_LINE_COLOR.BLUE,
-        f"Completed reset on {len(reset_devices)} chips",
-        CMD_LINE_COLOR.ENDC,
-    )
-
-    # Detect all devices, including remote
-    topo_backend.devices = detect_chips_with_callback()
-
-    # Add new config to make sure flash happened correctly
-    topo_backend.get_eth_config_state()
-
-    print(
-        CMD_LINE_COLOR.PURPLE,
-        f"Post reset detected : {len(topo_backend.devices)} chips",
-        CMD_LINE_COLOR.ENDC,
-    )
-    # check number of devices
-    #  TODO: FIX THIS THIS IS FOR NBX1
-    if len(topo_backend.devices) < num_local_chips * 2:
+    if resumed and not topo_backend.changed_interfaces:
+        # The chips are still running the default state the interrupted run reset them into
         print(
-            CMD_LINE_COLOR.RED,
-            f"NOT ALL BOARDS DETECTED!, detected {len(topo_backend.devices)}, expecting {num_local_chips * 2}",
+            CMD_LINE_COLOR.GREEN,
+            "Default state was already applied by the interrupted run, skipping reset.",
             CMD_LINE_COLOR.ENDC,
         )
-        sys.exit(1)
-
-    if topo_backend.layout == "isolated":
+        topo_backend.devices = topo_backend.registry.enumerate()
+    else:
+        # Reset all pci devices, the links between them aren't known yet
         print(
             CMD_LINE_COLOR.BLUE,
-            f"Boards flashed to default isolated state. Exiting.",
+            f"Initiating reset on chips at pcie interface: {pci_interfaces}",
             CMD_LINE_COLOR.ENDC,
         )
-        sys.exit(0)
+        # Reset and detect all devices, including remote
+        reset_devices = topo_backend.full_lds_reset(pci_interfaces)
+        print(
+            CMD_LINE_COLOR.BLUE,
+            f"Completed reset on {len(reset_devices)} chips",
+            CMD_LINE_COLOR.ENDC,
+        )
+    # Don't assume the links are up right after the reset, wait for them to train
+    topo_backend.wait_for_link_training()
+    journal.complete("default_reset")
+
+
+def discover_coordinates(topo_backend: TopoBackend, journal: RunJournal):
+    """
+    Generate the connection map of the chips in the default state and the coordinates of the requested layout
 
+    Returns:
+        (connection map, coordinate map)
+    """
     connection_data = topo_backend.generate_connection_map()
     num_connections_missing = topo_backend.check_num_available_connections(
         connection_data
@@ -227,22 +268,173 @@ def run_and_flash(topo_backend: TopoBackend):
             data["connections"],
             CMD_LINE_COLOR.ENDC,
         )
+    # Keep the scan so a resumed run can rebuild this connection map without the default state
+    connection_data.port_table.save(journal.port_table_path)
+    journal.eth_board_info = [
+        connection_data.eth_board_info_of(chip_id)
+        for chip_id in range(connection_data.port_table.num_chips)
+    ]
+    journal.connection_map = journal_connection_map(connection_data)
+    journal.complete("discovery")
+
+    # Hosts cabled like one seen before reuse its coordinates, see plan_cache
+    coordinates_map = topo_backend.load_cached_plan(connection_data)
+    if coordinates_map is None:
+        if topo_backend.layout in ["linear", "torus"]:
+            coordinates_map = topo_backend.generate_coordinates_torus_or_linear(
+                connection_data
+            )
+        elif topo_backend.layout == "mesh":
+            coordinates_map = topo_backend.generate_mesh_connection_independent(connection_data)
+        elif topo_backend.layout == "mesh_v2":
+            coordinates_map = topo_backend.apply_mesh_v2_coordinates()
+        else:
+            print(
+                CMD_LINE_COLOR.RED,
+                "Invalid layout type!",
+                CMD_LINE_COLOR.ENDC,
+            )
+            raise Exception("Invalid layout type!")
+        topo_backend.save_cached_plan(connection_data, coordinates_map)
+    journal.set_coordinate_map(coordinates_map)
+    journal.complete("coordinates")
+    return connection_data, coordinates_map
 
-    if topo_backend.layout in ["linear", "torus"]:
-        coordinates_map = topo_backend.generate_coordinates_torus_or_linear(
-            connection_data
+
+def journal_connection_map(connection_data) -> dict:
+    """
+    Connection map in the json form it is kept in the run journal
+    """
+    return {
+        str(chip_id): [list(connection) for connection in connections]
+        for chip_id, connections in connection_data.connection_map().items()
+    }
+
+
+def resume_coordinates(topo_backend: TopoBackend, journal: RunJournal):
+    """
+    Pick up the connection map and coordinates of an interrupted run.
+    The connection map is rebuilt from the saved scan and checked against the chips on the host.
+    Unless the coordinates were already flashed, the chips still run the state the scan was taken in,
+    so their ports are scanned again and have to show the same links.
+
+    Returns:
+        (connection map, coordinate map), (None, None) if the host doesn't match the journal
+    """
+    from tt_topology.port_table import PortTable
+
+    try:
+        port_table = PortTable.load(journal.port_table_path)
+        topo_backend.devices = topo_backend.registry.enumerate()
+        connection_data = topo_backend.restore_connection_map(journal.eth_board_info, port_table)
+        if connection_data is not None and not journal.is_done("coord_flash"):
+            # The SPI may hold an unapplied coordinate flash, but the chips run the default state
+            # with no port disabled
+            results = topo_backend.scan_all_eth_ports([0] * len(topo_backend.devices))
+            if any(result.error is not None for result in results) or not PortTable.from_scans(
+                [result.value for result in results]
+            ).same_links(port_table):
+                connection_data = None
+    except Exception:
+        connection_data = None
+    if connection_data is None or journal_connection_map(connection_data) != journal.connection_map:
+        return None, None
+    print(
+        CMD_LINE_COLOR.GREEN,
+        "Resuming with the connection map and coordinates of the interrupted run.",
+        CMD_LINE_COLOR.ENDC,
+    )
+    return connection_data, journal.get_coordinate_map()
+
+
+def run_and_flash(topo_backend: TopoBackend, resume: bool = False):
+    """
+    Main function of tt-topology. Performs the following steps -
+    1. Flash all the boards to default - set all eth port disables to 0 and reset coordinates.
+    2. Issue a board level reset to apply the new flash to the chips.
+    3. Generate a mapping of all possible connections and their type between the available chips.
+    4. Using a graph algorithm generate coordinates for each chip based on user input.
+    5. Write the new coordinates to the chips, along with the multi-host params on multi-host n300 hosts.
+    6. Issue a board level reset to apply the new flash to the chips.
+    7. Return a png with a graphic representation of the layout
+    Completed steps are recorded in a journal in the log folder. With resume, a run picks up after the
+    last step the interrupted run completed, once the chips are checked to still be in the state it left.
+    """
+    # Store the the original eth config in the log
+    topo_backend.get_eth_config_state()
+
+    local_devices = topo_backend.devices
+    num_local_chips = len(local_devices)
+    pci_interfaces = [dev.pci_interface for dev in local_devices]
+    journal = RunJournal.open(
+        LOG_FOLDER,
+        topo_backend.layout,
+        [(dev.pci_interface, dev.board_id) for dev in local_devices],
+        resume=resume,
+    )
+    if resume and journal.completed:
+        print(
+            CMD_LINE_COLOR.BLUE,
+            f"Resuming interrupted run, completed steps: {', '.join(journal.completed)}",
+            CMD_LINE_COLOR.ENDC,
         )
-    elif topo_backend.layout == "mesh":
-        coordinates_map = topo_backend.generate_mesh_connection_independent(connection_data)
-    elif topo_backend.layout == "mesh_v2":
-        coordinates_map = topo_backend.apply_mesh_v2_coordinates()
-    else:
+
+    # Nothing to flash or reset if the host is already running the requested layout
+    if not topo_backend.force_flash and topo_backend.check_current_layout():
         print(
-            CMD_LINE_COLOR.RED,
-            "Invalid layout type!",
+            CMD_LINE_COLOR.GREEN,
+            f"Chips are already flashed in the {topo_backend.layout} layout, skipping flash and reset.",
+            CMD_LINE_COLOR.ENDC,
+        )
+        journal.clear()
+        return
+
+    # The coordinate flash of the interrupted run may be in the SPI without having been applied by a reset
+    reset_all = journal.is_done("coord_flash")
+    connection_data, coordinates_map = None, None
+    if journal.is_done("coordinates"):
+        connection_data, coordinates_map = resume_coordinates(topo_backend, journal)
+        if connection_data is None:
+            print(
+                ORANGE,
+                "Chips don't match the interrupted run, starting over.",
+                CMD_LINE_COLOR.ENDC,
+            )
+            journal = RunJournal.open(LOG_FOLDER, journal.layout, journal.boards)
+            topo_backend.devices = local_devices
+            reset_all = False
+
+    if connection_data is None:
+        flash_default_and_reset(topo_backend, journal, pci_interfaces)
+
+        # Add new config to make sure flash happened correctly
+        topo_backend.get_eth_config_state()
+
+        print(
+            CMD_LINE_COLOR.PURPLE,
+            f"Post reset detected : {len(topo_backend.devices)} chips",
             CMD_LINE_COLOR.ENDC,
         )
-        raise Exception("Invalid layout type!")
+        # check number of devices
+        #  TODO: FIX THIS THIS IS FOR NBX1
+        if len(topo_backend.devices) < num_local_chips * 2:
+            print(
+                CMD_LINE_COLOR.RED,
+                f"NOT ALL BOARDS DETECTED!, detected {len(topo_backend.devices)}, expecting {num_local_chips * 2}",
+                CMD_LINE_COLOR.ENDC,
+            )
+            sys.exit(1)
+
+        if topo_backend.layout == "isolated":
+            print(
+                CMD_LINE_COLOR.BLUE,
+                f"Boards flashed to default isolated state. Exiting.",
+                CMD_LINE_COLOR.ENDC,
+            )
+            journal.clear()
+            sys.exit(0)
+
+        connection_data, coordinates_map = discover_coordinates(topo_backend, journal)
 
     print(
         CMD_LINE_COLOR.PURPLE,
@@ -251,70 +443,54 @@ def run_and_flash(topo_backend: TopoBackend):
         CMD_LINE_COLOR.ENDC,
     )
 
-    # Flash the boards with generated coordinates
+    # Flash the boards with generated coordinates, multi-host n300 hosts get their multi-host params in the same pass
     topo_backend.flash_to_specified_state(connection_data, coordinates_map)
     print(
         CMD_LINE_COLOR.PURPLE,
-        "Sleeping for 15s ...",
+        "Waiting for flash to complete ...",
         CMD_LINE_COLOR.ENDC,
     )
-    time.sleep(15)
+    topo_backend.wait_for_flash()
     print(
         CMD_LINE_COLOR.BLUE,
         "Finished flashing chips to generated coordinates.",
         CMD_LINE_COLOR.ENDC,
     )
+    journal.complete("coord_flash")
 
-    print(
-        CMD_LINE_COLOR.BLUE,
-        f"Initiating reset on chips at pcie interface: {pci_interfaces}",
-        CMD_LINE_COLOR.ENDC,
-    )
-    reset_devices = reset_obj.full_lds_reset(pci_interfaces)
-    topo_backend.devices = detect_chips_with_callback()
-    print(
-        CMD_LINE_COLOR.BLUE,
-        f"Completed reset on {len(topo_backend.devices)} chips",
-        CMD_LINE_COLOR.ENDC,
-    )
-    print()
-
-    # Update connection_data with new backend devices
-    connection_data = topo_backend.generate_connection_map()
-
-    # For the n300 enable multi-host mode by default.
-    # Check for 8 n300 chips happens in the function
-    if topo_backend.layout == "mesh_v2":
-        topo_backend.flash_n300_multihost_v2(connection_data, coordinates_map)
+    # Only reset the boards that were flashed and the boards linked to them
+    if reset_all:
+        reset_interfaces = pci_interfaces
     else:
-        topo_backend.flash_n300_multihost(connection_data, coordinates_map)
-
-    # TODO: does this need 15s sleep?
-    print(
-        CMD_LINE_COLOR.PURPLE,
-        "Sleeping for 5s ...",
-        CMD_LINE_COLOR.ENDC,
-    )
-    time.sleep(5)
-    print(
-        CMD_LINE_COLOR.BLUE,
-        f"Initiating reset on chips at pcie interface: {pci_interfaces}",
-        CMD_LINE_COLOR.ENDC,
-    )
-    reset_devices = reset_obj.full_lds_reset(pci_interfaces)
-    topo_backend.devices = detect_chips_with_callback()
-    print(
-        CMD_LINE_COLOR.BLUE,
-        f"Completed reset on {len(topo_backend.devices)} chips",
-        CMD_LINE_COLOR.ENDC,
-    )
+        reset_interfaces = topo_backend.boards_to_reset(pci_interfaces, connection_data)
+    if reset_interfaces:
+        print(
+            CMD_LINE_COLOR.BLUE,
+            f"Initiating reset on chips at pcie interface: {reset_interfaces}",
+            CMD_LINE_COLOR.ENDC,
+        )
+        topo_backend.full_lds_reset(reset_interfaces)
+        print(
+            CMD_LINE_COLOR.BLUE,
+            f"Completed reset on {len(topo_backend.devices)} chips",
+            CMD_LINE_COLOR.ENDC,
+        )
+        topo_backend.wait_for_link_training()
+    else:
+        print(
+            CMD_LINE_COLOR.GREEN,
+            "No board params changed, skipping reset.",
+            CMD_LINE_COLOR.ENDC,
+        )
     print()
+    journal.complete("coord_reset")
 
     # Get the final eth config state
     topo_backend.get_eth_config_state()
 
     # Generate graph visualization
     topo_backend.graph_visualization(connection_data, coordinates_map)
+    journal.clear()
 
 
 def program_galaxy(topo_backend_octo: TopoBackend_Octopus):
@@ -397,19 +573,19 @@ def program_galaxy(topo_backend_octo: TopoBackend_Octopus):
         "reset with retimer_sel and disable_sel and wait for training, and verify all chips show up"
     )
 
+    num_local_devices = len(topo_backend_octo.devices_local)
     topo_backend_octo.galaxy_reset(mobo_dict_after)
 
-    # wait time to make sure devices enumerate
+    # galaxy_reset reopened the local devices, it only enumerates them again if they changed
+    post_reset_devices_local = topo_backend_octo.devices_local
     # Detect all devices, including remote
-    print("detecting all local devices after reset...")
-    post_reset_devices_local = detect_chips_with_callback(local_only=True)
     print("detecting all local and remote devices after reset...")
-    post_reset_devices = detect_chips_with_callback(local_only=False)
+    post_reset_devices = topo_backend_octo.registry.enumerate()
 
-    if len(topo_backend_octo.devices_local) != len(post_reset_devices_local):
+    if num_local_devices != len(post_reset_devices_local):
         print(
             CMD_LINE_COLOR.RED,
-            f"NOT ALL LOCAL BOARDS DETECTED!, detected {len(post_reset_devices_local)}, expecting {len(topo_backend_octo.devices_local)}",
+            f"NOT ALL LOCAL BOARDS DETECTED!, detected {len(post_reset_devices_local)}, expecting {num_local_devices}",
             CMD_LINE_COLOR.ENDC,
         )
         sys.exit(1)
@@ -481,11 +657,14 @@ def main():
         )
         sys.exit(1)
 
+    # Read the metadata of every device once, everything below uses the records
+    devices = build_device_records(devices)
+
     # Warn the user if any board is not in the accepted boards list
     supported_devices = []
     unsupported_device_names = []
     for dev in devices:
-        board_type = get_board_type(str(hex(dev.board_id())).replace("0x", ""))
+        board_type = dev.board_type
         supported_boards = ["n300", "n150", "GALAXY"]
         if board_type in supported_boards:
             supported_devices.append(dev)
@@ -516,7 +695,10 @@ def main():
         sys.exit()
 
     if args.generate_reset_json:
-        file = generate_reset_logs(devices)
+        # The reset utils pull in pydantic, only import them when they are used
+        from tt_tools_common.reset_common.reset_utils import generate_reset_logs
+
+        file = generate_reset_logs([dev.device for dev in devices])
         print(
             CMD_LINE_COLOR.PURPLE,
             f"Generated sample reset config file for this host: {file}",
@@ -530,6 +712,8 @@ def main():
         sys.exit(0)
 
     if args.octopus:
+        from tt_tools_common.reset_common.reset_utils import parse_reset_input, ResetType
+
         if args.reset is not None:
             reset_input = parse_reset_input(args.reset)
             if reset_input.type is not ResetType.CONFIG_JSON:
@@ -554,10 +738,19 @@ def main():
         sys.exit()
 
     else:
-        topo_backend = TopoBackend(devices, args.layout, args.plot)
+        topo_backend = TopoBackend(
+            devices,
+            args.layout,
+            args.plot,
+            force_flash=args.force_flash,
+            settle_delay=args.settle_delay,
+            link_timeout=args.link_timeout,
+            full_scan=args.full_scan,
+            plan_cache=not args.no_plan_cache,
+        )
         errors = False
     try:
-        run_and_flash(topo_backend)
+        run_and_flash(topo_backend, resume=args.resume)
     except Exception as e:
         print(
             CMD_LINE_COLOR.RED,